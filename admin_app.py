@@ -1,5 +1,6 @@
 """Standalone admin web interface – runs on port 5001."""
 
+import atexit
 import os
 import sys
 from pathlib import Path
@@ -7,10 +8,12 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
 from flask import Flask
+from gpuutje_kopen.db import close_connections, init_db
 from gpuutje_kopen.routes.admin import admin
 
 
 def create_admin_app() -> Flask:
+    init_db()
     app = Flask(__name__)
     app.config["JSON_SORT_KEYS"] = False
     app.config["SECRET_KEY"] = os.environ.get("ADMIN_SECRET_KEY", os.urandom(32).hex())
@@ -18,6 +21,8 @@ def create_admin_app() -> Flask:
     return app
 
 
+atexit.register(close_connections)
+
 app = create_admin_app()
 
 if __name__ == "__main__":
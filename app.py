@@ -12,8 +12,14 @@ sys.path.insert(0, str(Path(__file__).parent / "src"))
 from flask import Flask
 from werkzeug.middleware.proxy_fix import ProxyFix
 
+from gpuutje_kopen.db import close_connections, connection_stats, init_db
+from gpuutje_kopen.cache import response_cache
+from gpuutje_kopen.events import bus, start_generation_watch, stop_generation_watch
+from gpuutje_kopen.leader import WORKER_LEASE, LeaderElection
+from gpuutje_kopen.process_stats import start_stats_publisher, stop_stats_publisher
 from gpuutje_kopen.routes.public import public
 from gpuutje_kopen.search_worker import start_worker_thread, stop_worker_thread
+from gpuutje_kopen.tracking import page_view_writer_stats, start_page_view_writer, stop_page_view_writer
 
 
 # ── App factory ───────────────────────────────────────────────────────
@@ -23,35 +29,54 @@ def create_app() -> Flask:
     app.config["JSON_SORT_KEYS"] = False
     app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", os.urandom(32).hex())
 
+    # Bring the databases up to date before anything reads them
+    init_db()
+
     # Trust X-Forwarded-For from 2 proxies (Cloudflare → nginx)
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=2, x_proto=1, x_host=1)
 
     # Register blueprints
     app.register_blueprint(public)
 
-    # Background search worker (idempotent start)
-    _start_worker()
+    # Buffered page-view writer (idempotent start)
+    start_page_view_writer()
 
-    return app
+    # Background search worker, only in the process holding the lease
+    _election.start()
 
+    # Turn data changes made by other processes into SSE events
+    start_generation_watch()
 
-# ── Worker lifecycle ──────────────────────────────────────────────────
+    # Counters of this process's pools, queues and caches, for the admin's /api/stats
+    start_stats_publisher(
+        db_connections=connection_stats,
+        page_views=page_view_writer_stats,
+        events=bus.stats,
+        response_cache=response_cache.stats,
+        leader=_election.stats,
+    )
+
+    return app
 
-_worker_thread = None
 
+# ── Worker lifecycle ──────────────────────────────────────────────────
 
-def _start_worker():
-    global _worker_thread
-    if _worker_thread and _worker_thread.is_alive():
-        return
-    _worker_thread = start_worker_thread()
+_election = LeaderElection(WORKER_LEASE, on_elected=start_worker_thread, on_demoted=stop_worker_thread)
 
 
-atexit.register(stop_worker_thread)
+atexit.register(close_connections)  # atexit is LIFO: runs after the writers below stop
+atexit.register(_election.stop)
+atexit.register(stop_generation_watch)
+atexit.register(stop_stats_publisher)
+atexit.register(stop_page_view_writer)
 
 
 def _handle_shutdown(signum, frame):
-    stop_worker_thread()
+    _election.stop()
+    stop_generation_watch()
+    stop_stats_publisher()
+    stop_page_view_writer()
+    close_connections()
     sys.exit(0)
 
 
@@ -0,0 +1,148 @@
+"""Full search-cycle throughput, offline, against a replayed marketplace.
+
+The real ``search_worker.run_search_cycle`` runs on a copy of a
+``synth.py`` database (cached like ``run.py``'s).  Its search backend is a
+``search_backends.ReplayBackend`` replaying a cassette that
+``synth.build_cassette`` makes from the same database, so nothing goes
+over the network and the same seed gives the same cycles.  While the
+cycles run, ``--readers`` threads call the public read paths to show what
+a cycle's writes cost readers::
+
+    python benchmarks/cycle.py --listings 100k --cycles 3 --latency 0 --readers 4 --out cycle.json
+
+Per cycle the report has its seconds, queries and listings per second and
+the observations it added.  For the readers it has requests, errors and
+p50/p95/max latency in milliseconds.  ``--latency`` and ``--errors``
+set the replayed per-query latency and failure share; a recorded cassette
+(``record.py``) can stand in for the synthetic one with ``--cassette``.
+"""
+
+import argparse
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+from pathlib import Path
+
+import run
+import synth  # also puts src/ on sys.path
+from gpuutje_kopen import archive, db, search_worker, services, snapshot
+from gpuutje_kopen.catalog import refresh_catalog
+from gpuutje_kopen.search_backends import ReplayBackend
+
+WORK_DIR = run.CACHE_DIR / "cycle"
+READ_PATHS = (
+    lambda rng: services.filtered_results(),
+    lambda rng: services.filtered_results(min_vram=rng.choice((8, 12, 16, 24)), max_price=1500),
+    lambda rng: db.filtered_listings(search=rng.choice(("rtx", "3090", "4070", "ti", "rx")), limit=200),
+    lambda rng: services.data_stats(),
+)
+
+
+def _reader(stop: threading.Event, rng: random.Random, latencies: list[float], errors: list[int]):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            rng.choice(READ_PATHS)(rng)
+        except Exception:
+            errors.append(1)
+        latencies.append(time.perf_counter() - start)
+
+
+def _ms(latencies: list[float]) -> dict:
+    ms = sorted(t * 1000 for t in latencies) or [0.0]
+    return {
+        "p50": round(statistics.median(ms), 2),
+        "p95": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 2),
+        "max": round(ms[-1], 2),
+    }
+
+
+def cycle_run(dataset: Path, *, cycles: int, latency: float = 0.0, errors: float = 0.0, readers: int = 0,
+              seed: int = 1, cassette: Path | None = None) -> dict:
+    """Run *cycles* search cycles on a fresh copy of *dataset*; returns the report."""
+    saved = db.DB_PATH, db.ANALYTICS_DB_PATH, archive.ARCHIVE_DIR, snapshot.SNAPSHOT_DIR
+    run._use_copy(dataset, WORK_DIR)
+    snapshot.SNAPSHOT_DIR = WORK_DIR / "snapshots"
+    if cassette is None:
+        cassette = WORK_DIR / "search.jsonl.gz"
+        synth.build_cassette(dataset, cassette, cycles=cycles, seed=seed)
+    backend = ReplayBackend(cassette, latency=latency, error_rate=errors, seed=seed)
+    previous = search_worker.set_search_backend(backend)
+
+    stop = threading.Event()
+    latencies: list[float] = []
+    failures: list[int] = []
+    threads = [threading.Thread(target=_reader, args=(stop, random.Random(seed * 1000 + n), latencies, failures),
+                                name=f"reader-{n}", daemon=True) for n in range(readers)]
+    results = []
+    try:
+        for t in threads:
+            t.start()
+        for _ in range(cycles):
+            queries, observations = backend.counts["queries"], db.observation_counts()["observations"]
+            start = time.perf_counter()
+            cycle = search_worker.run_search_cycle()
+            seconds = time.perf_counter() - start
+            with db._read() as c:
+                saved_listings = c.execute("SELECT listings FROM cycles WHERE id = ?", (cycle,)).fetchone()[0]
+            results.append({
+                "cycle": cycle,
+                "seconds": round(seconds, 3),
+                "queries": backend.counts["queries"] - queries,
+                "queries_per_sec": round((backend.counts["queries"] - queries) / seconds, 1),
+                "listings": saved_listings,
+                "listings_per_sec": round(saved_listings / seconds, 1),
+                "observations": db.observation_counts()["observations"] - observations,
+            })
+            print(f"  cycle {cycle}: {results[-1]['seconds']}s, {results[-1]['listings_per_sec']} listings/s",
+                  flush=True)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+        search_worker.set_search_backend(previous)
+        db.close_connections()
+        db.DB_PATH, db.ANALYTICS_DB_PATH, archive.ARCHIVE_DIR, snapshot.SNAPSHOT_DIR = saved
+        refresh_catalog()
+    elapsed = sum(r["seconds"] for r in results)
+    return {
+        "cycles": results,
+        "backend": dict(backend.counts),
+        "readers": {
+            "threads": readers,
+            "requests": len(latencies),
+            "errors": len(failures),
+            "per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            **_ms(latencies),
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--listings", default="100k", help="synthetic database size, e.g. 10k, 100k, 1m")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per replayed query")
+    parser.add_argument("--errors", type=float, default=0.0, help="share of replayed queries that fail")
+    parser.add_argument("--readers", type=int, default=0, help="threads calling read paths meanwhile")
+    parser.add_argument("--cassette", type=Path, help="replay this cassette instead of a synthetic one")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", type=Path, help="also write the report as JSON")
+    args = parser.parse_args(argv)
+    logging.getLogger("gpuutje_kopen").setLevel(logging.WARNING)
+
+    rows = synth.parse_count(args.listings)
+    report = {"listings": rows, **cycle_run(run._dataset(rows, args.seed), cycles=args.cycles, latency=args.latency,
+                                            errors=args.errors, readers=args.readers, seed=args.seed,
+                                            cassette=args.cassette)}
+    print(json.dumps({k: v for k, v in report.items() if k != "cycles"}, indent=1))
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=1))
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""HTTP load test of the public and admin apps against a synthetic database.
+
+Both apps run the way the container runs them: ``app.py`` and
+``admin_app.py`` in two processes, served by werkzeug's threaded server
+(what ``app.run`` uses), in a scratch directory that holds a copy of a
+``synth.py`` database as ``data/``.  Virtual users then replay a weighted
+mix of sessions, each as fast as the servers answer:
+
+* ``dashboard`` - what ``static/js/app.js`` fetches: the page, its
+  scripts, ``/api/bootstrap``, then a GPU switch, a scatter range change,
+  a stats refresh and a results reload,
+* ``typing`` - a search term typed into the results filter, one
+  ``/api/results`` request per keystroke,
+* ``admin`` - the admin page load, the results, outliers, restored and
+  traffic tabs, and now and then a listing edit (which bumps the data
+  generation and so empties the public response cache).
+
+Every user sends its own ``X-Forwarded-For``, so page-view tracking writes
+as it would behind the proxy.  With ``--ingest off`` the search worker
+never starts.  With ``on`` the real worker loop runs against the replay
+backend of ``search_backends``.  It replays a cassette that
+``synth.build_cassette`` makes from the copy: active listings re-reported
+with some price drops, plus a few new ones.  Each query takes
+``--search-latency`` seconds and ``--search-errors`` of them fail, so
+cycles save, sweep, dedup, revalidate and publish as in production.
+``both`` (the default) runs twice on fresh copies to show what write
+contention costs::
+
+    python benchmarks/load.py --listings 100k --users 16 --duration 60 --out load.json
+
+Per route the report has requests, errors, throughput, the share served
+from the response cache and p50/p95/p99/max latency in milliseconds.
+Server logs are kept next to the copy in ``benchmarks/.cache/load/``.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote, urlencode
+
+HERE = Path(__file__).parent
+ROOT = HERE.parent
+WORK_DIR = HERE / ".cache" / "load"
+
+SESSIONS = {"dashboard": 6, "typing": 3, "admin": 1}  # relative weights
+ADMIN_EDIT_RATE = 0.2     # admin sessions that save a listing
+SEARCH_LATENCY = 0.3      # seconds the replayed marketplace takes per query
+CASSETTE = "search.jsonl.gz"  # in the scratch directory
+CASSETTE_CYCLES = 10      # recorded cycles, replayed in turn
+CYCLE_GAP = 5             # seconds between stubbed search cycles
+TIMEOUT = 60.0            # seconds per request
+STARTUP_TIMEOUT = 60.0
+
+
+def serve(which: str, port: int, ingest: bool, search_latency: float, search_errors: float = 0.0):
+    """Run one app until terminated; the current directory holds ``data/`` and the cassette."""
+    sys.path[:0] = [str(ROOT), str(ROOT / "src")]
+    from werkzeug.serving import make_server
+
+    if which == "public":
+        from gpuutje_kopen import search_worker
+        from gpuutje_kopen.search_backends import ReplayBackend
+
+        search_worker.set_search_backend(ReplayBackend(Path(CASSETTE), latency=search_latency,
+                                                       error_rate=search_errors))
+        if not ingest:
+            search_worker.start_worker_thread = lambda: None
+        import app as module  # module level runs create_app()
+    else:
+        import admin_app as module  # module level runs create_admin_app()
+    make_server("127.0.0.1", port, module.app, threaded=True).serve_forever()
+
+
+# ── Servers ───────────────────────────────────────────────────────────
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _prepare(dataset: Path, work: Path, seed: int):
+    """Copy *dataset* to ``work/data`` with a short search interval, and write its cassette."""
+    import synth
+
+    shutil.rmtree(work, ignore_errors=True)
+    (work / "data").mkdir(parents=True)
+    for name in ("gpuutje.db", "analytics.db"):
+        shutil.copyfile(dataset / name, work / "data" / name)
+    synth.build_cassette(dataset, work / CASSETTE, cycles=CASSETTE_CYCLES, seed=seed)
+    with sqlite3.connect(work / "data" / "gpuutje.db") as c:
+        c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('search_interval', ?)", (str(CYCLE_GAP),))
+
+
+def _start(which: str, work: Path, ingest: bool, search_latency: float,
+           search_errors: float) -> tuple[subprocess.Popen, int]:
+    port = _free_port()
+    log = open(work / f"{which}.log", "wb")
+    proc = subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), "--serve", which, "--port", str(port),
+         "--ingest", "on" if ingest else "off", "--search-latency", str(search_latency),
+         "--search-errors", str(search_errors)],
+        cwd=work, stdout=log, stderr=subprocess.STDOUT,
+    )
+    log.close()
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{which} app exited with {proc.returncode}, see {work / f'{which}.log'}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return proc, port
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{which} app did not start within {STARTUP_TIMEOUT}s")
+
+
+def _stop(proc: subprocess.Popen):
+    proc.terminate()
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+# ── Load generation ───────────────────────────────────────────────────
+
+class Recorder:
+    """Latencies, errors and cache hits per route label."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.hits: dict[str, int] = defaultdict(int)
+
+    def record(self, label: str, seconds: float, ok: bool, hit: bool):
+        with self._lock:
+            self.latencies[label].append(seconds)
+            self.errors[label] += not ok
+            self.hits[label] += hit
+
+
+class User:
+    """One virtual user: a client address and a way to time requests."""
+
+    def __init__(self, n: int, ports: dict[str, int], recorder: Recorder, rng: random.Random, think: float):
+        self.ip = f"10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}"
+        self.ports = ports
+        self.recorder = recorder
+        self.rng = rng
+        self.think = think
+
+    def request(self, app: str, label: str, path: str, method: str = "GET", body: dict | None = None):
+        """Time *path* to the last byte; returns the body of a 200 (still gzipped if it was sent so)."""
+        conn = http.client.HTTPConnection("127.0.0.1", self.ports[app], timeout=TIMEOUT)
+        headers = {"Accept-Encoding": "gzip", "X-Forwarded-For": f"{self.ip}, 172.16.0.1"}
+        data = json.dumps(body).encode() if body is not None else None
+        if data is not None:
+            headers["Content-Type"] = "application/json"
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=data, headers=headers)
+            resp = conn.getresponse()
+            payload = resp.read()
+            status, hit = resp.status, resp.getheader("X-Cache") == "HIT"
+        except (OSError, http.client.HTTPException):
+            payload, status, hit = b"", 0, False
+        finally:
+            conn.close()
+        self.recorder.record(f"{app} {method} {label}", time.perf_counter() - start, status < 400 and status != 0, hit)
+        if self.think:
+            time.sleep(self.think)
+        return payload if status == 200 else None
+
+
+def _results_params(search: str = "", **overrides) -> str:
+    """The public results filters as ``resultsParams()`` in app.js sends them."""
+    params = {"min_vram": 0, "min_tokens": 0, "max_price": 999999, "search": search,
+              "sort_by": "timestamp", "order": "desc", **overrides}
+    return urlencode(params)
+
+
+def dashboard(user: User, ctx: dict):
+    rng = user.rng
+    user.request("public", "/", "/")
+    for script in ("app.js", "money.js"):
+        user.request("public", "/static/js/*", f"/static/js/{script}")
+    span = rng.choice(["30d", "30d", "14d", "1y", "all"])
+    days = rng.choice(["30", "30", "14", "365"])
+    user.request("public", "/api/bootstrap", "/api/bootstrap?" + _results_params() + "&" + urlencode(
+        {"span": span, "days": days, "active_only": 1, "limit": 10, "points": 300}))
+    gpu = rng.choice(ctx["gpus"])
+    user.request("public", "/api/price-history/<gpu_id>",
+                 f"/api/price-history/{quote(gpu['id'])}?agg=min&span={span}&points=300")
+    user.request("public", "/api/scatter-data", f"/api/scatter-data?metric=tokens&days={rng.choice(['14', '30', '365'])}")
+    user.request("public", "/api/stats", "/api/stats")
+    user.request("public", "/api/results", "/api/results?" + _results_params(
+        sort_by=rng.choice(["timestamp", "price", "tokens"]), order=rng.choice(["desc", "asc"])))
+
+
+def typing(user: User, ctx: dict):
+    term = user.rng.choice(ctx["terms"])
+    for end in range(1, len(term) + 1):
+        user.request("public", "/api/results?search=", "/api/results?" + _results_params(term[:end]))
+
+
+def admin(user: User, ctx: dict):
+    rng = user.rng
+    for path in ("/", "/api/stats", "/api/gpu-breakdown", "/api/gpus"):
+        user.request("admin", path, path)
+    listing = urlencode({"gpu": "", "search": "", "min_price": 0, "max_price": 999999,
+                         "sort_by": rng.choice(["timestamp", "price", "gpu"]), "order": "desc",
+                         "limit": 200, "active_only": ""})
+    rows = user.request("admin", "/api/results", f"/api/results?{listing}")
+    user.request("admin", "/api/outliers", "/api/outliers?gpu=&limit=200")
+    user.request("admin", "/api/restored", "/api/restored?limit=200")
+    user.request("admin", "/api/traffic", f"/api/traffic?days={rng.choice([7, 30, 90])}")
+    if rows and rng.random() < ADMIN_EDIT_RATE:
+        row = rng.choice(json.loads(rows))
+        user.request("admin", "/api/results/<pk>", f"/api/results/{row['id']}", "PUT", {
+            "gpu_name": row["gpu_name"], "title": row["title"], "price": row["price"],
+            "active": bool(row["active"]), "link": row["link"]})
+        user.request("admin", "/api/stats", "/api/stats")
+
+
+SCENARIOS = {"dashboard": dashboard, "typing": typing, "admin": admin}
+
+
+def _context(port: int) -> dict:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=TIMEOUT)
+    conn.request("GET", "/api/gpus")
+    gpus = json.loads(conn.getresponse().read())
+    conn.close()
+    # What people type: model numbers and names of the catalog
+    terms = sorted({g["name"].lower().split()[-1] for g in gpus} | {g["name"].lower() for g in gpus[:10]})
+    return {"gpus": gpus, "terms": terms}
+
+
+def _percentile(ms: list[float], p: float) -> float:
+    return round(ms[min(len(ms) - 1, int(len(ms) * p))], 2)
+
+
+def _summary(recorder: Recorder, elapsed: float) -> dict:
+    routes = {}
+    for label in sorted(recorder.latencies):
+        ms = sorted(t * 1000 for t in recorder.latencies[label])
+        routes[label] = {
+            "requests": len(ms),
+            "errors": recorder.errors[label],
+            "rps": round(len(ms) / elapsed, 1),
+            "cache_hits": round(recorder.hits[label] / len(ms), 3),
+            "p50": _percentile(ms, 0.50),
+            "p95": _percentile(ms, 0.95),
+            "p99": _percentile(ms, 0.99),
+            "max": round(ms[-1], 2),
+        }
+    total = sum(r["requests"] for r in routes.values())
+    return {
+        "elapsed": round(elapsed, 1),
+        "requests": total,
+        "errors": sum(r["errors"] for r in routes.values()),
+        "rps": round(total / elapsed, 1),
+        "routes": routes,
+    }
+
+
+def _ingested(work: Path, since: float) -> dict:
+    with sqlite3.connect(f"file:{work / 'data' / 'gpuutje.db'}?mode=ro", uri=True) as c:
+        started, finished = c.execute(
+            "SELECT COUNT(*), COUNT(finished_at) FROM cycles WHERE started_at >= ?", (int(since),)).fetchone()
+        observations = c.execute(
+            "SELECT COUNT(*) FROM observations WHERE cycle IN (SELECT id FROM cycles WHERE started_at >= ?)",
+            (int(since),)).fetchone()[0]
+    return {"cycles_started": started, "cycles_finished": finished, "observations": observations}
+
+
+def load_run(dataset: Path, *, ingest: bool, users: int, duration: float, seed: int,
+             think: float = 0.0, search_latency: float = SEARCH_LATENCY, search_errors: float = 0.0) -> dict:
+    """Serve a fresh copy of *dataset* and drive it for *duration* seconds."""
+    work = WORK_DIR / ("ingest" if ingest else "quiet")
+    _prepare(dataset, work, seed)
+    started = time.time()
+    servers = {}
+    try:
+        for which in ("public", "admin"):
+            servers[which] = _start(which, work, ingest, search_latency, search_errors)
+        ports = {which: port for which, (_, port) in servers.items()}
+        ctx = _context(ports["public"])
+        recorder = Recorder()
+        names, weights = list(SESSIONS), list(SESSIONS.values())
+        deadline = time.monotonic() + duration
+
+        def drive(n: int):
+            user = User(n, ports, recorder, random.Random(seed * 1000 + n), think)
+            while time.monotonic() < deadline:
+                SCENARIOS[user.rng.choices(names, weights)[0]](user, ctx)
+
+        begin = time.perf_counter()
+        threads = [threading.Thread(target=drive, args=(n,), daemon=True) for n in range(users)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        result = _summary(recorder, time.perf_counter() - begin)
+    finally:
+        for proc, _ in servers.values():
+            _stop(proc)
+    if ingest:
+        result["ingest"] = _ingested(work, started)
+    return result
+
+
+def _print(name: str, result: dict):
+    print(f"\n{name}: {result['requests']:,} requests in {result['elapsed']}s = {result['rps']} req/s, "
+          f"{result['errors']} errors" + (f", ingest {result['ingest']}" if "ingest" in result else ""))
+    print(f"  {'route':<44} {'req/s':>7} {'hit':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'err':>4}")
+    for label, r in result["routes"].items():
+        print(f"  {label:<44} {r['rps']:>7} {r['cache_hits']:>5.0%} {r['p50']:>8} {r['p95']:>8} "
+              f"{r['p99']:>8} {r['max']:>8} {r['errors']:>4}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--listings", default="100k", help="synthetic database size, e.g. 10k, 100k, 1m")
+    parser.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="seconds per run")
+    parser.add_argument("--think", type=float, default=0.0, help="seconds a user waits between requests")
+    parser.add_argument("--ingest", choices=("off", "on", "both"), default="both")
+    parser.add_argument("--search-latency", type=float, default=SEARCH_LATENCY,
+                        help="seconds the replayed marketplace takes per query")
+    parser.add_argument("--search-errors", type=float, default=0.0, help="share of search queries that fail")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", type=Path, help="also write the report as JSON")
+    parser.add_argument("--serve", choices=("public", "admin"), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.serve, args.port, args.ingest == "on", args.search_latency, args.search_errors)
+        return
+
+    import run  # imports the package; the server processes import it in their own directory
+    import synth
+
+    rows = synth.parse_count(args.listings)
+    dataset = run._dataset(rows, args.seed)
+    modes = {"off": [False], "on": [True], "both": [False, True]}[args.ingest]
+    report = {
+        "meta": {
+            "commit": run._git("rev-parse", "--short", "HEAD"),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "listings": rows,
+            "users": args.users,
+            "duration": args.duration,
+            "think": args.think,
+            "search_latency": args.search_latency,
+            "search_errors": args.search_errors,
+            "seed": args.seed,
+            "cpus": os.cpu_count(),
+        },
+        "runs": {},
+    }
+    for ingest in modes:
+        name = "ingest" if ingest else "quiet"
+        print(f"Running {args.users} users for {args.duration}s against {rows:,} listings, ingestion "
+              f"{'on' if ingest else 'off'} ...", flush=True)
+        report["runs"][name] = load_run(dataset, ingest=ingest, users=args.users, duration=args.duration,
+                                        seed=args.seed, think=args.think, search_latency=args.search_latency,
+                                        search_errors=args.search_errors)
+        _print(name, report["runs"][name])
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=1))
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Record the live marketplace's answers to every GPU query as a cassette.
+
+Runs each search query of each GPU in the catalog of ``data/gpuutje.db``
+through ``search_backends.RecordingBackend`` wrapping the live backend,
+``--cycles`` times, ``--gap`` seconds apart.  Nothing is saved to the
+database.  The cassette then replays offline: ``cycle.py --cassette`` or
+``search_worker.set_search_backend(ReplayBackend(path))``::
+
+    python benchmarks/record.py --cycles 3 --gap 600 --out benchmarks/cassettes/live.jsonl.gz
+
+Needs network access; run it from the repository root.
+"""
+
+import argparse
+import logging
+import time
+from pathlib import Path
+
+import synth  # also puts src/ on sys.path
+from gpuutje_kopen.db import load_gpu_list
+from gpuutje_kopen.search_backends import MarktplaatsBackend, RecordingBackend
+
+log = logging.getLogger("record")
+
+
+def record(out: Path, *, cycles: int = 1, gap: float = 0.0) -> int:
+    """Append *cycles* passes over every GPU query to *out*; returns the responses recorded."""
+    backend = RecordingBackend(MarktplaatsBackend(), out)
+    recorded = 0
+    for n in range(cycles):
+        if n:
+            time.sleep(gap)
+        for gpu in load_gpu_list():
+            for query in gpu.search_queries:
+                try:
+                    listings = backend.search(query)
+                    log.info(f"{query!r}: {len(listings)} listings")
+                except Exception as e:
+                    log.warning(f"{query!r} failed: {e}")  # recorded too, replay fails it the same way
+                recorded += 1
+            time.sleep(backend.pause)
+    return recorded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", type=Path, required=True, help="cassette to append to (.jsonl.gz)")
+    parser.add_argument("--cycles", type=int, default=1, help="passes over every query")
+    parser.add_argument("--gap", type=float, default=600, help="seconds between passes")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    count = record(args.out, cycles=args.cycles, gap=args.gap)
+    print(f"Recorded {count} responses to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
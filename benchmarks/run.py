@@ -0,0 +1,373 @@
+"""Time every public ``db`` function and service at several database sizes.
+
+For each scale a synthetic database is built with ``synth.py`` (cached in
+``benchmarks/.cache`` by size, seed, generator and schema version) and
+copied to a scratch directory.  Every case then runs ``--repeat`` times after one
+warm-up call.  Cases that change data in bulk (sweeps, dedup,
+revalidation, pruning, maintenance) get a fresh copy before every run, so
+each run does the real work instead of finding nothing left to do.
+Results go to one JSON file per run::
+
+    python benchmarks/run.py --scales 10k,100k,1m --out before.json
+    python benchmarks/run.py --scales 10k,100k,1m --out after.json
+    python benchmarks/run.py --compare before.json after.json
+
+Times are in milliseconds.  ``--compare`` prints the median ratio per case
+and exits non-zero when any case got slower than ``--threshold``.  Public
+``db`` functions without a case are listed under ``uncovered``, so new
+queries do not silently go unmeasured.
+"""
+
+import argparse
+import inspect
+import json
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import synth  # also puts src/ on sys.path
+from gpuutje_kopen import archive, db, maintenance, services
+from gpuutje_kopen.catalog import refresh_catalog
+
+HERE = Path(__file__).parent
+CACHE_DIR = HERE / ".cache"
+DEFAULT_SCALES = "10k,100k"
+DEFAULT_REPEAT = 5
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    fn: Callable[["Context"], object]
+    fresh: bool = False      # needs an untouched database for every run
+    covers: tuple[str, ...] = ()
+    prepare: Callable[["Context"], object] | None = None  # untimed setup before each run
+
+
+CASES: list[Case] = []
+
+
+def case(name: str, *, fresh: bool = False, covers: tuple[str, ...] = (), prepare=None):
+    def register(fn):
+        CASES.append(Case(name, fn, fresh, covers or (name.split("[")[0].removeprefix("db."),), prepare))
+        return fn
+    return register
+
+
+@dataclass
+class Context:
+    """Ids picked from the database under test, so cases hit real rows."""
+    gpu_id: str          # the GPU with the most listings
+    gpu_ids: list[str]   # the eight biggest
+    listing_pk: int
+    outlier_pk: int
+    search: str
+
+    @classmethod
+    def load(cls) -> "Context":
+        counts = sorted(db.gpu_listing_counts().items(), key=lambda kv: -kv[1])
+        with db._read() as c:
+            listing_pk = c.execute("SELECT MAX(id) FROM listings").fetchone()[0]
+            outlier_pk = c.execute("SELECT MAX(id) FROM outliers").fetchone()[0]
+        gpu = db.get_gpu(counts[0][0])
+        return cls(gpu.id, [g for g, _ in counts[:8]], listing_pk, outlier_pk, gpu.name.split()[-1].lower())
+
+
+def _consume(chunks) -> int:
+    return sum(len(c) for c in chunks)
+
+
+# ── Cases: db reads ───────────────────────────────────────────────────
+
+case("db.listing_count")(lambda ctx: db.listing_count())
+case("db.active_listing_count")(lambda ctx: db.active_listing_count())
+case("db.gpu_listing_counts")(lambda ctx: db.gpu_listing_counts())
+case("db.last_updated")(lambda ctx: db.last_updated())
+case("db.gpu_breakdown")(lambda ctx: db.gpu_breakdown())
+case("db.load_gpu_list")(lambda ctx: db.load_gpu_list())
+case("db.get_gpu")(lambda ctx: db.get_gpu(ctx.gpu_id))
+case("db.next_gpu_id")(lambda ctx: db.next_gpu_id("RTX 9090"))
+case("db.get_setting")(lambda ctx: db.get_setting("search_interval"))
+case("db.get_lease")(lambda ctx: db.get_lease("search_worker"))
+case("db.schema_version")(lambda ctx: db.schema_version())
+case("db.connection_stats")(lambda ctx: db.connection_stats())
+case("db.database_sizes")(lambda ctx: db.database_sizes("main"))
+case("db.init_db[current]")(lambda ctx: db.init_db())
+case("db.epoch_days_ago")(lambda ctx: db.epoch_days_ago(30))
+case("db.span_bins")(lambda ctx: db.span_bins("1y"))
+case("db.price_history[min,30d]")(lambda ctx: db.price_history(ctx.gpu_id, "min", "30d"))
+case("db.price_history[avg,all]")(lambda ctx: db.price_history(ctx.gpu_id, "avg", "all"))
+case("db.price_history_multi[8,1y]")(lambda ctx: db.price_history_multi(ctx.gpu_ids, "min", "1y"))
+case("db.price_history_bins[8,all]")(lambda ctx: db.price_history_bins(ctx.gpu_ids, "all"))
+case("db.avg_price_period[30]")(lambda ctx: db.avg_price_period(ctx.gpu_id, 30))
+case("db.avg_prices_period[30]")(lambda ctx: db.avg_prices_period(30))
+case("db.avg_prices_period[all]")(lambda ctx: db.avg_prices_period(None))
+case("db.price_totals_period[365]")(lambda ctx: db.price_totals_period(365))
+case("db.lowest_listing")(lambda ctx: db.lowest_listing(ctx.gpu_id))
+case("db.lowest_listings")(lambda ctx: db.lowest_listings())
+case("db.filtered_listings[recent]")(lambda ctx: db.filtered_listings(limit=500))
+case("db.filtered_listings[search]")(lambda ctx: db.filtered_listings(search=ctx.search, limit=500))
+case("db.filtered_listings[gpus,price]")(
+    lambda ctx: db.filtered_listings(gpu_ids=ctx.gpu_ids, max_price=500, sort_by="price", order="asc"))
+case("db.filtered_listings[active]")(lambda ctx: db.filtered_listings(active_only=True, limit=500))
+case("db.filtered_listings[sort price]")(lambda ctx: db.filtered_listings(sort_by="price", order="asc", limit=500))
+case("db.filtered_listings[sort tokens]")(lambda ctx: db.filtered_listings(sort_by="tokens", limit=500))
+case("db.iter_filtered_results_json")(lambda ctx: sum(map(len, db.iter_filtered_results_json(limit=500))))
+case("db.browse_listings[recent]")(lambda ctx: db.browse_listings())
+case("db.browse_listings[gpu,search]")(lambda ctx: db.browse_listings(gpu_filter=ctx.gpu_id, search=ctx.search))
+case("db.browse_listings[sort gpu]")(lambda ctx: db.browse_listings(sort_by="gpu", order="asc"))
+case("db.browse_outliers")(lambda ctx: db.browse_outliers())
+case("db.browse_restored_listings")(lambda ctx: db.browse_restored_listings())
+case("db.outlier_count")(lambda ctx: db.outlier_count())
+case("db.is_price_outlier")(lambda ctx: db.is_price_outlier(ctx.gpu_id, 300.0))
+case("db.price_observations")(lambda ctx: db.price_observations(ctx.gpu_id))
+case("db.observation_counts")(lambda ctx: db.observation_counts())
+case("db.list_profiles")(lambda ctx: db.list_profiles())
+case("db.get_profile")(lambda ctx: db.get_profile(1))
+case("db.iter_listings_export")(lambda ctx: sum(map(len, db.iter_listings_export())))
+case("db.cold_listings")(lambda ctx: db.cold_listings(int(time.time()) - 180 * 86400, 5000))
+case("db.cold_outliers")(lambda ctx: db.cold_outliers(int(time.time()) - 180 * 86400, 5000))
+case("db.traffic_stats[30]")(lambda ctx: db.traffic_stats(30))
+
+# ── Cases: services ───────────────────────────────────────────────────
+
+case("services.public_gpu_list")(lambda ctx: services.public_gpu_list())
+case("services.data_stats")(lambda ctx: services.data_stats())
+case("services.scatter_datasets[30]")(lambda ctx: services.scatter_datasets(30))
+case("services.scatter_datasets[all]")(lambda ctx: services.scatter_datasets(None))
+case("services.filtered_results")(lambda ctx: services.filtered_results(min_vram=12, max_price=1500))
+case("services.filtered_results[default]")(lambda ctx: services.filtered_results())
+case("services.stream_results")(lambda ctx: _consume(services.stream_results(min_vram=12, max_price=1500)))
+case("services.price_series[1y,300]")(lambda ctx: services.price_series(ctx.gpu_id, "min", "1y", points=300))
+case("services.compare_price_series[8,all]")(lambda ctx: services.compare_price_series(ctx.gpu_ids, "avg", "all"))
+case("services.dashboard_bootstrap")(lambda ctx: services.dashboard_bootstrap(points=300))
+case("services.export_listings_csv")(lambda ctx: _consume(services.export_listings_csv()))
+
+
+# ── Cases: db writes (small, repeatable) ──────────────────────────────
+
+
+@case("db.save_listing[new]")
+def _save_new(ctx):
+    n = time.perf_counter_ns()
+    db.save_listing(ctx.gpu_id, {"id": f"bench{n}", "title": f"bench {n}", "price": 321.0,
+                                 "link": f"bench/{n}", "date": datetime.now().date().isoformat()})
+
+
+case("db.save_listing[seen]")(lambda ctx: db.save_listing(
+    ctx.gpu_id, {"id": "bench-seen", "title": "bench seen", "price": 321.0, "link": "bench/seen", "date": None}))
+case("db.mark_active_listings")(lambda ctx: db.mark_active_listings(ctx.gpu_ids[-1], {"bench-seen"}))
+case("db.update_listing")(lambda ctx: db.update_listing(ctx.listing_pk, {"active": 1}))
+case("db.set_setting")(lambda ctx: db.set_setting("bench", str(time.time())))
+case("db.bump_setting_counter")(lambda ctx: db.bump_setting_counter("bench_counter"))
+case("db.acquire_lease+release_lease", covers=("acquire_lease", "release_lease"))(
+    lambda ctx: (db.acquire_lease("bench", "me", 30), db.release_lease("bench", "me")))
+case("db.start_cycle+finish_cycle", covers=("start_cycle", "finish_cycle"))(
+    lambda ctx: db.finish_cycle(db.start_cycle(), 0))
+case("db.save_profile")(lambda ctx: db.save_profile(
+    target="cycle", mode="sample", cycle=None, started_at=int(time.time()), seconds=1.0, samples=200,
+    report="", pstats=None, collapsed=b""))
+case("db.record_page_view")(lambda ctx: db.record_page_view("/", "10.0.0.1", "bench"))
+case("db.record_page_views[100]")(lambda ctx: db.record_page_views(
+    [("/", f"10.0.0.{i}", "bench", datetime.now(timezone.utc).replace(tzinfo=None).isoformat()) for i in range(100)]))
+case("db.update_gpu")(lambda ctx: db.update_gpu(ctx.gpu_id, {"tokens_tested": 1}))
+
+
+@case("db.add_gpu")
+def _add_gpu(ctx):
+    n = time.perf_counter_ns()
+    db.add_gpu(db.GPU(id=f"bench-{n}", name=f"Bench {n}", tokens_sec=1.0, vram=1, search_queries=["bench"]))
+
+
+def _mark_restored(ctx):
+    db._main.submit(lambda: db._conn().execute("UPDATE listings SET user_restored = 1 WHERE id = ?",
+                                               (ctx.listing_pk,))).result()
+
+# ── Cases: db writes (bulk, fresh database per run) ───────────────────
+
+case("db.sweep_outliers", fresh=True)(lambda ctx: db.sweep_outliers())
+case("db.dedup_tables", fresh=True)(lambda ctx: db.dedup_tables())
+case("db.revalidate_listings", fresh=True)(lambda ctx: db.revalidate_listings())
+case("db.revalidate_outliers", fresh=True)(lambda ctx: db.revalidate_outliers())
+case("db.delete_listings_by_gpu", fresh=True)(lambda ctx: db.delete_listings_by_gpu(ctx.gpu_id))
+case("db.delete_gpu", fresh=True)(lambda ctx: db.delete_gpu(ctx.gpu_id))
+case("db.delete_listing", fresh=True)(lambda ctx: db.delete_listing(ctx.listing_pk))
+case("db.save_as_outlier", fresh=True)(lambda ctx: db.save_as_outlier(
+    ctx.gpu_id, {"id": "bench-out", "title": "bench outlier", "price": 5000.0, "link": "x", "date": None}, "bench"))
+case("db.restore_outlier", fresh=True)(lambda ctx: db.restore_outlier(ctx.outlier_pk))
+case("db.unrestore_listing", fresh=True, prepare=_mark_restored)(lambda ctx: db.unrestore_listing(ctx.listing_pk))
+case("db.delete_outlier", fresh=True)(lambda ctx: db.delete_outlier(ctx.outlier_pk))
+case("db.prune_page_views", fresh=True)(lambda ctx: db.prune_page_views())
+case("db.delete_archived", fresh=True)(lambda ctx: db.delete_archived(
+    "listings", [r["id"] for r in db.cold_listings(int(time.time()) - 180 * 86400, 5000)]))
+case("maintenance.run_maintenance", fresh=True,
+     covers=("analyze", "incremental_vacuum", "checkpoint"))(lambda ctx: maintenance.run_maintenance())
+
+# ── Running ───────────────────────────────────────────────────────────
+
+def _dataset(rows: int, seed: int) -> Path:
+    # Keyed by schema version too: a cached copy carries its schema and planner stats
+    path = CACHE_DIR / f"{rows}-seed{seed}-v{synth.GENERATOR_VERSION}-s{db.SCHEMA_VERSION}"
+    if not (path / "summary.json").exists():
+        print(f"Building {rows:,}-listing database in {path} ...", flush=True)
+        summary = synth.build(path, listings=rows, seed=seed)
+        (path / "summary.json").write_text(json.dumps(summary, indent=1))
+    return path
+
+
+def _use_copy(dataset: Path, work: Path):
+    """Point the package at a fresh copy of *dataset* in *work*."""
+    db.close_connections()
+    shutil.rmtree(work, ignore_errors=True)
+    work.mkdir(parents=True)
+    for name in ("gpuutje.db", "analytics.db"):
+        shutil.copyfile(dataset / name, work / name)
+    db.DB_PATH, db.ANALYTICS_DB_PATH = work / "gpuutje.db", work / "analytics.db"
+    archive.ARCHIVE_DIR = work / "archive"
+    refresh_catalog()
+
+
+def _summary(times: list[float]) -> dict:
+    ms = sorted(t * 1000 for t in times)
+    return {
+        "runs": len(ms),
+        "min": round(ms[0], 3),
+        "median": round(statistics.median(ms), 3),
+        "mean": round(statistics.fmean(ms), 3),
+        "p95": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        "max": round(ms[-1], 3),
+    }
+
+
+def _time(c: Case, ctx: Context) -> float:
+    if c.prepare:
+        c.prepare(ctx)
+    start = time.perf_counter()
+    c.fn(ctx)
+    return time.perf_counter() - start
+
+
+def run_scale(rows: int, *, repeat: int, seed: int, work: Path, only: str = "") -> dict:
+    dataset = _dataset(rows, seed)
+    cases = [c for c in CASES if only in c.name]
+    results: dict[str, dict] = {}
+
+    _use_copy(dataset, work)
+    ctx = Context.load()
+    for c in (c for c in cases if not c.fresh):
+        try:
+            _time(c, ctx)  # warm-up: page cache, statement cache, imports
+            results[c.name] = _summary([_time(c, ctx) for _ in range(repeat)])
+        except Exception as e:
+            results[c.name] = {"error": f"{type(e).__name__}: {e}"}
+        print(f"  {rows:>9,}  {c.name:<40} {results[c.name].get('median', results[c.name].get('error'))}", flush=True)
+
+    for c in (c for c in cases if c.fresh):
+        times = []
+        try:
+            for _ in range(repeat):
+                _use_copy(dataset, work)
+                times.append(_time(c, Context.load()))
+            results[c.name] = _summary(times)
+        except Exception as e:
+            results[c.name] = {"error": f"{type(e).__name__}: {e}"}
+        print(f"  {rows:>9,}  {c.name:<40} {results[c.name].get('median', results[c.name].get('error'))}", flush=True)
+
+    db.close_connections()
+    shutil.rmtree(work, ignore_errors=True)
+    return {"dataset": json.loads((dataset / "summary.json").read_text()), "cases": results}
+
+
+def uncovered() -> list[str]:
+    """Public functions of ``db`` that no case measures."""
+    public = {name for name, fn in inspect.getmembers(db, inspect.isfunction)
+              if fn.__module__ == db.__name__ and not name.startswith("_")}
+    covered = {name for c in CASES for name in c.covers}
+    return sorted(public - covered - {"close_connections", "init_analytics_db"})
+
+
+def _git(*args) -> str | None:
+    try:
+        return subprocess.run(["git", *args], cwd=HERE, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scales: list[int], *, repeat: int = DEFAULT_REPEAT, seed: int = 1, only: str = "") -> dict:
+    saved = db.DB_PATH, db.ANALYTICS_DB_PATH, archive.ARCHIVE_DIR
+    work = CACHE_DIR / "work"
+    try:
+        results = {str(rows): run_scale(rows, repeat=repeat, seed=seed, work=work, only=only) for rows in scales}
+    finally:
+        db.close_connections()
+        db.DB_PATH, db.ANALYTICS_DB_PATH, archive.ARCHIVE_DIR = saved
+        refresh_catalog()
+    return {
+        "meta": {
+            "commit": _git("rev-parse", "--short", "HEAD"),
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "uncovered": uncovered(),
+        "scales": results,
+    }
+
+
+def compare(old_path: Path, new_path: Path, threshold: float) -> int:
+    """Print median ratios (new / old); returns the number of regressions past *threshold*."""
+    old, new = json.loads(old_path.read_text()), json.loads(new_path.read_text())
+    print(f"{old['meta']['commit']} -> {new['meta']['commit']}  (median ms, ratio > {threshold} flagged)")
+    regressions = 0
+    for scale, result in new["scales"].items():
+        before = old["scales"].get(scale, {}).get("cases", {})
+        rows = []
+        for name, stats in result["cases"].items():
+            if "median" in stats and "median" in before.get(name, {}):
+                ratio = stats["median"] / before[name]["median"] if before[name]["median"] else 1.0
+                rows.append((ratio, name, before[name]["median"], stats["median"]))
+        print(f"\n{int(scale):,} listings")
+        for ratio, name, a, b in sorted(rows, reverse=True):
+            flag = "  <-- slower" if ratio > threshold else ""
+            regressions += bool(flag)
+            print(f"  {name:<40} {a:>10.2f} {b:>10.2f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="listing counts, e.g. 10k,100k,1m")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", default="", help="run cases whose name contains this")
+    parser.add_argument("--out", type=Path, help="JSON output (default: bench-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("OLD", "NEW"))
+    parser.add_argument("--threshold", type=float, default=1.25, help="ratio --compare flags as slower")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    result = run([synth.parse_count(s) for s in args.scales.split(",")],
+                 repeat=args.repeat, seed=args.seed, only=args.only)
+    out = args.out or Path(f"bench-{result['meta']['commit'] or 'local'}.json")
+    out.write_text(json.dumps(result, indent=1))
+    if result["uncovered"]:
+        print(f"No case for: {', '.join(result['uncovered'])}")
+    print(f"Wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""Synthetic databases of any size for benchmarks and load tests.
+
+Builds a main and an analytics database with the current schema (via
+``db.init_db``) and fills them with data shaped like production:
+
+* the GPU catalog of the checked-in ``data/gpuutje.db``, with a base price
+  per GPU taken from its real listings (or estimated from VRAM and
+  tokens/s when it has none),
+* log-normally distributed prices that drift down as listings age, mostly
+  rounded to five euros,
+* listing dates skewed towards the last weeks, recent listings mostly
+  active, older ones inactive,
+* reposts that share a listing id and link with an earlier row (what
+  ``dedup_tables`` removes), titles filed under the wrong GPU (what
+  ``revalidate_listings`` corrects), far-off prices still among the
+  listings (what ``sweep_outliers`` moves) plus an outliers table,
+* search cycles with price-change observations,
+* page views with rollups and visitor sketches, written through
+  ``db.record_page_views`` like the live tracker.
+
+:func:`build_cassette` adds a search cassette for the replay backend in
+``search_backends``.  It holds the marketplace's answers to every GPU
+query over a number of cycles, taken from a built database, so the real
+worker can run full cycles offline.
+
+Rows are bulk-inserted through a plain connection, so a million listings
+take well under a minute.  The same arguments and seed give the same
+rows, dated relative to the day of the build::
+
+    python benchmarks/synth.py --listings 1000000 --out /tmp/bench/1m
+"""
+
+import argparse
+import gzip
+import json
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from gpuutje_kopen import db
+from gpuutje_kopen.search_backends import LIMIT
+
+GENERATOR_VERSION = 1  # bump when the output for given arguments changes
+SOURCE_DB = ROOT / "data" / "gpuutje.db"
+
+BRANDS = ("ASUS", "MSI", "Gigabyte", "Zotac", "Palit", "Inno3d", "PNY", "Gainward", "EVGA", "KFA2",
+          "Sapphire", "PowerColor", "XFX", "ASRock", "Nvidia", "Founders Edition")
+WORDS = ("OC", "Gaming", "Twin", "Ventus", "Eagle", "Dual", "TUF", "Strix", "Phoenix", "AMP",
+         "Trinity", "Windforce", "Aero", "Pulse", "Nitro+", "Mini", "White", "Pro", "X3", "Black")
+EXTRAS = ("", "", "Videokaart", "Grafische kaart", "| Nieuwstaat", "met bon", "z.g.a.n.", "incl. doos",
+          "garantie", "| Inruil mogelijk", "getest", "defect?")
+CITIES = ("Amsterdam", "Rotterdam", "Den Haag", "Utrecht", "Eindhoven", "Groningen", "Tilburg", "Almere",
+          "Breda", "Nijmegen", "Apeldoorn", "Haarlem", "Arnhem", "Enschede", "Amersfoort", "Zwolle",
+          "Leiden", "Maastricht", "Dordrecht", "Zoetermeer", "Heerenveen", "Nijverdal", "Mussel", "Delft")
+PAGE_PATHS = (("/", 30), ("/api/bootstrap", 25), ("/api/results", 20), ("/api/price-history", 10),
+              ("/api/scatter-data", 6), ("/api/gpus", 4), ("/api/stats", 3), ("/static/app.js", 2))
+
+_EPOCH_DAY = date(1970, 1, 1)  # listed_day counts days from here
+OUTLIER_REASONS = ("price €{p} is {d}% below mean €{m}", "price €{p} is {d}% above mean €{m}")
+
+
+def _source_gpus() -> list[dict]:
+    """GPU rows and median listing price (cents or None) from the checked-in database."""
+    c = sqlite3.connect(f"file:{SOURCE_DB}?mode=ro", uri=True)
+    try:
+        cols = {r[1] for r in c.execute("PRAGMA table_info(listings)")}
+        if "gpu_id" in cols:  # not migrated yet
+            prices = "SELECT gpu_id, CAST(price * 100 AS INTEGER) FROM listings"
+        else:
+            prices = "SELECT g.id, l.price_cents FROM listings l JOIN gpus g ON g.pk = l.gpu"
+        by_gpu: dict[str, list[int]] = {}
+        for gpu_id, cents in c.execute(prices):
+            if cents:
+                by_gpu.setdefault(gpu_id, []).append(cents)
+        rows = c.execute("SELECT id, name, tokens_sec, vram, search_queries, tokens_tested FROM gpus ORDER BY id")
+        return [
+            {"id": i, "name": n, "tokens_sec": t, "vram": v, "search_queries": q, "tokens_tested": tt,
+             "median_cents": int(np.median(by_gpu[i])) if i in by_gpu else None}
+            for i, n, t, v, q, tt in rows
+        ]
+    finally:
+        c.close()
+
+
+def _base_cents(gpu: dict) -> int:
+    if gpu["median_cents"]:
+        return gpu["median_cents"]
+    return int(max(150, 30 * gpu["vram"] + 3 * gpu["tokens_sec"]) * 100)
+
+
+def _titles(rng: np.random.Generator, names: np.ndarray) -> list[str]:
+    brand = rng.choice(BRANDS, len(names))
+    word = rng.choice(WORDS, len(names))
+    extra = rng.choice(EXTRAS, len(names))
+    vram = rng.random(len(names)) < 0.4
+    return [f"{b} {n} {w}{' ' + e if e else ''}{' %dGB' % g if v else ''}".strip()
+            for b, n, w, e, v, g in zip(brand, names, word, extra, vram, rng.integers(8, 25, len(names)))]
+
+
+def _listing_rows(rng, gpus, n, days, today, dup_rate, misfiled_rate, outlier_rate):
+    k = len(gpus)
+    weights = rng.pareto(1.2, k) + 0.2  # a few popular GPUs, a long tail
+    gpu_idx = rng.choice(k, n, p=weights / weights.sum())
+    listing_ids = [f"m{2_300_000_000 + i}" for i in range(n)]
+    reposts = np.flatnonzero(rng.random(n) < dup_rate)
+    for i in reposts[reposts > 0]:
+        j = int(rng.integers(0, i))
+        listing_ids[i] = listing_ids[j]
+        gpu_idx[i] = gpu_idx[j]
+    age = np.minimum(rng.exponential(days / 4, n).astype(np.int64), days - 1)
+    base = np.array([_base_cents(g) for g in gpus])[gpu_idx]
+    cents = base * np.exp(rng.normal(0, 0.18, n)) * (1 + 0.15 * age / 365)
+    far = rng.random(n) < outlier_rate
+    cents[far] *= rng.choice([0.15, 0.25, 3.0, 5.0], far.sum())
+    rounded = rng.random(n) < 0.7
+    cents = np.where(rounded, np.round(cents / 500) * 500, np.round(cents / 100) * 100).astype(np.int64)
+    cents = np.maximum(cents, 15000)
+    listed_day = today - age
+    seen_at = (listed_day * 86400 + rng.integers(0, 86400, n)
+               + (rng.random(n) * np.minimum(age, 30)).astype(np.int64) * 86400)
+    active = np.where(age < 21, rng.random(n) < 0.7, rng.random(n) < 0.02).astype(np.int64)
+
+    names = np.array([g["name"] for g in gpus])
+    title_idx = gpu_idx.copy()
+    misfiled = rng.random(n) < misfiled_rate
+    title_idx[misfiled] = rng.integers(0, k, misfiled.sum())
+    titles = _titles(rng, names[title_idx])
+
+    cities = rng.choice(CITIES, n)
+    pks = np.array([g["pk"] for g in gpus])[gpu_idx]
+    return [
+        (int(pks[i]), listing_ids[i], titles[i], int(cents[i]), f"https://link.marktplaats.nl/{listing_ids[i]}",
+         int(listed_day[i]), str(cities[i]), int(seen_at[i]), int(active[i]))
+        for i in range(n)
+    ]
+
+
+def _outlier_rows(rng, gpus, n, days, today):
+    rows = []
+    for i in range(n):
+        gpu = gpus[int(rng.integers(0, len(gpus)))]
+        mean = _base_cents(gpu) // 100
+        factor = float(rng.choice([0.2, 0.3, 3.0, 4.5]))
+        price = max(150, int(mean * factor))
+        reason = OUTLIER_REASONS[factor > 1].format(p=price, d=int(abs(factor - 1) * 100), m=mean)
+        day = today - int(rng.integers(0, days))
+        seen = day * 86400 + int(rng.integers(0, 86400))
+        rows.append((gpu["id"], f"m{1_900_000_000 + i}", f"{rng.choice(BRANDS)} {gpu['name']} {i}", price * 100,
+                     f"https://link.marktplaats.nl/m{1_900_000_000 + i}", day, str(rng.choice(CITIES)),
+                     seen, 0, reason, seen + 3600))
+    return rows
+
+
+def _observations(c, rng, days, now, rate):
+    """Four cycles a day over *days*, plus price changes for a sample of listings."""
+    cycles = days * 4
+    start = now - days * 86400
+    c.executemany("INSERT INTO cycles (id, started_at, finished_at, listings) VALUES (?,?,?,?)",
+                  ((i + 1, start + i * 21600, start + i * 21600 + 300, 0) for i in range(cycles)))
+    sample = c.execute(
+        "SELECT gpu, listing_id, price_cents, seen_at FROM listings WHERE listing_id IS NOT NULL "
+        "AND id % ? = 0 GROUP BY gpu, listing_id", (max(1, round(1 / rate)),)
+    ).fetchall()
+    for key, (gpu, listing_id, cents, seen_at) in enumerate(sample, 1):
+        c.execute("INSERT INTO listing_keys (id, gpu, listing_id) VALUES (?,?,?)", (key, gpu, listing_id))
+        last = max(1, min(cycles, (seen_at - start) // 21600))
+        first = max(1, last - int(rng.integers(1, 40)))
+        changes = sorted({first, *rng.integers(first, last + 1, int(rng.integers(0, 3)))})
+        price = int(cents * (1 + 0.05 * len(changes)))
+        for cycle in changes:
+            c.execute("INSERT OR IGNORE INTO observations (listing, cycle, price_cents) VALUES (?,?,?)",
+                      (key, int(cycle), price))
+            price = int(price * 0.95)
+
+
+def _page_views(rng, n, now: datetime, visitors: int, days: int = 30):
+    paths = [p for p, _ in PAGE_PATHS]
+    weights = np.array([w for _, w in PAGE_PATHS], dtype=float)
+    path_idx = rng.choice(len(paths), n, p=weights / weights.sum())
+    ips = rng.integers(0, visitors, n)
+    offsets = np.sort(rng.random(n) * days * 86400)
+    start = now - timedelta(days=days)
+    batch = []
+    for p, ip, off in zip(path_idx, ips, offsets):
+        ts = (start + timedelta(seconds=float(off))).isoformat()
+        batch.append((paths[p], f"10.{ip >> 16 & 255}.{ip >> 8 & 255}.{ip & 255}", "Mozilla/5.0 (bench)", ts))
+        if len(batch) == 5000:
+            db.record_page_views(batch)
+            batch = []
+    if batch:
+        db.record_page_views(batch)
+
+
+def build(
+    out: Path,
+    *,
+    listings: int = 100_000,
+    outliers: int | None = None,
+    page_views: int | None = None,
+    days: int = 730,
+    dup_rate: float = 0.01,
+    misfiled_rate: float = 0.005,
+    outlier_rate: float = 0.02,
+    observed_rate: float = 0.1,
+    seed: int = 1,
+    analyze: bool = True,
+) -> dict:
+    """Create ``gpuutje.db`` and ``analytics.db`` in *out*; returns a summary of what went in."""
+    started = time.perf_counter()
+    out.mkdir(parents=True, exist_ok=True)
+    for name in ("gpuutje.db", "analytics.db"):
+        for suffix in ("", "-wal", "-shm"):
+            (out / (name + suffix)).unlink(missing_ok=True)
+    outliers = listings // 50 if outliers is None else outliers
+    page_views = min(listings // 2, 200_000) if page_views is None else page_views
+    rng = np.random.default_rng(seed)
+    now = int(time.time())
+    today = now // 86400
+
+    saved = db.DB_PATH, db.ANALYTICS_DB_PATH
+    db.close_connections()
+    db.DB_PATH, db.ANALYTICS_DB_PATH = out / "gpuutje.db", out / "analytics.db"
+    try:
+        db.init_db()
+        _page_views(rng, page_views, datetime.now(timezone.utc).replace(tzinfo=None), visitors=max(50, page_views // 20))
+        db.close_connections()
+
+        c = sqlite3.connect(out / "gpuutje.db", isolation_level=None)
+        c.execute("PRAGMA synchronous=OFF")
+        c.execute("BEGIN")
+        gpus = _source_gpus()
+        c.executemany(
+            "INSERT INTO gpus (id, name, tokens_sec, vram, search_queries, tokens_tested) VALUES (?,?,?,?,?,?)",
+            ((g["id"], g["name"], g["tokens_sec"], g["vram"], g["search_queries"], g["tokens_tested"]) for g in gpus),
+        )
+        pk = dict(c.execute("SELECT id, pk FROM gpus"))
+        for g in gpus:
+            g["pk"] = pk[g["id"]]
+        c.executemany(
+            "INSERT OR IGNORE INTO listings (gpu, listing_id, title, price_cents, link, listed_day, location, "
+            "seen_at, active) VALUES (?,?,?,?,?,?,?,?,?)",
+            _listing_rows(rng, gpus, listings, days, today, dup_rate, misfiled_rate, outlier_rate),
+        )
+        c.executemany(
+            "INSERT OR IGNORE INTO outliers (gpu_id, listing_id, title, price_cents, link, listed_day, location, "
+            "seen_at, active, reason, moved_at) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+            _outlier_rows(rng, gpus, outliers, days, today),
+        )
+        _observations(c, rng, days, now, observed_rate)
+        c.execute("COMMIT")
+        if analyze:  # what the daily maintenance leaves behind
+            c.execute("PRAGMA analysis_limit=%d" % db.ANALYSIS_LIMIT)
+            c.execute("ANALYZE")
+        c.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        summary = {
+            "generator_version": GENERATOR_VERSION,
+            "seed": seed,
+            "gpus": len(gpus),
+            "listings": c.execute("SELECT COUNT(*) FROM listings").fetchone()[0],
+            "outliers": c.execute("SELECT COUNT(*) FROM outliers").fetchone()[0],
+            "observations": c.execute("SELECT COUNT(*) FROM observations").fetchone()[0],
+            "page_views": page_views,
+            "bytes": (out / "gpuutje.db").stat().st_size,
+            "seconds": 0.0,
+        }
+        c.close()
+    finally:
+        db.close_connections()
+        db.DB_PATH, db.ANALYTICS_DB_PATH = saved
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+def build_cassette(dataset: Path, out: Path, *, cycles: int = 10, latency: float = 0.3, drop_rate: float = 0.05,
+                   new_per_query: int = 3, seed: int = 1) -> dict:
+    """Write a search cassette answering every GPU query in *dataset* for *cycles* cycles.
+
+    Each response re-reports up to ``LIMIT`` of the GPU's active listings,
+    a *drop_rate* share of them cheaper than the cycle before, plus
+    *new_per_query* new listings.  Replayed, a cycle saves, revalidates,
+    sweeps and publishes the way it does in production.
+    """
+    rng = np.random.default_rng(seed)
+    today = date.today().isoformat()
+    next_id = 3_000_000_000
+    responses = 0
+    c = sqlite3.connect(f"file:{dataset / 'gpuutje.db'}?mode=ro", uri=True)
+    try:
+        gpus = c.execute("SELECT pk, search_queries FROM gpus ORDER BY pk").fetchall()
+        current = {}
+        for pk, queries in gpus:
+            rows = c.execute(
+                "SELECT listing_id, title, price_cents, link, listed_day, location FROM listings "
+                "WHERE gpu = ? AND active = 1 ORDER BY seen_at DESC LIMIT ?", (pk, LIMIT - new_per_query),
+            ).fetchall()
+            current[pk] = [
+                {"id": lid, "title": title, "price": cents / 100, "link": link,
+                 "date": (_EPOCH_DAY + timedelta(days=day)).isoformat() if day is not None else None, "city": city}
+                for lid, title, cents, link, day, city in rows
+            ]
+    finally:
+        c.close()
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(out, "wt", encoding="utf-8") as f:
+        for _ in range(cycles):
+            for pk, queries in gpus:
+                listings = current[pk]
+                for listing in listings:
+                    if rng.random() < drop_rate:
+                        listing["price"] = float(round(listing["price"] * rng.uniform(0.8, 0.95)))
+                for query in json.loads(queries or "[]"):
+                    new = []
+                    for i in rng.choice(len(listings), min(new_per_query, len(listings)), replace=False):
+                        base = listings[int(i)]
+                        lid = f"m{next_id}"
+                        next_id += 1
+                        new.append({**base, "id": lid, "link": f"https://link.marktplaats.nl/{lid}", "date": today,
+                                    "price": float(round(base["price"] * rng.uniform(0.9, 1.1) / 5) * 5)})
+                    f.write(json.dumps({"query": query, "seconds": latency, "listings": listings + new},
+                                       ensure_ascii=False) + "\n")
+                    responses += 1
+    return {"cycles": cycles, "responses": responses, "bytes": out.stat().st_size}
+
+
+def parse_count(text: str) -> int:
+    """``"250k"`` → 250000, ``"1m"`` → 1000000."""
+    text = text.strip().lower().replace("_", "")
+    for suffix, factor in (("k", 1_000), ("m", 1_000_000)):
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * factor)
+    return int(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", type=Path, required=True, help="directory for gpuutje.db and analytics.db")
+    parser.add_argument("--listings", type=parse_count, default=100_000)
+    parser.add_argument("--outliers", type=parse_count, help="default: listings / 50")
+    parser.add_argument("--page-views", type=parse_count, help="default: listings / 2, at most 200k")
+    parser.add_argument("--days", type=int, default=730, help="history span")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-analyze", dest="analyze", action="store_false", help="leave planner statistics out")
+    parser.add_argument("--cassette-cycles", type=int, default=0, metavar="N",
+                        help="also write N cycles of search responses to search.jsonl.gz")
+    args = parser.parse_args(argv)
+    summary = build(args.out, listings=args.listings, outliers=args.outliers, page_views=args.page_views,
+                    days=args.days, seed=args.seed, analyze=args.analyze)
+    if args.cassette_cycles:
+        summary["cassette"] = build_cassette(args.out, args.out / "search.jsonl.gz",
+                                             cycles=args.cassette_cycles, seed=args.seed)
+    print(json.dumps(summary, indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,8 @@
 # ──────────────────────────────────────────────────────────────────────
 # Docker entrypoint for GPUutje Kopen
 #
-# Ensures the database exists and schema is up to date, then starts
-# the application.
+# Ensures the database exists and applies pending schema migrations,
+# then starts the application.
 # ──────────────────────────────────────────────────────────────────────
 
 set -e
@@ -21,9 +21,11 @@ python -c "
 import sys
 sys.path.insert(0, '/app/src')
 import gpuutje_kopen.db as db
-db.init_db()
-gpus = db._conn().execute('SELECT COUNT(*) FROM gpus').fetchone()[0]
-print(f'[entrypoint] Database ready — {gpus} GPUs')
+version = db.init_db()
+with db._read() as c:
+    gpus = c.execute('SELECT COUNT(*) FROM gpus').fetchone()[0]
+db.close_connections()  # checkpoint the WAL before the app starts
+print(f'[entrypoint] Database ready — schema v{version}, {gpus} GPUs')
 "
 
 echo "[entrypoint] Starting application..."
@@ -1,6 +1,3 @@
 """GPUutje Kopen - GPU price tracker from Marktplaats."""
 
 __version__ = "0.1.0"
-
-from .db import init_db as _init_db
-_init_db()
@@ -0,0 +1,249 @@
+"""Cold-history archive: old inactive rows moved out of SQLite into Parquet.
+
+Inactive listings not seen for ``archive_after_days`` (a setting, 0 turns
+archival off) and outliers flagged that long ago are written to one
+zstd-compressed Parquet file per table and month, then deleted from the
+hot tables::
+
+    data/archive/manifest.json
+    data/archive/listings/2025-11.parquet
+    data/archive/outliers/2025-11.parquet
+
+Rows keep the compact integer columns of the hot tables, plus the GPU slug
+instead of its surrogate key.  A row's month is that of its listing date,
+or of when it was last seen if it has none.  The manifest records the row
+count and listing-day range of each file.  Readers use the manifest to
+skip files older than their cutoff, and read the rest memory-mapped.
+Files and the manifest are replaced atomically and merged by row id, so a
+run interrupted before its delete simply rewrites the same rows next time.
+
+Writing and reading need ``pyarrow`` (pandas' Parquet engine), a declared
+dependency.  Should it be missing anyway, archival is skipped, but reading
+an archive that has files raises :class:`ArchiveUnreadable` rather than
+quietly leaving the archived rows out of history and exports.
+"""
+
+import json
+import logging
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from threading import Lock
+
+import pandas as pd
+
+from .db import (
+    ARCHIVE_AFTER_DAYS,
+    cold_listings,
+    cold_outliers,
+    delete_archived,
+    get_setting,
+    set_setting,
+)
+from .files import write_atomic
+
+try:
+    import pyarrow.parquet  # noqa: F401  (pandas' Parquet engine)
+except ImportError:  # archival is skipped; reading existing files raises
+    HAVE_PARQUET = False
+else:
+    HAVE_PARQUET = True
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_DIR = Path("data/archive")
+ARCHIVE_BATCH = 5000        # rows moved per round
+ARCHIVE_INTERVAL = 86400    # seconds between automatic runs
+LAST_RUN_KEY = "archive_last_run"
+
+MANIFEST = "manifest.json"
+_EPOCH = date(1970, 1, 1)
+_INT_COLUMNS = {"id": "int64", "price_cents": "Int64", "listed_day": "Int64", "seen_at": "int64",
+                "active": "int8", "user_restored": "int8", "moved_at": "int64"}
+_SOURCES = {"listings": cold_listings, "outliers": cold_outliers}
+
+
+class ArchiveUnreadable(RuntimeError):
+    """The archive has files but ``pyarrow`` is not installed to read them."""
+
+
+def read_manifest(root: Path | None = None) -> dict:
+    try:
+        return json.loads(((root or ARCHIVE_DIR) / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return {"files": {}}
+
+
+def _write_manifest(root: Path, manifest: dict):
+    manifest["updated_at"] = datetime.now().isoformat()
+    body = json.dumps(manifest, indent=1, sort_keys=True)
+    write_atomic(root / MANIFEST, lambda p: p.write_text(body))
+
+
+# ── Archiving ─────────────────────────────────────────────────────────
+
+def _archive_after_days() -> int:
+    try:
+        return int(get_setting("archive_after_days", str(ARCHIVE_AFTER_DAYS)))
+    except (ValueError, TypeError):
+        return ARCHIVE_AFTER_DAYS
+
+
+def _month_of(df: pd.DataFrame) -> pd.Series:
+    day = df["listed_day"].fillna(df["seen_at"] // 86400).astype("int64")
+    return pd.to_datetime(day, unit="D").dt.strftime("%Y-%m")
+
+
+def _append(root: Path, table: str, rows: list[dict], manifest: dict):
+    """Merge *rows* into their month files and update *manifest* in place."""
+    df = pd.DataFrame(rows).astype({k: v for k, v in _INT_COLUMNS.items() if k in rows[0]})
+    for month, part in df.groupby(_month_of(df)):
+        rel = f"{table}/{month}.parquet"
+        path = root / rel
+        if path.exists():
+            old = pd.read_parquet(path, engine="pyarrow", memory_map=True)
+            part = pd.concat([old[~old["id"].isin(part["id"])], part], ignore_index=True)
+        part = part.sort_values("id")
+        write_atomic(path, lambda p: part.to_parquet(p, engine="pyarrow", compression="zstd", index=False))
+        days = part["listed_day"].fillna(part["seen_at"] // 86400)
+        manifest["files"][rel] = {
+            "rows": len(part),
+            "bytes": path.stat().st_size,
+            "min_day": int(days.min()),
+            "max_day": int(days.max()),
+        }
+
+
+_archive_lock = Lock()
+
+
+def archive_cold_rows(root: Path | None = None) -> dict:
+    """Move cold rows into the archive. Returns counts per table."""
+    if not HAVE_PARQUET:
+        return {"skipped": "pyarrow is not installed"}
+    days = _archive_after_days()
+    if days <= 0:
+        return {"skipped": "archival is disabled"}
+    root = root or ARCHIVE_DIR
+    cutoff = int(time.time()) - days * 86400
+    summary = {"listings": 0, "outliers": 0}
+    with _archive_lock:
+        manifest = read_manifest(root)
+        for table, fetch in _SOURCES.items():
+            while rows := fetch(cutoff, ARCHIVE_BATCH):
+                _append(root, table, rows, manifest)
+                _write_manifest(root, manifest)  # rows are safe on disk before they leave SQLite
+                deleted = delete_archived(table, [r["id"] for r in rows])
+                summary[table] += deleted
+                if len(rows) < ARCHIVE_BATCH or not deleted:
+                    break
+    if summary["listings"] or summary["outliers"]:
+        log.info(f"Archived {summary['listings']} listings, {summary['outliers']} outliers")
+    return summary
+
+
+def archive_if_due() -> dict | None:
+    """Run :func:`archive_cold_rows` at most once per ``ARCHIVE_INTERVAL``."""
+    try:
+        last = float(get_setting(LAST_RUN_KEY, "0"))
+    except ValueError:
+        last = 0.0
+    if time.time() - last < ARCHIVE_INTERVAL:
+        return None
+    set_setting(LAST_RUN_KEY, str(time.time()))
+    return archive_cold_rows()
+
+
+# ── Reading ───────────────────────────────────────────────────────────
+
+def _paths(root: Path, table: str, min_day: int = 0) -> list[Path]:
+    """The *table* files that may hold rows on or after *min_day*; raises when they can't be read."""
+    files = read_manifest(root)["files"]
+    paths = [root / rel for rel, meta in sorted(files.items())
+             if rel.startswith(f"{table}/") and meta["max_day"] >= min_day]
+    if paths and not HAVE_PARQUET:
+        raise ArchiveUnreadable(f"{len(paths)} archived {table} files need pyarrow, which is not installed")
+    return paths
+
+
+def reaches(min_day: int, root: Path | None = None) -> bool:
+    """True when archived listings may fall on or after epoch day *min_day*."""
+    return bool(_paths(root or ARCHIVE_DIR, "listings", min_day))
+
+
+def _read(root: Path, table: str, min_day: int, columns: list[str], filters: list) -> pd.DataFrame | None:
+    paths = _paths(root, table, min_day)
+    if not paths:
+        return None
+    frames = [pd.read_parquet(p, engine="pyarrow", columns=columns, filters=filters, memory_map=True)
+              for p in paths]
+    return pd.concat(frames, ignore_index=True)
+
+
+def archived_price_bins(gpu_ids: list[str], cutoff: int, weekly: bool,
+                        root: Path | None = None) -> list[tuple[str, int, int, int, int]]:
+    """Archived (gpu_id, bin_day, min_cents, sum_cents, count), binned like ``db.price_history``."""
+    df = _read(root or ARCHIVE_DIR, "listings", cutoff, ["gpu_id", "listed_day", "price_cents"],
+               [("gpu_id", "in", list(gpu_ids)), ("listed_day", ">=", cutoff)])
+    if df is None:
+        return []
+    df = df.dropna()
+    day = df["listed_day"].astype("int64")
+    df["bin"] = day - 1 - (day + 2) % 7 if weekly else day
+    grouped = df.groupby(["gpu_id", "bin"])["price_cents"].agg(["min", "sum", "count"])
+    return [(gpu_id, int(b), int(lo), int(total), int(n))
+            for (gpu_id, b), lo, total, n in grouped.itertuples(name=None)]
+
+
+def archived_price_totals(cutoff: int, root: Path | None = None) -> dict[str, tuple[int, int]]:
+    """Archived {gpu_id: (sum_cents, count)} for listings dated on or after *cutoff*."""
+    df = _read(root or ARCHIVE_DIR, "listings", cutoff, ["gpu_id", "listed_day", "price_cents"],
+               [("listed_day", ">=", cutoff)])
+    if df is None:
+        return {}
+    grouped = df.dropna().groupby("gpu_id")["price_cents"].agg(["sum", "count"])
+    return {gpu_id: (int(total), int(n)) for gpu_id, total, n in grouped.itertuples(name=None)}
+
+
+def iter_archived_listings(root: Path | None = None):
+    """One batch per archive file of listings in the public row shape.
+
+    The files are looked up on the call, so :class:`ArchiveUnreadable`
+    raises here rather than on the first batch.
+    """
+    return (_public_rows(path) for path in _paths(root or ARCHIVE_DIR, "listings"))
+
+
+def _public_rows(path: Path) -> list[dict]:
+    df = pd.read_parquet(path, engine="pyarrow", memory_map=True)
+    out = pd.DataFrame({
+        "id": df["id"],
+        "gpu_id": df["gpu_id"],
+        "listing_id": df["listing_id"],
+        "title": df["title"],
+        "price": df["price_cents"] / 100,
+        "link": df["link"],
+        "date": [None if pd.isna(d) else (_EPOCH + timedelta(days=int(d))).isoformat()
+                 for d in df["listed_day"]],
+        "location": df["location"],
+        "timestamp": [datetime.fromtimestamp(t).isoformat() for t in df["seen_at"]],
+        "active": df["active"],
+        "user_restored": df["user_restored"],
+    })
+    return out.astype(object).where(out.notna(), None).to_dict("records")
+
+
+def stats(root: Path | None = None) -> dict:
+    manifest = read_manifest(root)
+    rows = {"listings": 0, "outliers": 0}
+    for rel, meta in manifest["files"].items():
+        table = rel.split("/", 1)[0]
+        rows[table] = rows.get(table, 0) + meta["rows"]
+    return {
+        "enabled": HAVE_PARQUET and _archive_after_days() > 0,
+        "after_days": _archive_after_days(),
+        "files": len(manifest["files"]),
+        "bytes": sum(m["bytes"] for m in manifest["files"].values()),
+        "rows": rows,
+        "updated_at": manifest.get("updated_at"),
+    }
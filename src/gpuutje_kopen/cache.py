@@ -0,0 +1,117 @@
+"""Generation-keyed response cache for the public JSON API.
+
+Public data only changes when a search cycle finishes or an admin edits
+something.  Both bump the ``data_generation`` counter in the settings
+table; every cache key includes the generation, so a bump makes all old
+entries unreachable and they age out of the LRU.  Other processes (the
+admin app runs separately) notice a bump within
+``GENERATION_POLL_INTERVAL`` seconds.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from .db import bump_setting_counter, get_setting
+
+log = logging.getLogger(__name__)
+
+GENERATION_KEY = "data_generation"
+GENERATION_POLL_INTERVAL = 2.0    # seconds between generation reads
+CACHE_MAX_ENTRIES = 512
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+
+# ── Data generation ───────────────────────────────────────────────────
+
+_generation = 0
+_generation_checked = 0.0
+_bumped_here: int | None = None  # last generation this process bumped itself
+_generation_lock = Lock()
+
+
+def current_generation() -> int:
+    """Return the data generation, re-reading it at most every poll interval."""
+    global _generation, _generation_checked
+    now = time.monotonic()
+    if now - _generation_checked < GENERATION_POLL_INTERVAL:
+        return _generation
+    with _generation_lock:
+        if now - _generation_checked >= GENERATION_POLL_INTERVAL:
+            try:
+                _generation = int(get_setting(GENERATION_KEY, "0"))
+            except (ValueError, TypeError):
+                pass
+            _generation_checked = now
+    return _generation
+
+
+def bump_generation() -> int:
+    """Mark all cached public data as stale (this process sees it immediately)."""
+    global _generation, _generation_checked, _bumped_here
+    value = bump_setting_counter(GENERATION_KEY)
+    with _generation_lock:
+        _generation = _bumped_here = value
+        _generation_checked = time.monotonic()
+    return value
+
+
+def bumped_here(generation: int) -> bool:
+    """Whether *generation* came from this process's own :func:`bump_generation`."""
+    return generation == _bumped_here
+
+
+# ── LRU cache ─────────────────────────────────────────────────────────
+
+class ResponseCache:
+    """Thread-safe LRU of ``key -> (body, etag)`` bounded by count and bytes."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, tuple[bytes, str]] = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> tuple[bytes, str] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, body: bytes, etag: str):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[key] = (body, etag)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,69 @@
+"""Process-wide GPU catalog snapshot with cheap cross-process invalidation.
+
+The admin app runs in its own process, so an in-memory refresh there is
+invisible to the public app.  GPU mutations bump ``catalog_version`` in
+the settings table (same transaction as the change); every process
+compares that row against its snapshot at most once per
+``CATALOG_POLL_INTERVAL`` seconds and swaps in a fresh immutable
+snapshot when it moved.  Request paths never re-read ``gpus`` themselves.
+"""
+
+import time
+from dataclasses import dataclass
+from threading import Lock
+from types import MappingProxyType
+from typing import Mapping
+
+from .db import GPU, CATALOG_VERSION_KEY, get_setting, load_gpu_list
+
+CATALOG_POLL_INTERVAL = 5.0  # seconds between catalog_version checks
+
+
+@dataclass(frozen=True)
+class Catalog:
+    version: int
+    gpus: tuple[GPU, ...]
+    by_id: Mapping[str, GPU]
+
+
+def _read_version() -> int:
+    try:
+        return int(get_setting(CATALOG_VERSION_KEY, "0"))
+    except (ValueError, TypeError):
+        return 0
+
+
+def _load() -> Catalog:
+    version = _read_version()  # read first: a racing edit only causes one extra reload
+    gpus = tuple(load_gpu_list())
+    return Catalog(version=version, gpus=gpus, by_id=MappingProxyType({g.id: g for g in gpus}))
+
+
+_catalog: Catalog | None = None
+_checked = 0.0
+_lock = Lock()
+
+
+def current_catalog() -> Catalog:
+    """Return the current snapshot, reloading if another process changed it."""
+    global _catalog, _checked
+    now = time.monotonic()
+    catalog = _catalog
+    if catalog is not None and now - _checked < CATALOG_POLL_INTERVAL:
+        return catalog
+    with _lock:
+        if _catalog is None:
+            _catalog = _load()
+        elif now - _checked >= CATALOG_POLL_INTERVAL and _read_version() != _catalog.version:
+            _catalog = _load()
+        _checked = now
+        return _catalog
+
+
+def refresh_catalog() -> Catalog:
+    """Force a reload (e.g. right after a local GPU mutation)."""
+    global _catalog, _checked
+    with _lock:
+        _catalog = _load()
+        _checked = time.monotonic()
+        return _catalog
@@ -4,82 +4,304 @@ import hashlib
 import json
 import logging
 import sqlite3
+import time
 from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from statistics import mean
-from threading import local
+from typing import Callable
+
+from .connections import PRAGMAS, ConnectionManager, open_fd_count
+from .hll import HyperLogLog, merged_count
 
 log = logging.getLogger(__name__)
 
 DB_PATH = Path("data/gpuutje.db")
+ANALYTICS_DB_PATH = Path("data/analytics.db")  # high-churn page-view tables
+
+_main = ConnectionManager(lambda: DB_PATH)
+# Page views live in their own file so traffic bursts never take the
+# main database's writer lock.
+_analytics = ConnectionManager(lambda: ANALYTICS_DB_PATH, writer_pragmas=("auto_vacuum=INCREMENTAL",))
 
-_local = local()
+_writes = _main.writes
+_writes_alone = _main.writes_alone
+_read = _main.read
+_analytics_writes = _analytics.writes
+_analytics_writes_alone = _analytics.writes_alone
+_analytics_read = _analytics.read
 
 
 def _conn() -> sqlite3.Connection:
-    """Return a thread-local connection with WAL mode."""
-    conn = getattr(_local, "conn", None)
-    if conn is None:
-        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-        conn = sqlite3.connect(str(DB_PATH), check_same_thread=False, timeout=30)
-        conn.execute("PRAGMA journal_mode=WAL")
-        conn.execute("PRAGMA foreign_keys=ON")
-        conn.row_factory = sqlite3.Row
-        _local.conn = conn
-    return conn
-
-
-def init_db():
-    """Create tables if they don't exist."""
-    c = _conn()
+    """Return the writer connection (use inside ``@_writes`` functions, never commit)."""
+    return _main.writer()
+
+
+def _analytics_conn() -> sqlite3.Connection:
+    """Return the analytics database's writer connection."""
+    return _analytics.writer()
+
+
+def close_connections():
+    """Close every pooled connection (call on shutdown)."""
+    _main.close()
+    _analytics.close()
+
+
+def connection_stats() -> dict:
+    """Reader/writer pool counters and open file descriptors for this process."""
+    return {
+        "main": _main.stats(),
+        "analytics": _analytics.stats(),
+        "open_fds": open_fd_count(),
+    }
 
-    c.execute("""CREATE TABLE IF NOT EXISTS gpus (
-        id            TEXT PRIMARY KEY,
-        name          TEXT NOT NULL UNIQUE,
-        tokens_sec    REAL NOT NULL DEFAULT 0,
-        vram          INTEGER NOT NULL DEFAULT 0,
-        search_queries TEXT NOT NULL DEFAULT '[]',
-        tokens_tested INTEGER NOT NULL DEFAULT 0
+
+# Listings and outliers store compact integers: GPUs by surrogate key,
+# prices in euro cents, listing dates as days since 1970-01-01 and times
+# as epoch seconds.  The query functions below decode them again, so the
+# JSON API still sees euros, ``YYYY-MM-DD`` dates and ISO timestamps.
+_GPUS_TABLE = """CREATE TABLE IF NOT EXISTS {table} (
+    pk            INTEGER PRIMARY KEY,
+    id            TEXT NOT NULL UNIQUE,
+    name          TEXT NOT NULL UNIQUE,
+    tokens_sec    REAL NOT NULL DEFAULT 0,
+    vram          INTEGER NOT NULL DEFAULT 0,
+    search_queries TEXT NOT NULL DEFAULT '[]',
+    tokens_tested INTEGER NOT NULL DEFAULT 0
+)"""
+
+_LISTINGS_TABLE = """CREATE TABLE IF NOT EXISTS {table} (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    gpu         INTEGER NOT NULL REFERENCES gpus(pk) ON DELETE CASCADE,
+    listing_id  TEXT,
+    title       TEXT NOT NULL,
+    price_cents INTEGER,
+    link        TEXT,
+    listed_day  INTEGER,
+    location    TEXT,
+    seen_at     INTEGER NOT NULL,
+    active      INTEGER NOT NULL DEFAULT 1,
+    user_restored INTEGER NOT NULL DEFAULT 0
+)"""
+
+# Outliers keep the GPU slug: they outlive deleted GPUs and get re-matched
+# by ``revalidate_outliers``.
+_OUTLIERS_TABLE = """CREATE TABLE IF NOT EXISTS {table} (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    gpu_id      TEXT NOT NULL,
+    listing_id  TEXT,
+    title       TEXT NOT NULL,
+    price_cents INTEGER,
+    link        TEXT,
+    listed_day  INTEGER,
+    location    TEXT,
+    seen_at     INTEGER NOT NULL,
+    active      INTEGER NOT NULL DEFAULT 0,
+    reason      TEXT,
+    moved_at    INTEGER NOT NULL
+)"""
+
+
+# ── Schema migrations ─────────────────────────────────────────────────
+#
+# Each database records the last migration applied in ``PRAGMA
+# user_version``.  ``init_db`` compares it with the lists below and returns
+# at once when nothing is pending, so a start-up costs two pragma reads
+# however large the tables are.  Pending migrations are applied in order:
+# consecutive transactional ones together in one ``BEGIN IMMEDIATE`` (a
+# process starting at the same time waits for the lock and then finds the
+# work done), the rest, which need ``VACUUM``, ``ATTACH`` or foreign keys
+# off, on their own and written so a second run is harmless.  Versions 1-5
+# bring any database created before versioning to the current layout.
+#
+# To change the schema, append a migration; never edit one that has shipped.
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[sqlite3.Connection], None]
+    transactional: bool = True  # False: runs outside a transaction and commits itself
+
+
+def _use_incremental_vacuum(c: sqlite3.Connection):
+    """Switch to incremental auto-vacuum so pruning can hand pages back."""
+    if c.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        c.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        c.execute("VACUUM")
+
+
+def _create_schema(c: sqlite3.Connection):
+    c.execute(_GPUS_TABLE.format(table="gpus"))
+    c.execute(_LISTINGS_TABLE.format(table="listings"))
+    c.execute(_OUTLIERS_TABLE.format(table="outliers"))
+
+    # Append-only price log: a row per tracked listing whenever its price
+    # changes, keyed by small integers so the clustered (listing, cycle)
+    # order stores as short, slowly increasing varints.
+    c.execute("""CREATE TABLE IF NOT EXISTS cycles (
+        id          INTEGER PRIMARY KEY,
+        started_at  INTEGER NOT NULL,
+        finished_at INTEGER,
+        listings    INTEGER
     )""")
 
-    c.execute("""CREATE TABLE IF NOT EXISTS listings (
-        id          INTEGER PRIMARY KEY AUTOINCREMENT,
-        gpu_id      TEXT NOT NULL REFERENCES gpus(id) ON DELETE CASCADE,
-        listing_id  TEXT,
-        title       TEXT NOT NULL,
-        price       REAL,
-        link        TEXT,
-        date        TEXT,
-        location    TEXT,
-        timestamp   TEXT NOT NULL,
-        active      INTEGER NOT NULL DEFAULT 1,
-        user_restored INTEGER NOT NULL DEFAULT 0
+    c.execute("""CREATE TABLE IF NOT EXISTS listing_keys (
+        id          INTEGER PRIMARY KEY,
+        gpu         INTEGER NOT NULL REFERENCES gpus(pk) ON DELETE CASCADE,
+        listing_id  TEXT NOT NULL,
+        UNIQUE (gpu, listing_id)
     )""")
 
-    c.execute("CREATE INDEX IF NOT EXISTS idx_listings_gpu    ON listings(gpu_id)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_listings_active ON listings(gpu_id, active)")
-    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_listings_dedup ON listings(gpu_id, title, price)")
-
-    c.execute("""CREATE TABLE IF NOT EXISTS outliers (
-        id          INTEGER PRIMARY KEY AUTOINCREMENT,
-        gpu_id      TEXT NOT NULL,
-        listing_id  TEXT,
-        title       TEXT NOT NULL,
-        price       REAL,
-        link        TEXT,
-        date        TEXT,
-        location    TEXT,
-        timestamp   TEXT NOT NULL,
-        active      INTEGER NOT NULL DEFAULT 0,
-        reason      TEXT,
-        moved_at    TEXT NOT NULL
+    c.execute("""CREATE TABLE IF NOT EXISTS observations (
+        listing     INTEGER NOT NULL REFERENCES listing_keys(id) ON DELETE CASCADE,
+        cycle       INTEGER NOT NULL REFERENCES cycles(id),
+        price_cents INTEGER NOT NULL,
+        PRIMARY KEY (listing, cycle)
+    ) WITHOUT ROWID""")
+
+    c.execute("""CREATE TABLE IF NOT EXISTS settings (
+        key   TEXT PRIMARY KEY,
+        value TEXT NOT NULL
     )""")
 
+    c.execute("""CREATE TABLE IF NOT EXISTS leases (
+        name        TEXT PRIMARY KEY,
+        holder      TEXT NOT NULL,
+        acquired_at REAL NOT NULL,
+        expires_at  REAL NOT NULL
+    )""")
+
+    # (gpu, listed_day, price_cents) covers the price-history and average
+    # scans, and its gpu prefix serves every per-GPU lookup.
+    c.execute("CREATE INDEX IF NOT EXISTS idx_listings_history ON listings(gpu, listed_day, price_cents)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_listings_active  ON listings(gpu, active)")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_listings_dedup ON listings(gpu, title, price_cents)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_listings_lid     ON listings(gpu, listing_id)")
     c.execute("CREATE INDEX IF NOT EXISTS idx_outliers_gpu ON outliers(gpu_id)")
 
-    c.execute("""CREATE TABLE IF NOT EXISTS page_views (
+    # Dedup outliers before creating unique index (handles pre-existing dupes)
+    c.execute("""DELETE FROM outliers WHERE id NOT IN (
+        SELECT MAX(id) FROM outliers GROUP BY gpu_id, title, price_cents
+    )""")
+    c.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_outliers_dedup
+        ON outliers(gpu_id, title, price_cents)""")
+
+
+def _seed_settings(c: sqlite3.Connection):
+    defaults = {
+        "search_interval": "300",
+        "pageview_retention_days": str(PAGEVIEW_RETENTION_DAYS),
+        "pageview_ip_retention_days": str(PAGEVIEW_IP_RETENTION_DAYS),
+        "archive_after_days": str(ARCHIVE_AFTER_DAYS),
+    }
+    c.executemany("INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)", defaults.items())
+
+
+def _create_sort_indexes(c: sqlite3.Connection):
+    """Indexes that hand the result and browse queries their rows already sorted.
+
+    With them ``ORDER BY ... LIMIT`` walks an index and stops after *limit*
+    rows instead of sorting every listing; ``tests/test_query_plans.py``
+    keeps it that way.
+    """
+    c.execute("CREATE INDEX IF NOT EXISTS idx_listings_seen ON listings(seen_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_listings_price ON listings(price_cents)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_listings_restored ON listings(seen_at) WHERE user_restored = 1")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_outliers_moved ON outliers(moved_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_gpus_vram ON gpus(vram)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_gpus_tokens ON gpus(tokens_sec)")
+    # Widened: the cheapest (active first) listing per GPU, and the last price of a listing id
+    c.execute("DROP INDEX IF EXISTS idx_listings_active")
+    c.execute("CREATE INDEX idx_listings_active ON listings(gpu, active DESC, price_cents)")
+    c.execute("DROP INDEX IF EXISTS idx_listings_lid")
+    c.execute("CREATE INDEX idx_listings_lid ON listings(gpu, listing_id, seen_at)")
+
+
+def _create_profiles_table(c: sqlite3.Connection):
+    """Profiles of search cycles and single GPU searches, taken on the admin's request."""
+    c.execute("""CREATE TABLE IF NOT EXISTS profiles (
+        id          INTEGER PRIMARY KEY,
+        target      TEXT NOT NULL,      -- 'cycle' or a GPU id
+        mode        TEXT NOT NULL,      -- 'sample' or 'cprofile'
+        cycle       INTEGER REFERENCES cycles(id),
+        started_at  INTEGER NOT NULL,
+        seconds     REAL NOT NULL,
+        samples     INTEGER NOT NULL,
+        report      TEXT NOT NULL,      -- cProfile top functions, '' when sampled
+        pstats      BLOB,               -- gzipped marshal dump, NULL when sampled
+        collapsed   BLOB NOT NULL       -- gzipped collapsed stacks
+    )""")
+
+
+# ISO text → compact integer expressions used when converting old rows
+_SQL_CENTS = "CAST(ROUND({0} * 100) AS INTEGER)"
+_SQL_DAY = "CAST(strftime('%s', SUBSTR({0}, 1, 10)) AS INTEGER) / 86400"
+_SQL_EPOCH = "CAST(strftime('%s', SUBSTR({0}, 1, 19), 'utc') AS INTEGER)"  # local ISO time → epoch
+
+
+def _compact_listing_tables(c: sqlite3.Connection):
+    """Rebuild gpus, listings and outliers in the compact layout, keeping row ids."""
+    c.commit()
+    c.execute("PRAGMA foreign_keys=OFF")
+    try:
+        c.execute("BEGIN IMMEDIATE")
+        cols = {r[1] for r in c.execute("PRAGMA table_info(listings)").fetchall()}
+        if "gpu_id" not in cols:  # new database, or already converted
+            c.rollback()
+            return
+        if "user_restored" not in cols:
+            c.execute("ALTER TABLE listings ADD COLUMN user_restored INTEGER NOT NULL DEFAULT 0")
+        for table, ddl in (("gpus", _GPUS_TABLE), ("listings", _LISTINGS_TABLE), ("outliers", _OUTLIERS_TABLE)):
+            c.execute(ddl.format(table=f"{table}_new"))
+
+        c.execute("""
+            INSERT INTO gpus_new (id, name, tokens_sec, vram, search_queries, tokens_tested)
+            SELECT id, name, tokens_sec, vram, search_queries, tokens_tested FROM gpus ORDER BY id
+        """)
+        c.execute(f"""
+            INSERT INTO listings_new (id, gpu, listing_id, title, price_cents, link,
+                                      listed_day, location, seen_at, active, user_restored)
+            SELECT l.id, g.pk, l.listing_id, l.title, {_SQL_CENTS.format('l.price')}, l.link,
+                   {_SQL_DAY.format('l.date')}, l.location, {_SQL_EPOCH.format('l.timestamp')},
+                   l.active, l.user_restored
+            FROM listings l JOIN gpus_new g ON g.id = l.gpu_id
+        """)
+        c.execute(f"""
+            INSERT INTO outliers_new (id, gpu_id, listing_id, title, price_cents, link,
+                                      listed_day, location, seen_at, active, reason, moved_at)
+            SELECT id, gpu_id, listing_id, title, {_SQL_CENTS.format('price')}, link,
+                   {_SQL_DAY.format('date')}, location, {_SQL_EPOCH.format('timestamp')},
+                   active, reason, {_SQL_EPOCH.format('moved_at')}
+            FROM outliers
+        """)
+        # Prices that only differed below a cent now collide on the dedup key
+        c.execute("""DELETE FROM listings_new WHERE id NOT IN (
+            SELECT MAX(id) FROM listings_new GROUP BY gpu, title, price_cents
+        )""")
+
+        for table in ("listings", "outliers"):
+            # Carry AUTOINCREMENT counters over so deleted ids are never reused
+            c.execute("""UPDATE sqlite_sequence SET seq = MAX(seq, COALESCE(
+                (SELECT seq FROM sqlite_sequence WHERE name = ?), 0)) WHERE name = ?
+            """, (table, f"{table}_new"))
+        for table in ("listings", "outliers", "gpus"):
+            c.execute(f"DROP TABLE {table}")
+        for table in ("gpus", "listings", "outliers"):
+            c.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+        c.commit()
+    except Exception:
+        c.rollback()
+        raise
+    finally:
+        c.execute("PRAGMA foreign_keys=ON")
+    c.execute("PRAGMA incremental_vacuum").fetchall()
+    log.info("Converted listings and outliers to the compact integer layout")
+
+
+def _create_analytics_schema(a: sqlite3.Connection):
+    a.execute("""CREATE TABLE IF NOT EXISTS page_views (
         id         INTEGER PRIMARY KEY AUTOINCREMENT,
         path       TEXT NOT NULL,
         ip         TEXT,
@@ -87,50 +309,307 @@ def init_db():
         timestamp  TEXT NOT NULL
     )""")
 
-    c.execute("CREATE INDEX IF NOT EXISTS idx_pv_ts   ON page_views(timestamp)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_pv_ip   ON page_views(ip)")
+    a.execute("CREATE INDEX IF NOT EXISTS idx_pv_ts ON page_views(timestamp)")
 
-    c.execute("""CREATE TABLE IF NOT EXISTS settings (
-        key   TEXT PRIMARY KEY,
-        value TEXT NOT NULL
-    )""")
+    # Hourly rollups maintained by record_page_views – traffic_stats reads only these
+    a.execute("""CREATE TABLE IF NOT EXISTS traffic_hourly (
+        hour       TEXT NOT NULL,
+        path       TEXT NOT NULL,
+        path_class TEXT NOT NULL,
+        views      INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (hour, path)
+    ) WITHOUT ROWID""")
+
+    # One HyperLogLog sketch of hashed IPs per day and path class
+    a.execute("""CREATE TABLE IF NOT EXISTS traffic_sketches (
+        day        TEXT NOT NULL,
+        path_class TEXT NOT NULL,
+        sketch     BLOB NOT NULL,
+        PRIMARY KEY (day, path_class)
+    ) WITHOUT ROWID""")
+
+
+@_analytics_writes_alone
+def _move_analytics_tables(c: sqlite3.Connection):
+    """Copy page-view tables out of the main database, then drop them there.
+
+    The copy commits before the drop, so it must be safe to repeat: page
+    views keep their ids, rollups are replaced, and visitor sets merge
+    into HyperLogLog sketches, where a hash added twice changes nothing.
+    """
+    present = {r[0] for r in c.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' "
+        "AND name IN ('page_views','traffic_hourly','traffic_sketches','traffic_visitors')"
+    ).fetchall()}
+    if not present:
+        return
 
+    a = _analytics_conn()
+    a.execute("ATTACH DATABASE ? AS old", (str(DB_PATH),))
+    try:
+        if "page_views" in present:
+            a.execute("""INSERT OR IGNORE INTO page_views (id, path, ip, user_agent, timestamp)
+                         SELECT id, path, ip, user_agent, timestamp FROM old.page_views ORDER BY id""")
+        if "traffic_hourly" in present:
+            a.execute("INSERT OR REPLACE INTO traffic_hourly SELECT * FROM old.traffic_hourly")
+        if "traffic_sketches" in present:
+            a.execute("INSERT OR REPLACE INTO traffic_sketches SELECT * FROM old.traffic_sketches")
+        if "traffic_visitors" in present:
+            # Per-day visitor sets from before the sketches; their IPs may be pruned from page_views
+            _update_sketches(a, a.execute("SELECT day, path_class, ip FROM old.traffic_visitors").fetchall())
+        a.commit()
+    finally:
+        a.execute("DETACH DATABASE old")
+
+    # Rebuild rollups for anything that predates them
+    if not a.execute("SELECT 1 FROM traffic_hourly LIMIT 1").fetchone():
+        a.execute(f"""
+            INSERT INTO traffic_hourly (hour, path, path_class, views)
+            SELECT SUBSTR(timestamp,1,13), path, {_PATH_CLASS_SQL}, COUNT(*)
+            FROM page_views GROUP BY 1, 2
+        """)
+    if not a.execute("SELECT 1 FROM traffic_sketches LIMIT 1").fetchone():
+        _update_sketches(a, a.execute(f"""
+            SELECT DISTINCT SUBSTR(timestamp,1,10), {_PATH_CLASS_SQL}, ip
+            FROM page_views WHERE ip IS NOT NULL
+        """).fetchall())
+    a.commit()
+
+    for table in present:
+        c.execute(f"DROP TABLE {table}")
     c.commit()
+    c.execute("PRAGMA incremental_vacuum").fetchall()
+    log.info(f"Moved {', '.join(sorted(present))} to {ANALYTICS_DB_PATH}")
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "incremental auto-vacuum", _use_incremental_vacuum, transactional=False),
+    Migration(2, "page views to the analytics database", _move_analytics_tables, transactional=False),
+    Migration(3, "compact listing layout", _compact_listing_tables, transactional=False),
+    Migration(4, "tables and indexes", _create_schema),
+    Migration(5, "default settings", _seed_settings),
+    Migration(6, "sort indexes", _create_sort_indexes),
+    Migration(7, "profiles table", _create_profiles_table),
+)
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+ANALYTICS_MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "page-view tables", _create_analytics_schema),
+)
+
+
+def _migrate(c: sqlite3.Connection, migrations: tuple[Migration, ...], label: str) -> int:
+    """Apply the pending *migrations* to *c*; returns the resulting version."""
+    current = c.execute("PRAGMA user_version").fetchone()[0]
+    if current >= migrations[-1].version:
+        if current > migrations[-1].version:
+            log.warning(f"{label} schema v{current} is newer than this code (v{migrations[-1].version})")
+        return current
+
+    pending = [m for m in migrations if m.version > current]
+    while pending:
+        if c.in_transaction:
+            c.commit()
+        if not pending[0].transactional:
+            m = pending.pop(0)
+            m.apply(c)
+            if c.in_transaction:
+                c.commit()
+            c.execute(f"PRAGMA user_version = {m.version}")
+            log.info(f"{label} schema v{m.version}: {m.name}")
+            continue
 
-    # Seed default settings
-    c.execute("INSERT OR IGNORE INTO settings (key, value) VALUES ('search_interval', '300')")
-    c.commit()
+        batch = []
+        while pending and pending[0].transactional:
+            batch.append(pending.pop(0))
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            done = c.execute("PRAGMA user_version").fetchone()[0]  # another process may have got here first
+            batch = [m for m in batch if m.version > done]
+            for m in batch:
+                m.apply(c)
+            if batch:
+                c.execute(f"PRAGMA user_version = {batch[-1].version}")
+            c.commit()
+        except Exception:
+            c.rollback()
+            raise
+        for m in batch:
+            log.info(f"{label} schema v{m.version}: {m.name}")
+    return c.execute("PRAGMA user_version").fetchone()[0]
 
-    # Migration: add user_restored column if missing
-    cols = {r[1] for r in c.execute("PRAGMA table_info(listings)").fetchall()}
-    if "user_restored" not in cols:
-        c.execute("ALTER TABLE listings ADD COLUMN user_restored INTEGER NOT NULL DEFAULT 0")
-        c.commit()
 
-    # Dedup outliers before creating unique index (handles pre-existing dupes)
-    c.execute("""DELETE FROM outliers WHERE id NOT IN (
-        SELECT MAX(id) FROM outliers GROUP BY gpu_id, title, price
-    )""")
-    c.commit()
+@_writes_alone
+def init_db() -> int:
+    """Bring both databases up to date; returns the main schema version."""
+    init_analytics_db()
+    return _migrate(_conn(), MIGRATIONS, "Main")
+
+
+@_analytics_writes_alone
+def init_analytics_db() -> int:
+    """Bring the analytics database up to date; returns its schema version."""
+    return _migrate(_analytics_conn(), ANALYTICS_MIGRATIONS, "Analytics")
+
+
+def schema_version() -> int:
+    with _read() as c:
+        return c.execute("PRAGMA user_version").fetchone()[0]
+
+
+# ── Maintenance ───────────────────────────────────────────────────────
+#
+# Primitives for ``maintenance.py``.  Each runs on the database's writer
+# thread as a command of its own, so ordinary writes queue in between.
+
+ANALYSIS_LIMIT = 1000  # rows ANALYZE samples per index
+
+_DATABASES = {
+    "main": (_main, lambda: DB_PATH),
+    "analytics": (_analytics, lambda: ANALYTICS_DB_PATH),
+}
+
+
+def _on_writer(database: str, fn: Callable, *args):
+    manager = _DATABASES[database][0]
+    return manager.submit(lambda: fn(manager.writer(), *args), alone=True).result()
+
+
+@contextmanager
+def _deadline(c: sqlite3.Connection, seconds: float):
+    """Interrupt statements on *c* still running after *seconds*."""
+    end = time.monotonic() + seconds
+    c.set_progress_handler(lambda: time.monotonic() > end, 1000)
+    try:
+        yield
+    finally:
+        c.set_progress_handler(None, 0)
+
+
+def database_sizes(database: str) -> dict:
+    """File, WAL and free-page sizes of *database* (``"main"`` or ``"analytics"``)."""
+    manager, path = _DATABASES[database]
+    with manager.read() as c:
+        page_size = c.execute("PRAGMA page_size").fetchone()[0]
+        pages = c.execute("PRAGMA page_count").fetchone()[0]
+        free = c.execute("PRAGMA freelist_count").fetchone()[0]
+    wal = path().with_name(path().name + "-wal")
+    return {
+        "file_bytes": path().stat().st_size,
+        "wal_bytes": wal.stat().st_size if wal.exists() else 0,
+        "pages": pages,
+        "free_pages": free,
+        "free_bytes": free * page_size,
+    }
+
+
+def analyze(database: str, budget: float) -> bool:
+    """Refresh planner statistics; False if *budget* seconds ran out first.
+
+    ``PRAGMA optimize`` only considers tables its own connection has
+    queried, and the writer connection barely reads, so this runs a
+    sampled ``ANALYZE`` (``ANALYSIS_LIMIT`` rows per index) instead.
+    """
+    def run(c: sqlite3.Connection) -> bool:
+        c.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+        try:
+            with _deadline(c, budget):
+                c.execute("ANALYZE")
+        except sqlite3.OperationalError as e:
+            if "interrupt" not in str(e):
+                raise
+            return False
+        return True
+    return _on_writer(database, run)
+
+
+def incremental_vacuum(database: str, pages: int) -> int:
+    """Hand up to *pages* free pages back to the filesystem; returns how many remain."""
+    def run(c: sqlite3.Connection) -> int:
+        c.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+        return c.execute("PRAGMA freelist_count").fetchone()[0]
+    return _on_writer(database, run)
 
-    c.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_outliers_dedup
-        ON outliers(gpu_id, title, price)""")
-    c.commit()
+
+def checkpoint(database: str, budget: float) -> bool:
+    """Copy the WAL into the database and truncate it; False if readers still held it after *budget* seconds."""
+    def run(c: sqlite3.Connection) -> bool:
+        c.execute(f"PRAGMA busy_timeout={int(budget * 1000)}")
+        try:
+            busy = c.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0]
+        finally:
+            c.execute(f"PRAGMA busy_timeout={PRAGMAS['busy_timeout']}")
+        return not busy
+    return _on_writer(database, run)
 
 
 # ── Settings helpers ──────────────────────────────────────────────────
 
 def get_setting(key: str, default: str = "") -> str:
-    row = _conn().execute("SELECT value FROM settings WHERE key=?", (key,)).fetchone()
-    return row["value"] if row else default
+    with _read() as c:
+        row = c.execute("SELECT value FROM settings WHERE key=?", (key,)).fetchone()
+        return row["value"] if row else default
 
 
+@_writes
 def set_setting(key: str, value: str):
     _conn().execute(
         "INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
         (key, value),
     )
-    _conn().commit()
+
+
+@_writes
+def bump_setting_counter(key: str) -> int:
+    """Atomically increment an integer setting and return the new value."""
+    return _increment_setting(_conn(), key)
+
+
+def _increment_setting(c: sqlite3.Connection, key: str) -> int:
+    """Increment an integer setting inside the caller's transaction."""
+    c.execute("""
+        INSERT INTO settings (key, value) VALUES (?, '1')
+        ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+    """, (key,))
+    return int(c.execute("SELECT value FROM settings WHERE key=?", (key,)).fetchone()[0])
+
+
+# ── Leases ────────────────────────────────────────────────────────────
+
+@_writes
+def acquire_lease(name: str, holder: str, ttl: float) -> bool:
+    """Take or renew lease *name* for *ttl* seconds.
+
+    Succeeds when nobody holds it, *holder* already holds it, or the
+    current holder let it expire.  One UPSERT, so two processes racing for
+    an expired lease cannot both win.
+    """
+    now = time.time()
+    cur = _conn().execute("""
+        INSERT INTO leases (name, holder, acquired_at, expires_at) VALUES (?,?,?,?)
+        ON CONFLICT(name) DO UPDATE SET
+            acquired_at = CASE WHEN leases.holder = excluded.holder
+                               THEN leases.acquired_at ELSE excluded.acquired_at END,
+            holder = excluded.holder,
+            expires_at = excluded.expires_at
+        WHERE leases.holder = excluded.holder OR leases.expires_at < ?
+    """, (name, holder, now, now + ttl, now))
+    return cur.rowcount == 1
+
+
+@_writes
+def release_lease(name: str, holder: str):
+    _conn().execute("DELETE FROM leases WHERE name=? AND holder=?", (name, holder))
+
+
+def get_lease(name: str) -> dict | None:
+    """Current unexpired holder of *name*, or None."""
+    with _read() as c:
+        row = c.execute(
+            "SELECT holder, acquired_at, expires_at FROM leases WHERE name=? AND expires_at >= ?",
+            (name, time.time()),
+        ).fetchone()
+        return dict(row) if row else None
 
 
 # ── GPU dataclass ─────────────────────────────────────────────────────
@@ -158,25 +637,32 @@ def _row_to_gpu(row: sqlite3.Row) -> GPU:
 
 # ── GPU CRUD ──────────────────────────────────────────────────────────
 
+CATALOG_VERSION_KEY = "catalog_version"  # bumped with every GPU mutation
+
+
 def load_gpu_list() -> list[GPU]:
-    rows = _conn().execute("SELECT * FROM gpus ORDER BY id").fetchall()
-    return [_row_to_gpu(r) for r in rows]
+    with _read() as c:
+        rows = c.execute("SELECT * FROM gpus ORDER BY id").fetchall()
+        return [_row_to_gpu(r) for r in rows]
 
 
 def get_gpu(gpu_id: str) -> GPU | None:
-    row = _conn().execute("SELECT * FROM gpus WHERE id=?", (gpu_id,)).fetchone()
-    return _row_to_gpu(row) if row else None
+    with _read() as c:
+        row = c.execute("SELECT * FROM gpus WHERE id=?", (gpu_id,)).fetchone()
+        return _row_to_gpu(row) if row else None
 
 
+@_writes
 def add_gpu(gpu: GPU):
     _conn().execute(
         "INSERT INTO gpus (id,name,tokens_sec,vram,search_queries,tokens_tested) VALUES (?,?,?,?,?,?)",
         (gpu.id, gpu.name, gpu.tokens_sec, gpu.vram,
          json.dumps(gpu.search_queries), int(gpu.tokens_tested)),
     )
-    _conn().commit()
+    _increment_setting(_conn(), CATALOG_VERSION_KEY)
 
 
+@_writes
 def update_gpu(gpu_id: str, fields: dict) -> GPU:
     gpu = get_gpu(gpu_id)
     if not gpu:
@@ -192,219 +678,583 @@ def update_gpu(gpu_id: str, fields: dict) -> GPU:
         "UPDATE gpus SET name=?,tokens_sec=?,vram=?,search_queries=?,tokens_tested=? WHERE id=?",
         (name, tokens_sec, vram, json.dumps(sq), int(tested), gpu_id),
     )
-    _conn().commit()
+    _increment_setting(_conn(), CATALOG_VERSION_KEY)
     return get_gpu(gpu_id)
 
 
+@_writes
 def delete_gpu(gpu_id: str):
     cur = _conn().execute("DELETE FROM gpus WHERE id=?", (gpu_id,))
-    _conn().commit()
     if cur.rowcount == 0:
         raise ValueError(f"GPU '{gpu_id}' not found")
+    _increment_setting(_conn(), CATALOG_VERSION_KEY)
 
 
 def next_gpu_id(name: str) -> str:
     """Generate a slug-style ID for a new GPU."""
     base = name.lower().replace(" ", "-")
-    existing = {r["id"] for r in _conn().execute("SELECT id FROM gpus").fetchall()}
-    if base not in existing:
-        return base
-    i = 2
-    while f"{base}-{i}" in existing:
-        i += 1
-    return f"{base}-{i}"
+    with _read() as c:
+        existing = {r["id"] for r in c.execute("SELECT id FROM gpus").fetchall()}
+        if base not in existing:
+            return base
+        i = 2
+        while f"{base}-{i}" in existing:
+            i += 1
+        return f"{base}-{i}"
+
+
+# ── Column encodings ──────────────────────────────────────────────────
+
+_EPOCH = date(1970, 1, 1)
+
+
+def _cents(price) -> int | None:
+    return None if price is None else round(float(price) * 100)
+
+
+def _epoch_day(iso_date: str | None) -> int | None:
+    """Days since 1970-01-01 for a ``YYYY-MM-DD[...]`` string."""
+    return None if not iso_date else (date.fromisoformat(iso_date[:10]) - _EPOCH).days
+
+
+def epoch_days_ago(days: int) -> int:
+    """The ``listed_day`` value of the date *days* ago."""
+    return (date.today() - timedelta(days=days) - _EPOCH).days
+
+
+def _price_sql(t: str) -> str:
+    return f"{t}.price_cents / 100.0"
+
+
+def _date_sql(t: str) -> str:
+    return f"date({t}.listed_day * 86400, 'unixepoch')"
+
+
+def _time_sql(expr: str) -> str:
+    """Epoch seconds → local ISO timestamp, as ``datetime.now().isoformat()`` used to store."""
+    return f"strftime('%Y-%m-%dT%H:%M:%S', {expr}, 'unixepoch', 'localtime')"
+
+
+# A listings row in its public shape (``FROM listings l JOIN gpus g ON g.pk = l.gpu``)
+_LISTING_COLUMNS = f"""l.id, g.id AS gpu_id, l.listing_id, l.title, {_price_sql('l')} AS price,
+    l.link, {_date_sql('l')} AS date, l.location, {_time_sql('l.seen_at')} AS timestamp,
+    l.active, l.user_restored"""
+
+
+def _gpu_pk(c: sqlite3.Connection, gpu_id: str) -> int | None:
+    row = c.execute("SELECT pk FROM gpus WHERE id=?", (gpu_id,)).fetchone()
+    return row[0] if row else None
 
 
 # ── Listing CRUD ──────────────────────────────────────────────────────
 
-def save_listing(gpu_id: str, data: dict):
-    """Insert or replace a listing (dedup on gpu_id+title+price)."""
-    _conn().execute("""
-        INSERT INTO listings (gpu_id, listing_id, title, price, link, date, location, timestamp, active)
+@_writes
+def save_listing(gpu_id: str, data: dict, cycle: int | None = None) -> tuple[str, float | None]:
+    """Insert or replace a listing (dedup on gpu_id+title+price).
+
+    Returns ``(status, previous_price)`` where status is ``"seen"`` (row
+    already existed), ``"price_drop"``/``"price_change"`` (same listing id
+    stored at another price) or ``"new"``.  With a *cycle* from
+    :func:`start_cycle` the price is also appended to the observation log
+    when it differs from the last one recorded.
+    """
+    c = _conn()
+    gpu = _gpu_pk(c, gpu_id)
+    cents = _cents(data.get("price"))
+    if cycle is not None and data.get("id") is not None and cents is not None:
+        _observe(c, gpu, data["id"], cycle, cents)
+    seen = c.execute(
+        "SELECT 1 FROM listings WHERE gpu=? AND title=? AND price_cents=?",
+        (gpu, data.get("title"), cents),
+    ).fetchone()
+    previous = None
+    if not seen and data.get("id") is not None:
+        row = c.execute(
+            "SELECT price_cents FROM listings WHERE gpu=? AND listing_id=? ORDER BY seen_at DESC LIMIT 1",
+            (gpu, data["id"]),
+        ).fetchone()
+        previous = row[0] / 100 if row and row[0] is not None else None
+    c.execute("""
+        INSERT INTO listings (gpu, listing_id, title, price_cents, link, listed_day, location, seen_at, active)
         VALUES (?,?,?,?,?,?,?,?,1)
-        ON CONFLICT(gpu_id, title, price) DO UPDATE SET
+        ON CONFLICT(gpu, title, price_cents) DO UPDATE SET
             listing_id=excluded.listing_id,
             link=excluded.link,
-            date=excluded.date,
+            listed_day=excluded.listed_day,
             location=excluded.location,
-            timestamp=excluded.timestamp,
+            seen_at=excluded.seen_at,
             active=1
     """, (
-        gpu_id,
+        gpu,
         data.get("id"),
         data.get("title"),
-        data.get("price"),
+        cents,
         data.get("link"),
-        data.get("date"),
+        _epoch_day(data.get("date")),
         data.get("location"),
-        datetime.now().isoformat(),
+        int(time.time()),
     ))
-    _conn().commit()
+    if seen:
+        return "seen", None
+    if previous is None:
+        return "new", None
+    return ("price_drop" if data.get("price") < previous else "price_change"), previous
 
 
+@_writes
 def mark_active_listings(gpu_id: str, active_listing_ids: set[str]):
     """Set active=1 for ids in the set, active=0 for others."""
     c = _conn()
-    c.execute("UPDATE listings SET active=0 WHERE gpu_id=? AND listing_id IS NOT NULL", (gpu_id,))
+    gpu = _gpu_pk(c, gpu_id)
+    c.execute("UPDATE listings SET active=0 WHERE gpu=? AND listing_id IS NOT NULL", (gpu,))
     if active_listing_ids:
         placeholders = ",".join("?" * len(active_listing_ids))
         c.execute(
-            f"UPDATE listings SET active=1 WHERE gpu_id=? AND listing_id IN ({placeholders})",
-            (gpu_id, *active_listing_ids),
+            f"UPDATE listings SET active=1 WHERE gpu=? AND listing_id IN ({placeholders})",
+            (gpu, *active_listing_ids),
         )
-    c.commit()
 
 
+def _listing_row(c: sqlite3.Connection, listing_pk: int) -> dict | None:
+    row = c.execute(
+        f"SELECT {_LISTING_COLUMNS} FROM listings l JOIN gpus g ON g.pk = l.gpu WHERE l.id=?",
+        (listing_pk,),
+    ).fetchone()
+    return dict(row) if row else None
+
+
+@_writes
 def update_listing(listing_pk: int, fields: dict) -> dict | None:
     """Update a listing by its primary key."""
-    row = _conn().execute("SELECT * FROM listings WHERE id=?", (listing_pk,)).fetchone()
+    c = _conn()
+    row = _listing_row(c, listing_pk)
     if not row:
         return None
-    allowed = {"title", "price", "active", "link", "gpu_id"}
-    updates = {k: v for k, v in fields.items() if k in allowed}
-    if "active" in updates:
-        updates["active"] = int(updates["active"])
+    updates = {}
+    for key, value in fields.items():
+        if key in ("title", "link"):
+            updates[key] = value
+        elif key == "active":
+            updates["active"] = int(value)
+        elif key == "price":
+            updates["price_cents"] = _cents(value)
+        elif key == "gpu_id":
+            updates["gpu"] = _gpu_pk(c, value)
     if not updates:
-        return dict(row)
+        return row
     set_clause = ", ".join(f"{k}=?" for k in updates)
-    _conn().execute(f"UPDATE listings SET {set_clause} WHERE id=?", (*updates.values(), listing_pk))
-    _conn().commit()
-    return dict(_conn().execute("SELECT * FROM listings WHERE id=?", (listing_pk,)).fetchone())
+    c.execute(f"UPDATE listings SET {set_clause} WHERE id=?", (*updates.values(), listing_pk))
+    return _listing_row(c, listing_pk)
 
 
+@_writes
 def delete_listing(listing_pk: int) -> bool:
     cur = _conn().execute("DELETE FROM listings WHERE id=?", (listing_pk,))
-    _conn().commit()
     return cur.rowcount > 0
 
 
+@_writes
 def delete_listings_by_gpu(gpu_id: str) -> int:
-    cur = _conn().execute("DELETE FROM listings WHERE gpu_id=?", (gpu_id,))
-    _conn().commit()
+    cur = _conn().execute("DELETE FROM listings WHERE gpu=(SELECT pk FROM gpus WHERE id=?)", (gpu_id,))
     return cur.rowcount
 
 
+# ── Price observations ────────────────────────────────────────────────
+
+@_writes
+def start_cycle() -> int:
+    """Open a search cycle and return its id for :func:`save_listing`."""
+    return _conn().execute("INSERT INTO cycles (started_at) VALUES (?)", (int(time.time()),)).lastrowid
+
+
+@_writes
+def finish_cycle(cycle: int, listings: int):
+    _conn().execute(
+        "UPDATE cycles SET finished_at=?, listings=? WHERE id=?",
+        (int(time.time()), listings, cycle),
+    )
+
+
+def _observe(c: sqlite3.Connection, gpu: int, listing_id: str, cycle: int, cents: int):
+    """Append *cents* for the listing unless it is already its last observed price."""
+    c.execute("INSERT OR IGNORE INTO listing_keys (gpu, listing_id) VALUES (?,?)", (gpu, listing_id))
+    key = c.execute(
+        "SELECT id FROM listing_keys WHERE gpu=? AND listing_id=?", (gpu, listing_id)
+    ).fetchone()[0]
+    last = c.execute(
+        "SELECT price_cents FROM observations WHERE listing=? ORDER BY cycle DESC LIMIT 1", (key,)
+    ).fetchone()
+    if last is None or last[0] != cents:
+        c.execute(
+            "INSERT OR IGNORE INTO observations (listing, cycle, price_cents) VALUES (?,?,?)",
+            (key, cycle, cents),
+        )
+
+
+def price_observations(gpu_id: str, after_cycle: int = 0) -> list[dict]:
+    """Price changes of a GPU's listings in cycles after *after_cycle*, oldest first.
+
+    Pass the last cycle already processed to fold new changes into a rollup
+    instead of re-reading everything.
+    """
+    with _read() as c:
+        rows = c.execute(f"""
+            SELECT k.listing_id, o.cycle, {_time_sql('cy.started_at')} AS observed_at,
+                   o.price_cents / 100.0 AS price
+            FROM listing_keys k
+            JOIN observations o ON o.listing = k.id
+            JOIN cycles cy ON cy.id = o.cycle
+            WHERE k.gpu=(SELECT pk FROM gpus WHERE id=?) AND o.cycle > ?
+            ORDER BY o.cycle, k.listing_id
+        """, (gpu_id, after_cycle)).fetchall()
+        return [dict(r) for r in rows]
+
+
+def observation_counts() -> dict[str, int]:
+    with _read() as c:
+        row = c.execute("""
+            SELECT (SELECT COUNT(*) FROM cycles)       AS cycles,
+                   (SELECT COUNT(*) FROM listing_keys) AS listings,
+                   (SELECT COUNT(*) FROM observations) AS observations
+        """).fetchone()
+        return dict(row)
+
+
+# ── Profiles ──────────────────────────────────────────────────────────
+
+PROFILES_KEPT = 20  # older profiles are deleted as new ones arrive
+
+_PROFILE_COLUMNS = f"""id, target, mode, cycle, {_time_sql('started_at')} AS started_at, seconds, samples,
+    pstats IS NOT NULL AS has_pstats"""
+
+
+@_writes
+def save_profile(*, target: str, mode: str, cycle: int | None, started_at: int, seconds: float,
+                 samples: int, report: str, pstats: bytes | None, collapsed: bytes) -> int:
+    """Store a profile (see ``profiling.py``) and drop all but the newest ``PROFILES_KEPT``."""
+    c = _conn()
+    pk = c.execute("""
+        INSERT INTO profiles (target, mode, cycle, started_at, seconds, samples, report, pstats, collapsed)
+        VALUES (?,?,?,?,?,?,?,?,?)
+    """, (target, mode, cycle, started_at, seconds, samples, report, pstats, collapsed)).lastrowid
+    c.execute("DELETE FROM profiles WHERE id <= ?", (pk - PROFILES_KEPT,))
+    return pk
+
+
+def list_profiles() -> list[dict]:
+    """Stored profiles, newest first, without their payloads."""
+    with _read() as c:
+        rows = c.execute(f"SELECT {_PROFILE_COLUMNS} FROM profiles ORDER BY id DESC").fetchall()
+        return [dict(r) for r in rows]
+
+
+def get_profile(pk: int) -> dict | None:
+    """One profile with its ``report`` and compressed ``pstats``/``collapsed`` payloads."""
+    with _read() as c:
+        row = c.execute(
+            f"SELECT {_PROFILE_COLUMNS}, report, pstats, collapsed FROM profiles WHERE id=?", (pk,)
+        ).fetchone()
+        return dict(row) if row else None
+
+
 # ── Queries (push work into SQL) ──────────────────────────────────────
 
 def listing_count() -> int:
-    return _conn().execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+    with _read() as c:
+        return c.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
 
 
 def active_listing_count() -> int:
-    return _conn().execute("SELECT COUNT(*) FROM listings WHERE active=1").fetchone()[0]
+    with _read() as c:
+        return c.execute("SELECT COUNT(*) FROM listings WHERE active=1").fetchone()[0]
 
 
 def gpu_listing_counts() -> dict[str, int]:
     """Return {gpu_id: count} for all GPUs."""
-    rows = _conn().execute("SELECT gpu_id, COUNT(*) AS cnt FROM listings GROUP BY gpu_id").fetchall()
-    return {r["gpu_id"]: r["cnt"] for r in rows}
+    with _read() as c:
+        rows = c.execute("""
+            SELECT g.id AS gpu_id, COUNT(*) AS cnt
+            FROM listings l JOIN gpus g ON g.pk = l.gpu
+            GROUP BY l.gpu
+        """).fetchall()
+        return {r["gpu_id"]: r["cnt"] for r in rows}
 
 
 def last_updated() -> str | None:
-    row = _conn().execute("SELECT MAX(timestamp) AS ts FROM listings").fetchone()
-    return row["ts"] if row else None
+    with _read() as c:
+        row = c.execute(f"SELECT {_time_sql('MAX(seen_at)')} AS ts FROM listings").fetchone()
+        return row["ts"] if row else None
 
 
 def gpu_breakdown() -> list[dict]:
     """One query to get breakdown stats per GPU."""
-    rows = _conn().execute("""
-        SELECT
-            g.id, g.name, g.vram, g.tokens_sec,
-            COUNT(l.id)                           AS total,
-            SUM(CASE WHEN l.active=1 THEN 1 ELSE 0 END) AS active,
-            MIN(l.price)                          AS min_price,
-            MAX(l.price)                          AS max_price
-        FROM gpus g
-        LEFT JOIN listings l ON l.gpu_id = g.id
-        GROUP BY g.id
-        ORDER BY g.id
-    """).fetchall()
-    return [dict(r) for r in rows]
+    with _read() as c:
+        rows = c.execute("""
+            SELECT
+                g.id, g.name, g.vram, g.tokens_sec,
+                COUNT(l.id)                           AS total,
+                SUM(CASE WHEN l.active=1 THEN 1 ELSE 0 END) AS active,
+                MIN(l.price_cents) / 100.0            AS min_price,
+                MAX(l.price_cents) / 100.0            AS max_price
+            FROM gpus g
+            LEFT JOIN listings l ON l.gpu = g.pk
+            GROUP BY g.pk
+            ORDER BY g.id
+        """).fetchall()
+        return [dict(r) for r in rows]
 
 
 def price_history(gpu_id: str, agg: str = "min", span: str = "30d") -> list[tuple[str, float]]:
     """Return (date, price) pairs, binned by day or week."""
     cutoff, bin_expr = _span_to_sql(span)
     agg_fn = "MIN" if agg == "min" else "AVG"
-    rows = _conn().execute(f"""
-        SELECT {bin_expr} AS period, {agg_fn}(price) AS val
-        FROM listings
-        WHERE gpu_id=? AND price IS NOT NULL AND date >= ?
-        GROUP BY period ORDER BY period
-    """, (gpu_id, cutoff)).fetchall()
-    return [(r["period"], r["val"]) for r in rows]
+    with _read() as c:
+        rows = c.execute(f"""
+            SELECT date(({bin_expr}) * 86400, 'unixepoch') AS period, {agg_fn}(price_cents) / 100.0 AS val
+            FROM listings
+            WHERE gpu=(SELECT pk FROM gpus WHERE id=?) AND listed_day >= ? AND price_cents IS NOT NULL
+            GROUP BY {bin_expr} ORDER BY {bin_expr}
+        """, (gpu_id, cutoff)).fetchall()
+        return [(r["period"], r["val"]) for r in rows]
+
+
+def price_history_multi(gpu_ids: list[str], agg: str = "min", span: str = "30d") -> list[tuple[str, str, float]]:
+    """Return (gpu_id, period, price) rows for several GPUs in one grouped scan."""
+    cutoff, bin_expr = _span_to_sql(span)
+    agg_fn = "MIN" if agg == "min" else "AVG"
+    placeholders = ",".join("?" * len(gpu_ids))
+    with _read() as c:
+        rows = c.execute(f"""
+            SELECT g.id AS gpu_id, date(({bin_expr}) * 86400, 'unixepoch') AS period,
+                   {agg_fn}(l.price_cents) / 100.0 AS val
+            FROM gpus g JOIN listings l ON l.gpu = g.pk
+            WHERE g.id IN ({placeholders}) AND listed_day >= ? AND price_cents IS NOT NULL
+            GROUP BY l.gpu, {bin_expr} ORDER BY period
+        """, (*gpu_ids, cutoff)).fetchall()
+        return [(r["gpu_id"], r["period"], r["val"]) for r in rows]
+
+
+def price_history_bins(gpu_ids: list[str], span: str = "30d") -> list[tuple[str, int, int, int, int]]:
+    """Return (gpu_id, bin_day, min_cents, sum_cents, count) rows, for merging with archived bins."""
+    cutoff, bin_expr = _span_to_sql(span)
+    placeholders = ",".join("?" * len(gpu_ids))
+    with _read() as c:
+        rows = c.execute(f"""
+            SELECT g.id, {bin_expr} AS bin, MIN(l.price_cents), SUM(l.price_cents), COUNT(*)
+            FROM gpus g JOIN listings l ON l.gpu = g.pk
+            WHERE g.id IN ({placeholders}) AND listed_day >= ? AND price_cents IS NOT NULL
+            GROUP BY l.gpu, bin
+        """, (*gpu_ids, cutoff)).fetchall()
+        return [tuple(r) for r in rows]
 
 
 def avg_price_period(gpu_id: str, days: int | None) -> float:
     """Average price for a GPU over given days (None=all time)."""
-    if days is None:
-        row = _conn().execute(
-            "SELECT AVG(price) AS a FROM listings WHERE gpu_id=? AND price IS NOT NULL",
-            (gpu_id,),
-        ).fetchone()
-    else:
-        cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-        row = _conn().execute(
-            "SELECT AVG(price) AS a FROM listings WHERE gpu_id=? AND price IS NOT NULL AND date>=?",
-            (gpu_id, cutoff),
+    where, params = "", [gpu_id]
+    if days is not None:
+        where = " AND listed_day >= ?"
+        params.append(epoch_days_ago(days))
+    with _read() as c:
+        row = c.execute(
+            "SELECT AVG(price_cents) / 100.0 AS a FROM listings "
+            f"WHERE gpu=(SELECT pk FROM gpus WHERE id=?) AND price_cents IS NOT NULL{where}",
+            params,
         ).fetchone()
-    return row["a"] or 0
+        return row["a"] or 0
 
 
 def lowest_listing(gpu_id: str) -> dict | None:
     """Cheapest listing (prefer active)."""
-    row = _conn().execute("""
-        SELECT price, link, title, timestamp, active
-        FROM listings WHERE gpu_id=? AND price IS NOT NULL
-        ORDER BY active DESC, price ASC LIMIT 1
-    """, (gpu_id,)).fetchone()
-    return dict(row) if row else None
+    with _read() as c:
+        row = c.execute(f"""
+            SELECT {_price_sql('l')} AS price, l.link, l.title, {_time_sql('l.seen_at')} AS timestamp, l.active
+            FROM listings l WHERE l.gpu=(SELECT pk FROM gpus WHERE id=?) AND l.price_cents IS NOT NULL
+            ORDER BY l.active DESC, l.price_cents ASC LIMIT 1
+        """, (gpu_id,)).fetchone()
+        return dict(row) if row else None
+
+
+def avg_prices_period(days: int | None) -> dict[str, float]:
+    """Average price per GPU over given days (None=all time), one grouped query."""
+    where, params = "l.price_cents IS NOT NULL", []
+    if days is not None:
+        where += " AND l.listed_day >= ?"
+        params.append(epoch_days_ago(days))
+    with _read() as c:
+        rows = c.execute(f"""
+            SELECT g.id AS gpu_id, AVG(l.price_cents) / 100.0 AS a
+            FROM listings l JOIN gpus g ON g.pk = l.gpu
+            WHERE {where} GROUP BY l.gpu
+        """, params).fetchall()
+        return {r["gpu_id"]: r["a"] for r in rows}
+
+
+def price_totals_period(days: int | None) -> dict[str, tuple[int, int]]:
+    """{gpu_id: (sum_cents, count)} over given days, for merging with archived totals."""
+    where, params = "l.price_cents IS NOT NULL", []
+    if days is not None:
+        where += " AND l.listed_day >= ?"
+        params.append(epoch_days_ago(days))
+    with _read() as c:
+        rows = c.execute(f"""
+            SELECT g.id AS gpu_id, SUM(l.price_cents) AS total, COUNT(*) AS n
+            FROM listings l JOIN gpus g ON g.pk = l.gpu
+            WHERE {where} GROUP BY l.gpu
+        """, params).fetchall()
+        return {r["gpu_id"]: (r["total"], r["n"]) for r in rows}
+
+
+def lowest_listings() -> dict[str, dict]:
+    """Cheapest listing per GPU (prefer active), one windowed query."""
+    with _read() as c:
+        rows = c.execute(f"""
+            SELECT g.id AS gpu_id, {_price_sql('l')} AS price, l.link, l.title,
+                   {_time_sql('l.seen_at')} AS timestamp, l.active
+            FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY gpu ORDER BY active DESC, price_cents ASC
+                ) AS rn
+                FROM listings WHERE price_cents IS NOT NULL
+            ) l JOIN gpus g ON g.pk = l.gpu
+            WHERE l.rn = 1
+        """).fetchall()
+        return {r["gpu_id"]: {k: r[k] for k in ("price", "link", "title", "timestamp", "active")} for r in rows}
+
+
+_LISTING_SORT = {
+    "price": "l.price_cents",
+    "gpu": "g.name",
+    "vram": "g.vram",
+    "tokens": "g.tokens_sec",
+}
+
+
+# The unary + keeps the planner off idx_listings_price for these filters:
+# the default bounds match every row, and taking the range from that index
+# would trade an index-ordered walk that stops at LIMIT for a full sort.
+_PRICE_BOUNDS = ("+l.price_cents IS NOT NULL", "+l.price_cents >= ?", "+l.price_cents <= ?")
+
+
+def _listing_order(sort_by: str, order: str) -> str:
+    # seen_at has one-second resolution; the id keeps ties in insert order
+    direction = "ASC" if order == "asc" else "DESC"
+    return f"{_LISTING_SORT.get(sort_by, 'l.seen_at')} {direction}, l.id {direction}"
 
 
-def filtered_listings(
+def _listing_after(sort_by: str, order: str) -> str:
+    """Keyset condition for the rows after ``(sort key, id)`` in :func:`_listing_order`."""
+    return f"({_LISTING_SORT.get(sort_by, 'l.seen_at')}, l.id) {'>' if order == 'asc' else '<'} (?, ?)"
+
+
+def _filtered_listings_sql(
+    select: str,
     *,
-    gpu_ids: list[str] | None = None,
-    min_price: float = 0,
-    max_price: float = 999999,
-    search: str = "",
-    active_only: bool = False,
-    sort_by: str = "timestamp",
-    order: str = "desc",
-    limit: int = 500,
-) -> list[dict]:
-    """Filtered listing query with GPU enrichment."""
-    conditions = ["l.price IS NOT NULL", "l.price >= ?", "l.price <= ?"]
-    params: list = [min_price, max_price]
+    gpu_ids: list[str] | None,
+    min_price: float,
+    max_price: float,
+    search: str,
+    active_only: bool,
+    sort_by: str,
+    order: str,
+    limit: int,
+    after: tuple | None = None,
+) -> tuple[str, list]:
+    conditions = list(_PRICE_BOUNDS)
+    params: list = [_cents(min_price), _cents(max_price)]
 
     if gpu_ids:
         placeholders = ",".join("?" * len(gpu_ids))
-        conditions.append(f"l.gpu_id IN ({placeholders})")
+        conditions.append(f"g.id IN ({placeholders})")
         params.extend(gpu_ids)
     if search:
         conditions.append("l.title LIKE ?")
         params.append(f"%{search}%")
     if active_only:
         conditions.append("l.active=1")
-
-    sort_col = {
-        "price": "l.price",
-        "gpu": "g.name",
-        "vram": "g.vram",
-        "tokens": "g.tokens_sec",
-    }.get(sort_by, "l.timestamp")
-    direction = "ASC" if order == "asc" else "DESC"
+    if after is not None:
+        conditions.append(_listing_after(sort_by, order))
+        params.extend(after)
 
     sql = f"""
-        SELECT l.*, g.name AS gpu_name, g.vram, g.tokens_sec, g.tokens_tested
+        SELECT {select}
         FROM listings l
-        JOIN gpus g ON g.id = l.gpu_id
+        JOIN gpus g ON g.pk = l.gpu
         WHERE {' AND '.join(conditions)}
-        ORDER BY {sort_col} {direction}
+        ORDER BY {_listing_order(sort_by, order)}
         LIMIT ?
     """
     params.append(limit)
-    rows = _conn().execute(sql, params).fetchall()
-    return [dict(r) for r in rows]
+    return sql, params
+
+
+def filtered_listings(
+    *,
+    gpu_ids: list[str] | None = None,
+    min_price: float = 0,
+    max_price: float = 999999,
+    search: str = "",
+    active_only: bool = False,
+    sort_by: str = "timestamp",
+    order: str = "desc",
+    limit: int = 500,
+) -> list[dict]:
+    """Filtered listing query with GPU enrichment."""
+    sql, params = _filtered_listings_sql(
+        f"{_LISTING_COLUMNS}, g.name AS gpu_name, g.vram, g.tokens_sec, g.tokens_tested",
+        gpu_ids=gpu_ids, min_price=min_price, max_price=max_price, search=search,
+        active_only=active_only, sort_by=sort_by, order=order, limit=limit,
+    )
+    with _read() as c:
+        rows = c.execute(sql, params).fetchall()
+        return [dict(r) for r in rows]
+
+
+# Public result row, rendered by SQLite's json_object so streaming never
+# builds a Python dict per row.
+_RESULT_JSON = f"""json_object(
+    'gpu', g.name, 'gpu_id', g.id, 'title', l.title, 'price', {_price_sql('l')},
+    'link', l.link, 'timestamp', {_time_sql('l.seen_at')},
+    'active', json(CASE WHEN l.active THEN 'true' ELSE 'false' END),
+    'vram', g.vram, 'tokens', g.tokens_sec
+)"""
+
+
+def iter_filtered_results_json(
+    *,
+    gpu_ids: list[str] | None = None,
+    max_price: float = 999999,
+    search: str = "",
+    active_only: bool = False,
+    sort_by: str = "timestamp",
+    order: str = "desc",
+    limit: int = 500,
+    batch_size: int = 200,
+):
+    """JSON-encoded result rows (at most *limit*), in lists of *batch_size*.
+
+    Each batch is its own query on a briefly borrowed reader, continuing
+    after the previous batch's last ``(sort key, id)``.  Memory therefore
+    stays at one batch whatever *limit* is, and no reader waits on a slow
+    client between batches.  A row whose sort key changes mid-stream can
+    be skipped or sent twice, like a page boundary moving under a client.
+    """
+    select = f"{_RESULT_JSON}, {_LISTING_SORT.get(sort_by, 'l.seen_at')}, l.id"
+    after = None
+    while limit > 0:
+        sql, params = _filtered_listings_sql(
+            select,
+            gpu_ids=gpu_ids, min_price=0, max_price=max_price, search=search,
+            active_only=active_only, sort_by=sort_by, order=order,
+            limit=min(batch_size, limit), after=after,
+        )
+        with _read() as c:
+            rows = c.execute(sql, params).fetchall()
+        if rows:
+            yield [r[0] for r in rows]
+        if len(rows) < batch_size:
+            return
+        limit -= len(rows)
+        after = (rows[-1][1], rows[-1][2])
 
 
 def browse_listings(
@@ -419,8 +1269,8 @@ def browse_listings(
     limit: int = 200,
 ) -> list[dict]:
     """Admin browse with full filtering – single SQL query."""
-    conditions = ["l.price IS NOT NULL", "l.price >= ?", "l.price <= ?"]
-    params: list = [min_price, max_price]
+    conditions = list(_PRICE_BOUNDS)
+    params: list = [_cents(min_price), _cents(max_price)]
 
     if gpu_filter:
         conditions.append("(LOWER(g.name) LIKE ? OR LOWER(g.id) LIKE ?)")
@@ -432,50 +1282,102 @@ def browse_listings(
     if active_only:
         conditions.append("l.active=1")
 
-    sort_col = {
-        "price": "l.price",
-        "gpu": "g.name",
-        "vram": "g.vram",
-        "tokens": "g.tokens_sec",
-    }.get(sort_by, "l.timestamp")
-    direction = "ASC" if order == "asc" else "DESC"
-
     sql = f"""
-        SELECT l.id, l.gpu_id, g.name AS gpu_name, l.listing_id, l.title,
-               l.price, l.link, l.date, l.location, l.timestamp, l.active,
+        SELECT l.id, g.id AS gpu_id, g.name AS gpu_name, l.listing_id, l.title,
+               {_price_sql('l')} AS price, l.link, {_date_sql('l')} AS date, l.location,
+               {_time_sql('l.seen_at')} AS timestamp, l.active,
                g.vram, g.tokens_sec
         FROM listings l
-        JOIN gpus g ON g.id = l.gpu_id
+        JOIN gpus g ON g.pk = l.gpu
         WHERE {' AND '.join(conditions)}
-        ORDER BY {sort_col} {direction}
+        ORDER BY {_listing_order(sort_by, order)}
         LIMIT ?
     """
     params.append(limit)
-    return [dict(r) for r in _conn().execute(sql, params).fetchall()]
+    with _read() as c:
+        return [dict(r) for r in c.execute(sql, params).fetchall()]
+
+
+def iter_listings_export(batch_size: int = 500):
+    """Yield batches of every listing in its public shape, oldest first."""
+    with _read() as c:
+        cur = c.execute(f"""
+            SELECT {_LISTING_COLUMNS}
+            FROM listings l JOIN gpus g ON g.pk = l.gpu
+            ORDER BY l.id
+        """)
+        while batch := cur.fetchmany(batch_size):
+            yield [dict(r) for r in batch]
+
+
+# ── Archival ──────────────────────────────────────────────────────────
+
+ARCHIVE_AFTER_DAYS = 180  # inactive listings not seen for this long move to the archive
+
+
+def cold_listings(cutoff: int, limit: int) -> list[dict]:
+    """Inactive listings last seen before epoch *cutoff*, raw columns plus the GPU slug."""
+    with _read() as c:
+        rows = c.execute("""
+            SELECT l.id, g.id AS gpu_id, l.listing_id, l.title, l.price_cents, l.link,
+                   l.listed_day, l.location, l.seen_at, l.active, l.user_restored
+            FROM listings l JOIN gpus g ON g.pk = l.gpu
+            WHERE l.active=0 AND l.seen_at < ?
+            ORDER BY l.id LIMIT ?
+        """, (cutoff, limit)).fetchall()
+        return [dict(r) for r in rows]
+
+
+def cold_outliers(cutoff: int, limit: int) -> list[dict]:
+    """Outliers moved before epoch *cutoff*, raw columns."""
+    with _read() as c:
+        rows = c.execute(
+            "SELECT * FROM outliers WHERE moved_at < ? ORDER BY id LIMIT ?", (cutoff, limit)
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
+@_writes
+def delete_archived(table: str, ids: list[int]) -> int:
+    """Drop rows that are now stored in the archive."""
+    if table not in ("listings", "outliers"):
+        raise ValueError(f"not an archived table: {table}")
+    c = _conn()
+    deleted = 0
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        cur = c.execute(f"DELETE FROM {table} WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        deleted += cur.rowcount
+    return deleted
 
 
 # ── Helpers ───────────────────────────────────────────────────────────
 
-def _span_to_sql(span: str) -> tuple[str, str]:
-    """Return (cutoff_date_str, sql_bin_expression)."""
-    now = datetime.now()
+_WEEK_BIN = "listed_day - 1 - (listed_day + 2) % 7"  # previous Monday, as DATE(d, 'weekday 1', '-7 days')
+
+
+def span_bins(span: str) -> tuple[int, bool]:
+    """Return (cutoff epoch day, weekly) for a span like ``"30d"``, ``"1y"`` or ``"all"``."""
     try:
         if span.endswith("d"):
             days = int(span[:-1])
         elif span.endswith("y"):
             days = int(span[:-1]) * 365
+        elif span == "all":
+            return 0, True
         else:
             days = 30
     except (ValueError, AttributeError):
         days = 30
 
-    cutoff = (now - timedelta(days=days)).strftime("%Y-%m-%d")
     # For spans ≤60 days bin by day, otherwise by ISO week start (Monday)
-    if days <= 60:
-        bin_expr = "SUBSTR(date,1,10)"
-    else:
-        bin_expr = "DATE(date, 'weekday 1', '-7 days')"
-    return cutoff, bin_expr
+    return epoch_days_ago(days), days > 60
+
+
+def _span_to_sql(span: str) -> tuple[int, str]:
+    """Return (cutoff_epoch_day, sql_bin_expression over ``listed_day``)."""
+    cutoff, weekly = span_bins(span)
+    return cutoff, _WEEK_BIN if weekly else "listed_day"
 
 
 # ── Outlier detection ─────────────────────────────────────────────────
@@ -483,6 +1385,12 @@ def _span_to_sql(span: str) -> tuple[str, str]:
 OUTLIER_THRESHOLD_BELOW = 0.50  # flag if price < 50% of mean
 OUTLIER_THRESHOLD_ABOVE = 1.00  # flag if price > 100% above mean
 OUTLIER_MIN_LISTINGS = 5  # need at least this many listings to judge
+MAINTENANCE_CHUNK = 50  # rows changed per write command in full-table passes
+
+
+def _chunks(items: list):
+    for i in range(0, len(items), MAINTENANCE_CHUNK):
+        yield items[i:i + MAINTENANCE_CHUNK]
 
 
 def _is_outlier_price(price: float, mean_p: float) -> tuple[bool, str]:
@@ -500,87 +1408,108 @@ def _is_outlier_price(price: float, mean_p: float) -> tuple[bool, str]:
 
 def _gpu_mean_prices() -> dict[str, tuple[float, int]]:
     """Return {gpu_id: (mean_price, count)} for GPUs with enough listings."""
-    rows = _conn().execute("""
-        SELECT gpu_id, AVG(price) AS avg_p, COUNT(*) AS cnt
-        FROM listings WHERE price IS NOT NULL
-        GROUP BY gpu_id HAVING cnt >= ?
-    """, (OUTLIER_MIN_LISTINGS,)).fetchall()
-    return {r["gpu_id"]: (r["avg_p"], r["cnt"]) for r in rows}
+    with _read() as c:
+        rows = c.execute("""
+            SELECT g.id AS gpu_id, AVG(l.price_cents) / 100.0 AS avg_p, COUNT(*) AS cnt
+            FROM listings l JOIN gpus g ON g.pk = l.gpu
+            WHERE l.price_cents IS NOT NULL
+            GROUP BY l.gpu HAVING cnt >= ?
+        """, (OUTLIER_MIN_LISTINGS,)).fetchall()
+        return {r["gpu_id"]: (r["avg_p"], r["cnt"]) for r in rows}
 
 
 def is_price_outlier(gpu_id: str, price: float) -> tuple[bool, str]:
     """Check if a price is >50% below or >100% above the GPU's mean.
     Returns (is_outlier, reason_string)."""
-    row = _conn().execute(
-        "SELECT AVG(price) AS avg_p, COUNT(*) AS cnt FROM listings WHERE gpu_id=? AND price IS NOT NULL",
-        (gpu_id,),
-    ).fetchone()
-    if not row or row["cnt"] < OUTLIER_MIN_LISTINGS:
-        return False, ""
-    return _is_outlier_price(price, row["avg_p"])
+    with _read() as c:
+        row = c.execute(
+            "SELECT AVG(price_cents) / 100.0 AS avg_p, COUNT(*) AS cnt FROM listings "
+            "WHERE gpu=(SELECT pk FROM gpus WHERE id=?) AND price_cents IS NOT NULL",
+            (gpu_id,),
+        ).fetchone()
+        if not row or row["cnt"] < OUTLIER_MIN_LISTINGS:
+            return False, ""
+        return _is_outlier_price(price, row["avg_p"])
 
 
-def _move_listing_to_outliers(listing_pk: int, reason: str):
-    """Move a listing row into the outliers table and delete from listings."""
-    c = _conn()
-    row = c.execute("SELECT * FROM listings WHERE id=?", (listing_pk,)).fetchone()
-    if not row:
-        return
-    c.execute("""
-        INSERT INTO outliers (gpu_id, listing_id, title, price, link, date, location, timestamp, active, reason, moved_at)
-        VALUES (?,?,?,?,?,?,?,?,?,?,?)
-        ON CONFLICT(gpu_id, title, price) DO UPDATE SET
-            listing_id=excluded.listing_id, link=excluded.link,
-            reason=excluded.reason, moved_at=excluded.moved_at
-    """, (
-        row["gpu_id"], row["listing_id"], row["title"], row["price"],
-        row["link"], row["date"], row["location"], row["timestamp"],
-        row["active"], reason, datetime.now().isoformat(),
-    ))
-    c.execute("DELETE FROM listings WHERE id=?", (listing_pk,))
-    c.commit()
+# Copy one listings row (bound as the last parameter) into outliers
+_LISTING_TO_OUTLIER = """
+    INSERT INTO outliers (gpu_id, listing_id, title, price_cents, link, listed_day, location, seen_at, active, reason, moved_at)
+    SELECT g.id, l.listing_id, l.title, l.price_cents, l.link, l.listed_day, l.location, l.seen_at, {active}, ?, ?
+    FROM listings l JOIN gpus g ON g.pk = l.gpu
+    WHERE l.id=?
+    ON CONFLICT(gpu_id, title, price_cents) DO UPDATE SET
+        listing_id=excluded.listing_id, link=excluded.link,
+        reason=excluded.reason, moved_at=excluded.moved_at
+"""
 
 
+@_writes
 def save_as_outlier(gpu_id: str, data: dict, reason: str):
     """Save a new listing directly as an outlier (dedup on gpu_id+title+price)."""
+    now = int(time.time())
     _conn().execute("""
-        INSERT INTO outliers (gpu_id, listing_id, title, price, link, date, location, timestamp, active, reason, moved_at)
+        INSERT INTO outliers (gpu_id, listing_id, title, price_cents, link, listed_day, location, seen_at, active, reason, moved_at)
         VALUES (?,?,?,?,?,?,?,?,0,?,?)
-        ON CONFLICT(gpu_id, title, price) DO UPDATE SET
+        ON CONFLICT(gpu_id, title, price_cents) DO UPDATE SET
             listing_id=excluded.listing_id, link=excluded.link,
             reason=excluded.reason, moved_at=excluded.moved_at
     """, (
-        gpu_id, data.get("id"), data.get("title"), data.get("price"),
-        data.get("link"), data.get("date"), data.get("location"),
-        datetime.now().isoformat(), reason, datetime.now().isoformat(),
+        gpu_id, data.get("id"), data.get("title"), _cents(data.get("price")),
+        data.get("link"), _epoch_day(data.get("date")), data.get("location"),
+        now, reason, now,
     ))
-    _conn().commit()
+
+
+@_writes
+def _move_listings_to_outliers(moves: list[tuple[int, str]]) -> int:
+    """Move ``(listing pk, reason)`` rows into outliers; rows gone meanwhile are skipped."""
+    c = _conn()
+    now = int(time.time())
+    moved = 0
+    for pk, reason in moves:
+        c.execute(_LISTING_TO_OUTLIER.format(active="l.active"), (reason, now, pk))
+        moved += c.execute("DELETE FROM listings WHERE id=?", (pk,)).rowcount
+    return moved
+
+
+@_writes
+def _restore_outliers(pks: list[int]) -> int:
+    return sum(restore_outlier(pk) for pk in pks)
 
 
 def sweep_outliers() -> dict[str, int]:
-    """Scan listings→outliers and outliers→listings. Returns {"moved": n, "restored": n}."""
+    """Scan listings→outliers and outliers→listings. Returns {"moved": n, "restored": n}.
+
+    Candidates are picked on a reader; the moves are written
+    ``MAINTENANCE_CHUNK`` at a time, so the writer is never held for the
+    whole pass.
+    """
     means = _gpu_mean_prices()
-    moved = 0
-    for gpu_id, (mean_p, _cnt) in means.items():
-        if mean_p <= 0:
-            continue
-        rows = _conn().execute(
-            "SELECT id, price FROM listings WHERE gpu_id=? AND price IS NOT NULL AND user_restored=0",
-            (gpu_id,),
-        ).fetchall()
-        for r in rows:
-            is_outlier, reason = _is_outlier_price(r["price"], mean_p)
-            if is_outlier:
-                _move_listing_to_outliers(r["id"], reason)
-                moved += 1
+    moves = []
+    with _read() as c:
+        for gpu_id, (mean_p, _cnt) in means.items():
+            if mean_p <= 0:
+                continue
+            rows = c.execute(
+                "SELECT id, price_cents / 100.0 AS price FROM listings "
+                "WHERE gpu=(SELECT pk FROM gpus WHERE id=?) AND price_cents IS NOT NULL AND user_restored=0",
+                (gpu_id,),
+            ).fetchall()
+            for r in rows:
+                is_outlier, reason = _is_outlier_price(r["price"], mean_p)
+                if is_outlier:
+                    moves.append((r["id"], reason))
+    moved = sum(_move_listings_to_outliers(chunk) for chunk in _chunks(moves))
 
     # Reverse: restore outliers that are no longer outliers
-    restored = 0
     # Recompute means after moving
     means = _gpu_mean_prices()
-    outlier_rows = _conn().execute(
-        "SELECT id, gpu_id, price FROM outliers WHERE price IS NOT NULL"
-    ).fetchall()
+    restores = []
+    with _read() as c:
+        outlier_rows = c.execute(
+            "SELECT id, gpu_id, price_cents / 100.0 AS price FROM outliers WHERE price_cents IS NOT NULL"
+        ).fetchall()
     for o in outlier_rows:
         stats = means.get(o["gpu_id"])
         if not stats:
@@ -590,12 +1519,37 @@ def sweep_outliers() -> dict[str, int]:
             continue
         is_outlier, _ = _is_outlier_price(o["price"], mean_p)
         if not is_outlier:
-            restore_outlier(o["id"])
-            restored += 1
+            restores.append(o["id"])
+    restored = sum(_restore_outliers(chunk) for chunk in _chunks(restores))
 
     return {"moved": moved, "restored": restored}
 
 
+# Rows sharing a {key} with a newer row of the same table
+_DUPLICATES = """
+    SELECT id FROM {table} WHERE id NOT IN (
+        SELECT MAX(id) FROM {table}
+        WHERE {present}
+        GROUP BY {key}
+    ) AND {present}
+    AND {key} IN (
+        SELECT {key} FROM {table}
+        WHERE {present}
+        GROUP BY {key} HAVING COUNT(*) > 1
+    )
+"""
+_DUPLICATE_KEYS = {
+    "listing_id": "listing_id IS NOT NULL",
+    "link": "link IS NOT NULL AND link != ''",
+}
+
+
+@_writes
+def _delete_rows(table: str, pks: list[int]) -> int:
+    cur = _conn().execute(f"DELETE FROM {table} WHERE id IN ({','.join('?' * len(pks))})", pks)
+    return cur.rowcount
+
+
 def dedup_tables() -> dict[str, int]:
     """Remove duplicate rows from listings and outliers.
 
@@ -603,48 +1557,23 @@ def dedup_tables() -> dict[str, int]:
       1. Same listing_id (marktplaats id) within the same table
       2. Same link URL within the same table
     Keeps the row with the highest primary key (most recent insert).
-    Returns {"listings": n, "outliers": n} with counts of removed dupes.
+    Duplicates are found on a reader and deleted ``MAINTENANCE_CHUNK`` at
+    a time.  Returns {"listings": n, "outliers": n} with counts of removed dupes.
     """
-    c = _conn()
     removed = {"listings": 0, "outliers": 0}
 
     for table in ("listings", "outliers"):
-        # Dedup by listing_id (keep highest pk)
-        cur = c.execute(f"""
-            DELETE FROM {table} WHERE id NOT IN (
-                SELECT MAX(id) FROM {table}
-                WHERE listing_id IS NOT NULL
-                GROUP BY listing_id
-            ) AND listing_id IS NOT NULL
-            AND listing_id IN (
-                SELECT listing_id FROM {table}
-                WHERE listing_id IS NOT NULL
-                GROUP BY listing_id HAVING COUNT(*) > 1
-            )
-        """)
-        removed[table] += cur.rowcount
+        # One key at a time: the link pass must not keep a row the listing_id pass deleted
+        for key, present in _DUPLICATE_KEYS.items():
+            with _read() as c:
+                pks = [r[0] for r in c.execute(_DUPLICATES.format(table=table, key=key, present=present))]
+            removed[table] += sum(_delete_rows(table, chunk) for chunk in _chunks(pks))
 
-        # Dedup by link URL (keep highest pk)
-        cur = c.execute(f"""
-            DELETE FROM {table} WHERE id NOT IN (
-                SELECT MAX(id) FROM {table}
-                WHERE link IS NOT NULL AND link != ''
-                GROUP BY link
-            ) AND link IS NOT NULL AND link != ''
-            AND link IN (
-                SELECT link FROM {table}
-                WHERE link IS NOT NULL AND link != ''
-                GROUP BY link HAVING COUNT(*) > 1
-            )
-        """)
-        removed[table] += cur.rowcount
-
-    c.commit()
     return removed
 
-
 def outlier_count() -> int:
-    return _conn().execute("SELECT COUNT(*) FROM outliers").fetchone()[0]
+    with _read() as c:
+        return c.execute("SELECT COUNT(*) FROM outliers").fetchone()[0]
 
 
 def browse_outliers(
@@ -663,7 +1592,7 @@ def browse_outliers(
         params.extend([patt, patt])
 
     sort_col = {
-        "price": "o.price",
+        "price": "o.price_cents",
         "gpu": "g.name",
         "moved_at": "o.moved_at",
     }.get(sort_by, "o.moved_at")
@@ -671,8 +1600,8 @@ def browse_outliers(
 
     sql = f"""
         SELECT o.id, o.gpu_id, COALESCE(g.name, o.gpu_id) AS gpu_name,
-               o.title, o.price, o.link, o.date, o.timestamp,
-               o.reason, o.moved_at
+               o.title, {_price_sql('o')} AS price, o.link, {_date_sql('o')} AS date,
+               {_time_sql('o.seen_at')} AS timestamp, o.reason, {_time_sql('o.moved_at')} AS moved_at
         FROM outliers o
         LEFT JOIN gpus g ON g.id = o.gpu_id
         WHERE {' AND '.join(conditions)}
@@ -680,37 +1609,36 @@ def browse_outliers(
         LIMIT ?
     """
     params.append(limit)
-    return [dict(r) for r in _conn().execute(sql, params).fetchall()]
+    with _read() as c:
+        return [dict(r) for r in c.execute(sql, params).fetchall()]
 
 
+@_writes
 def restore_outlier(outlier_pk: int) -> bool:
     """Move an outlier back into the listings table."""
     c = _conn()
-    row = c.execute("SELECT * FROM outliers WHERE id=?", (outlier_pk,)).fetchone()
-    if not row:
+    if not c.execute("SELECT 1 FROM outliers WHERE id=?", (outlier_pk,)).fetchone():
         return False
     try:
         c.execute("""
-            INSERT INTO listings (gpu_id, listing_id, title, price, link, date, location, timestamp, active, user_restored)
-            VALUES (?,?,?,?,?,?,?,?,?,1)
-            ON CONFLICT(gpu_id, title, price) DO UPDATE SET
+            INSERT INTO listings (gpu, listing_id, title, price_cents, link, listed_day, location, seen_at, active, user_restored)
+            SELECT (SELECT pk FROM gpus WHERE id=o.gpu_id), o.listing_id, o.title, o.price_cents,
+                   o.link, o.listed_day, o.location, o.seen_at, 0, 1
+            FROM outliers o WHERE o.id=?
+            ON CONFLICT(gpu, title, price_cents) DO UPDATE SET
                 listing_id=excluded.listing_id, link=excluded.link,
-                timestamp=excluded.timestamp, user_restored=1
-        """, (
-            row["gpu_id"], row["listing_id"], row["title"], row["price"],
-            row["link"], row["date"], row["location"], row["timestamp"], 0,
-        ))
+                seen_at=excluded.seen_at, user_restored=1
+        """, (outlier_pk,))
         c.execute("DELETE FROM outliers WHERE id=?", (outlier_pk,))
-        c.commit()
         return True
     except Exception as e:
         log.error(f"restore_outlier({outlier_pk}) failed: {e}")
         return False
 
 
+@_writes
 def delete_outlier(outlier_pk: int) -> bool:
     cur = _conn().execute("DELETE FROM outliers WHERE id=?", (outlier_pk,))
-    _conn().commit()
     return cur.rowcount > 0
 
 
@@ -723,141 +1651,130 @@ def browse_restored_listings(
     conditions = ["l.user_restored = 1"]
     params: list = []
     if gpu_filter:
-        conditions.append("(LOWER(g.name) LIKE ? OR LOWER(l.gpu_id) LIKE ?)")
+        conditions.append("(LOWER(g.name) LIKE ? OR LOWER(g.id) LIKE ?)")
         patt = f"%{gpu_filter.lower()}%"
         params.extend([patt, patt])
 
     sql = f"""
-        SELECT l.id, l.gpu_id, COALESCE(g.name, l.gpu_id) AS gpu_name,
-               l.title, l.price, l.link, l.date, l.timestamp
+        SELECT l.id, g.id AS gpu_id, g.name AS gpu_name,
+               l.title, {_price_sql('l')} AS price, l.link, {_date_sql('l')} AS date,
+               {_time_sql('l.seen_at')} AS timestamp
         FROM listings l
-        LEFT JOIN gpus g ON g.id = l.gpu_id
+        JOIN gpus g ON g.pk = l.gpu
         WHERE {' AND '.join(conditions)}
-        ORDER BY l.timestamp DESC
+        ORDER BY l.seen_at DESC, l.id DESC
         LIMIT ?
     """
     params.append(limit)
-    return [dict(r) for r in _conn().execute(sql, params).fetchall()]
+    with _read() as c:
+        return [dict(r) for r in c.execute(sql, params).fetchall()]
 
 
+@_writes
 def unrestore_listing(listing_pk: int) -> bool:
     """Move a user-restored listing back to outliers. Undoes a manual restore."""
     c = _conn()
-    row = c.execute(
-        "SELECT * FROM listings WHERE id=? AND user_restored=1", (listing_pk,)
-    ).fetchone()
-    if not row:
+    if not c.execute(
+        "SELECT 1 FROM listings WHERE id=? AND user_restored=1", (listing_pk,)
+    ).fetchone():
         return False
     try:
         reason = "manually re-flagged by admin"
-        c.execute("""
-            INSERT INTO outliers (gpu_id, listing_id, title, price, link, date, location, timestamp, active, reason, moved_at)
-            VALUES (?,?,?,?,?,?,?,?,?,?,?)
-            ON CONFLICT(gpu_id, title, price) DO UPDATE SET
-                listing_id=excluded.listing_id, link=excluded.link,
-                reason=excluded.reason, moved_at=excluded.moved_at
-        """, (
-            row["gpu_id"], row["listing_id"], row["title"], row["price"],
-            row["link"], row["date"], row["location"], row["timestamp"],
-            0, reason, datetime.now().isoformat(),
-        ))
+        c.execute(_LISTING_TO_OUTLIER.format(active="0"), (reason, int(time.time()), listing_pk))
         c.execute("DELETE FROM listings WHERE id=?", (listing_pk,))
-        c.commit()
         return True
     except Exception as e:
         log.error(f"unrestore_listing({listing_pk}) failed: {e}")
         return False
 
 
-def revalidate_listings() -> dict:
-    """Re-validate all listings against current validation algorithm.
+# How ``_apply_revalidation`` files a row under another GPU, per table
+_REGPU_SQL = {
+    "listings": "UPDATE listings SET gpu=(SELECT pk FROM gpus WHERE id=?) WHERE id=?",
+    "outliers": "UPDATE outliers SET gpu_id=? WHERE id=?",
+}
 
-    Returns dict with counts: deleted, corrected, unchanged.
-    """
+
+@_writes
+def _apply_revalidation(table: str, deletes: list[int], corrections: list[tuple[str, int]]) -> tuple[int, int]:
+    """Delete *deletes* and move ``(gpu_id, pk)`` *corrections*; returns (deleted, corrected)."""
+    c = _conn()
+    deleted = corrected = 0
+    for pk in deletes:
+        deleted += c.execute(f"DELETE FROM {table} WHERE id=?", (pk,)).rowcount
+    for gpu_id, pk in corrections:
+        try:
+            corrected += c.execute(_REGPU_SQL[table], (gpu_id, pk)).rowcount
+        except sqlite3.IntegrityError:
+            # Corrected gpu_id creates a duplicate — remove this row
+            deleted += c.execute(f"DELETE FROM {table} WHERE id=?", (pk,)).rowcount
+    return deleted, corrected
+
+
+def _revalidate(table: str, sql: str) -> dict:
+    """Match every (id, gpu_id, title) row of *sql* again, then write the changes in chunks."""
     from .validation import find_best_gpu_match
 
-    rows = _conn().execute(
-        "SELECT id, gpu_id, title FROM listings"
-    ).fetchall()
+    with _read() as c:
+        rows = c.execute(sql).fetchall()
 
     stats = {"deleted": 0, "corrected": 0, "unchanged": 0}
-    c = _conn()
-
+    deletes, corrections = [], []
     for row in rows:
         pk, stored_gpu_id, title = row["id"], row["gpu_id"], row["title"]
         best_gpu_id, word_count = find_best_gpu_match(title)
 
         if best_gpu_id is None or word_count == 0:
-            c.execute("DELETE FROM listings WHERE id=?", (pk,))
-            stats["deleted"] += 1
+            deletes.append(pk)
         elif best_gpu_id != stored_gpu_id:
-            try:
-                c.execute(
-                    "UPDATE listings SET gpu_id=? WHERE id=?",
-                    (best_gpu_id, pk),
-                )
-                stats["corrected"] += 1
-            except sqlite3.IntegrityError:
-                # Corrected gpu_id creates a duplicate — remove this row
-                c.execute("DELETE FROM listings WHERE id=?", (pk,))
-                stats["deleted"] += 1
+            corrections.append((best_gpu_id, pk))
         else:
             stats["unchanged"] += 1
 
-        # Commit in small batches to avoid holding the write lock too long
-        total = stats["deleted"] + stats["corrected"] + stats["unchanged"]
-        if total % 50 == 0:
-            c.commit()
-
-    c.commit()
+    for chunk in _chunks(deletes):
+        stats["deleted"] += _apply_revalidation(table, chunk, [])[0]
+    for chunk in _chunks(corrections):
+        deleted, corrected = _apply_revalidation(table, [], chunk)
+        stats["deleted"] += deleted
+        stats["corrected"] += corrected
     return stats
 
 
+def revalidate_listings() -> dict:
+    """Re-validate all listings against current validation algorithm.
+
+    Titles are matched off the writer; deletes and corrections are written
+    ``MAINTENANCE_CHUNK`` at a time.  Returns dict with counts: deleted,
+    corrected, unchanged.
+    """
+    return _revalidate("listings", "SELECT l.id, g.id AS gpu_id, l.title FROM listings l JOIN gpus g ON g.pk = l.gpu")
+
+
 def revalidate_outliers() -> dict:
     """Re-validate all outliers against current validation algorithm.
 
     Deletes outliers that no longer match any GPU, corrects gpu_id for
     mismatched ones.  Returns dict with counts: deleted, corrected, unchanged.
     """
-    from .validation import find_best_gpu_match
+    return _revalidate("outliers", "SELECT id, gpu_id, title FROM outliers")
 
-    rows = _conn().execute(
-        "SELECT id, gpu_id, title FROM outliers"
-    ).fetchall()
-
-    stats = {"deleted": 0, "corrected": 0, "unchanged": 0}
-    c = _conn()
+# ── Page-view tracking ────────────────────────────────────────────────
 
-    for row in rows:
-        pk, stored_gpu_id, title = row["id"], row["gpu_id"], row["title"]
-        best_gpu_id, word_count = find_best_gpu_match(title)
+PAGEVIEW_RETENTION_DAYS = 30    # raw page_views older than this are pruned
+PAGEVIEW_IP_RETENTION_DAYS = 2  # hashed IPs are cleared from raw rows after this
 
-        if best_gpu_id is None or word_count == 0:
-            c.execute("DELETE FROM outliers WHERE id=?", (pk,))
-            stats["deleted"] += 1
-        elif best_gpu_id != stored_gpu_id:
-            try:
-                c.execute(
-                    "UPDATE outliers SET gpu_id=? WHERE id=?",
-                    (best_gpu_id, pk),
-                )
-                stats["corrected"] += 1
-            except sqlite3.IntegrityError:
-                c.execute("DELETE FROM outliers WHERE id=?", (pk,))
-                stats["deleted"] += 1
-        else:
-            stats["unchanged"] += 1
+_PATH_CLASS_SQL = "CASE WHEN path='/' THEN 'page' WHEN path LIKE '/api%' THEN 'api' ELSE 'other' END"
 
-        total = stats["deleted"] + stats["corrected"] + stats["unchanged"]
-        if total % 50 == 0:
-            c.commit()
 
-    c.commit()
-    return stats
+def _path_class(path: str) -> str:
+    """Bucket a request path the same way as ``_PATH_CLASS_SQL``."""
+    if path == "/":
+        return "page"
+    if path.startswith("/api"):
+        return "api"
+    return "other"
 
 
-# ── Page-view tracking ────────────────────────────────────────────────
-
 def _hash_ip(ip: str | None) -> str | None:
     """SHA-256 hash an IP for privacy."""
     if not ip:
@@ -867,53 +1784,131 @@ def _hash_ip(ip: str | None) -> str | None:
 
 def record_page_view(path: str, ip: str | None, user_agent: str | None):
     """Insert a page-view row with hashed IP."""
-    c = _conn()
-    c.execute(
+    record_page_views([(path, ip, user_agent, datetime.utcnow().isoformat())])
+
+
+@_analytics_writes
+def record_page_views(rows: list[tuple[str, str | None, str | None, str]]):
+    """Insert a batch of ``(path, ip, user_agent, timestamp)`` rows in one transaction.
+
+    The hourly rollups and per-day visitor sets are updated in the same
+    transaction, so they never drift from the raw table.
+    """
+    hashed = [(path, _hash_ip(ip), ua, ts) for path, ip, ua, ts in rows]
+    hourly: dict[tuple[str, str], int] = {}
+    visitors: list[tuple[str, str, str]] = []
+    for path, ip_hash, _ua, ts in hashed:
+        key = (ts[:13], path)
+        hourly[key] = hourly.get(key, 0) + 1
+        if ip_hash:
+            visitors.append((ts[:10], _path_class(path), ip_hash))
+
+    c = _analytics_conn()
+    c.executemany(
         "INSERT INTO page_views (path, ip, user_agent, timestamp) VALUES (?,?,?,?)",
-        (path, _hash_ip(ip), user_agent, datetime.utcnow().isoformat()),
+        hashed,
     )
-    c.commit()
+    c.executemany("""
+        INSERT INTO traffic_hourly (hour, path, path_class, views) VALUES (?,?,?,?)
+        ON CONFLICT(hour, path) DO UPDATE SET views = views + excluded.views
+    """, [(hour, path, _path_class(path), n) for (hour, path), n in hourly.items()])
+    _update_sketches(c, visitors)
+
+
+def _update_sketches(c: sqlite3.Connection, visitors):
+    """Feed ``(day, path_class, ip_hash)`` triples into the per-day HLL sketches."""
+    grouped: dict[tuple[str, str], list[str]] = {}
+    for day, path_class, ip_hash in visitors:
+        grouped.setdefault((day, path_class), []).append(ip_hash)
+    for (day, path_class), hashes in grouped.items():
+        row = c.execute(
+            "SELECT sketch FROM traffic_sketches WHERE day=? AND path_class=?", (day, path_class)
+        ).fetchone()
+        hll = HyperLogLog.from_bytes(row[0] if row else None)
+        for h in hashes:
+            try:
+                hll.add_hash(int(h, 16))
+            except ValueError:  # legacy rows stored the raw IP
+                hll.add_hash(int(_hash_ip(h), 16))
+        c.execute(
+            "INSERT OR REPLACE INTO traffic_sketches (day, path_class, sketch) VALUES (?,?,?)",
+            (day, path_class, hll.to_bytes()),
+        )
+
+
+@_analytics_writes
+def prune_page_views() -> int:
+    """Delete raw page views past the retention window and reclaim the pages.
+
+    Rollups are kept; only ``page_views`` rows are removed.  Returns the
+    number of rows deleted.
+    """
+    try:
+        days = int(get_setting("pageview_retention_days", str(PAGEVIEW_RETENTION_DAYS)))
+    except (ValueError, TypeError):
+        days = PAGEVIEW_RETENTION_DAYS
+    try:
+        ip_days = int(get_setting("pageview_ip_retention_days", str(PAGEVIEW_IP_RETENTION_DAYS)))
+    except (ValueError, TypeError):
+        ip_days = PAGEVIEW_IP_RETENTION_DAYS
+    now = datetime.utcnow()
+    cutoff = (now - timedelta(days=days)).isoformat()
+    ip_cutoff = (now - timedelta(days=ip_days)).isoformat()
+    c = _analytics_conn()
+    cur = c.execute("DELETE FROM page_views WHERE timestamp < ?", (cutoff,))
+    # Uniques live in the sketches, so raw IP hashes can go well before the rows do
+    c.execute("UPDATE page_views SET ip=NULL WHERE timestamp < ? AND ip IS NOT NULL", (ip_cutoff,))
+    if cur.rowcount:
+        c.execute("PRAGMA incremental_vacuum").fetchall()  # steps one page at a time
+    return cur.rowcount
 
 
 def traffic_stats(days: int = 30) -> dict:
-    """Return aggregate traffic numbers and daily series."""
-    c = _conn()
-    cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
-
-    # All hits
-    total = c.execute("SELECT COUNT(*) FROM page_views WHERE timestamp>=?", (cutoff,)).fetchone()[0]
-    unique = c.execute("SELECT COUNT(DISTINCT ip) FROM page_views WHERE timestamp>=?", (cutoff,)).fetchone()[0]
-
-    # Page views only (path = '/')
-    page_total = c.execute("SELECT COUNT(*) FROM page_views WHERE timestamp>=? AND path='/'", (cutoff,)).fetchone()[0]
-    page_unique = c.execute("SELECT COUNT(DISTINCT ip) FROM page_views WHERE timestamp>=? AND path='/'", (cutoff,)).fetchone()[0]
-
-    # API calls only (path starts with /api)
-    api_total = c.execute("SELECT COUNT(*) FROM page_views WHERE timestamp>=? AND path LIKE '/api%'", (cutoff,)).fetchone()[0]
-
-    # Today
-    today_page = c.execute("SELECT COUNT(*) FROM page_views WHERE timestamp>=? AND path='/'", (today_start,)).fetchone()[0]
-    today_page_unique = c.execute("SELECT COUNT(DISTINCT ip) FROM page_views WHERE timestamp>=? AND path='/'", (today_start,)).fetchone()[0]
-    today_api = c.execute("SELECT COUNT(*) FROM page_views WHERE timestamp>=? AND path LIKE '/api%'", (today_start,)).fetchone()[0]
-
-    # Daily breakdown – page views only (for the graph)
-    rows = c.execute("""
-        SELECT DATE(timestamp) AS day,
-               COUNT(*)        AS views,
-               COUNT(DISTINCT ip) AS unique_visitors
-        FROM page_views
-        WHERE timestamp >= ? AND path = '/'
-        GROUP BY day ORDER BY day
-    """, (cutoff,)).fetchall()
-    daily = [{"date": r[0], "views": r[1], "unique": r[2]} for r in rows]
-
-    # Top pages (all paths)
-    top_pages = c.execute("""
-        SELECT path, COUNT(*) AS cnt
-        FROM page_views WHERE timestamp >= ?
-        GROUP BY path ORDER BY cnt DESC LIMIT 10
-    """, (cutoff,)).fetchall()
+    """Return aggregate traffic numbers and daily series (read from rollups)."""
+    now = datetime.utcnow()
+    cutoff_hour = (now - timedelta(days=days)).isoformat()[:13]
+    cutoff_day = cutoff_hour[:10]
+    today = now.strftime("%Y-%m-%d")
+
+    with _analytics_read() as c:
+        # Views per class, for the period and for today, in one pass
+        totals = c.execute("""
+            SELECT
+                COALESCE(SUM(views), 0),
+                COALESCE(SUM(CASE WHEN path_class='page' THEN views END), 0),
+                COALESCE(SUM(CASE WHEN path_class='api'  THEN views END), 0),
+                COALESCE(SUM(CASE WHEN path_class='page' AND hour>=? THEN views END), 0),
+                COALESCE(SUM(CASE WHEN path_class='api'  AND hour>=? THEN views END), 0)
+            FROM traffic_hourly WHERE hour >= ?
+        """, (today, today, cutoff_hour)).fetchone()
+
+        sketches = c.execute(
+            "SELECT day, path_class, sketch FROM traffic_sketches WHERE day>=?", (cutoff_day,)
+        ).fetchall()
+
+        # Daily breakdown – page views only (for the graph)
+        views_by_day = c.execute("""
+            SELECT SUBSTR(hour,1,10) AS day, SUM(views)
+            FROM traffic_hourly
+            WHERE hour >= ? AND path_class = 'page'
+            GROUP BY day ORDER BY day
+        """, (cutoff_hour,)).fetchall()
+
+        # Top pages (all paths)
+        top_pages = c.execute("""
+            SELECT path, SUM(views) AS cnt
+            FROM traffic_hourly WHERE hour >= ?
+            GROUP BY path ORDER BY cnt DESC LIMIT 10
+        """, (cutoff_hour,)).fetchall()
+
+    total, page_total, api_total, today_page, today_api = totals
+
+    # Uniques: merge the per-day HLL sketches (day-granular at the window edge)
+    unique = merged_count(r[2] for r in sketches)
+    page_unique = merged_count(r[2] for r in sketches if r[1] == "page")
+    today_page_unique = merged_count(r[2] for r in sketches if r[1] == "page" and r[0] == today)
+    uniques_by_day = {r[0]: HyperLogLog(r[2]).count() for r in sketches if r[1] == "page"}
+    daily = [{"date": r[0], "views": r[1], "unique": uniques_by_day.get(r[0], 0)} for r in views_by_day]
 
     return {
         "page_views": page_total,
@@ -0,0 +1,150 @@
+"""In-process pub/sub for the server-sent events feed.
+
+Publishers append to one shared ring buffer of recent events and wake
+all waiting subscribers with a single ``notify_all``.  Subscribers only
+remember the sequence number of the last event they saw, so a publish
+costs the same however many connections are idle, and a reconnecting
+browser can resume from ``Last-Event-ID``.  A subscriber that falls
+further behind than the buffer gets a ``resync`` event and should reload
+everything.
+"""
+
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from threading import Condition, Event as StopEvent, Thread
+
+from .cache import GENERATION_POLL_INTERVAL, bumped_here, current_generation
+
+log = logging.getLogger(__name__)
+
+BUFFER_SIZE = 256          # recent events kept for slow or reconnecting clients
+KEEPALIVE_INTERVAL = 15.0  # seconds between comment lines on an idle stream
+MAX_SUBSCRIBERS = 200      # each open stream holds a server thread
+
+
+@dataclass(frozen=True)
+class Event:
+    seq: int
+    name: str
+    data: dict
+
+    def encode(self) -> bytes:
+        return f"id: {self.seq}\nevent: {self.name}\ndata: {json.dumps(self.data)}\n\n".encode()
+
+
+class EventBus:
+    """Ring buffer of events with blocking, sequence-based reads."""
+
+    def __init__(self, buffer_size: int = BUFFER_SIZE, max_subscribers: int = MAX_SUBSCRIBERS):
+        self._events: deque[Event] = deque(maxlen=buffer_size)
+        self._cond = Condition()
+        self._seq = 0
+        self.max_subscribers = max_subscribers
+        self.subscribers = 0
+        self.published = 0
+        self.generation: int | None = None  # last data generation announced
+
+    def publish(self, name: str, data: dict | None = None) -> int:
+        data = data or {}
+        with self._cond:
+            self._seq += 1
+            self._events.append(Event(self._seq, name, data))
+            if "generation" in data:
+                self.generation = data["generation"]
+            self.published += 1
+            self._cond.notify_all()
+            return self._seq
+
+    def full(self) -> bool:
+        return self.subscribers >= self.max_subscribers
+
+    def wait(self, after: int, timeout: float) -> list[Event] | None:
+        """Events with ``seq > after``, blocking up to *timeout* for the first one.
+
+        Returns ``None`` when *after* has already dropped out of the buffer.
+        """
+        with self._cond:
+            if self._seq <= after:
+                self._cond.wait_for(lambda: self._seq > after, timeout)
+            if self._events and self._events[0].seq > after + 1:
+                return None
+            return [e for e in self._events if e.seq > after]
+
+    def stream(self, last_event_id: int | None = None, keepalive: float = KEEPALIVE_INTERVAL):
+        """Yield encoded SSE frames forever; close the generator to unsubscribe."""
+        with self._cond:
+            self.subscribers += 1
+        try:
+            after = self._seq
+            resync = last_event_id is not None and last_event_id > after  # id from before a restart
+            if last_event_id is not None and not resync:
+                after = last_event_id
+            yield b"retry: 5000\n\n"
+            if resync:
+                yield Event(after, "resync", {}).encode()
+            while True:
+                events = self.wait(after, keepalive)
+                if events is None:
+                    after = self._seq
+                    yield Event(after, "resync", {}).encode()
+                elif events:
+                    after = events[-1].seq
+                    yield b"".join(e.encode() for e in events)
+                else:
+                    yield f": keepalive {int(time.time())}\n\n".encode()
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+    def stats(self) -> dict:
+        return {"subscribers": self.subscribers, "published": self.published, "last_seq": self._seq}
+
+
+bus = EventBus()
+
+
+def publish(name: str, **data) -> int:
+    """Publish an event to every subscriber in this process."""
+    return bus.publish(name, data)
+
+
+# ── Cross-process bridge ──────────────────────────────────────────────
+
+_watch_stop = StopEvent()
+_watch_thread: Thread | None = None
+
+
+def _watch_generation():
+    while not _watch_stop.wait(GENERATION_POLL_INTERVAL):
+        try:
+            generation = current_generation()
+        except Exception as e:
+            log.debug(f"Generation watch failed: {e}")
+            continue
+        if generation == bus.generation:
+            continue
+        if bus.generation is None or bumped_here(generation):
+            bus.generation = generation  # startup, or announced by cycle_finished
+        else:
+            publish("data_changed", generation=generation)
+
+
+def start_generation_watch():
+    """Announce data changes made by other processes (the elected worker, the admin).
+
+    Generations bumped in this process are skipped; the worker announces
+    those itself with ``cycle_finished``.
+    """
+    global _watch_thread
+    if _watch_thread is not None and _watch_thread.is_alive():
+        return
+    _watch_stop.clear()
+    _watch_thread = Thread(target=_watch_generation, name="generation-watch", daemon=True)
+    _watch_thread.start()
+
+
+def stop_generation_watch():
+    _watch_stop.set()
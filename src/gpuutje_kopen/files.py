@@ -0,0 +1,22 @@
+"""File helpers shared by the archive and the API snapshots."""
+
+import os
+import threading
+from pathlib import Path
+from typing import Callable
+
+
+def write_atomic(path: Path, write: Callable[[Path], None]):
+    """Let *write* fill a temp file next to *path*, then rename it into place.
+
+    Readers (nginx, a concurrent archive scan) see the old file or the new
+    one, never a partial write.  The temp name carries the process and
+    thread, so concurrent writers never share one.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
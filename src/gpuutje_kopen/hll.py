@@ -0,0 +1,69 @@
+"""HyperLogLog sketch for approximate distinct counts (unique visitors).
+
+A sketch is ``2**p`` one-byte registers and serialises to a plain ``bytes``
+blob, so it can be stored in SQLite and merged across days by taking the
+register-wise maximum.  With the default ``p=12`` a sketch is 4 KiB and
+the standard error is about 1.6 %; small counts fall back to linear
+counting and are effectively exact.
+"""
+
+import math
+
+PRECISION = 12
+
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch over 64-bit hashes."""
+
+    __slots__ = ("p", "m", "registers")
+
+    def __init__(self, registers: bytes | None = None, p: int = PRECISION):
+        self.p = p
+        self.m = 1 << p
+        if registers is None:
+            self.registers = bytearray(self.m)
+        elif len(registers) != self.m:
+            raise ValueError(f"expected {self.m} registers, got {len(registers)}")
+        else:
+            self.registers = bytearray(registers)
+
+    def add_hash(self, h: int):
+        """Add a uniformly distributed 64-bit hash value."""
+        h &= 0xFFFFFFFFFFFFFFFF
+        idx = h >> (64 - self.p)
+        rest = (h << self.p) & 0xFFFFFFFFFFFFFFFF
+        rank = 64 - rest.bit_length() + 1 if rest else 64 - self.p + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fold *other* into this sketch in place (union). Returns self."""
+        if other.p != self.p:
+            raise ValueError("cannot merge sketches with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        zeros = self.registers.count(0)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small sets
+        return round(estimate)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes | None) -> "HyperLogLog":
+        return cls(blob) if blob else cls()
+
+
+def merged_count(blobs) -> int:
+    """Estimate the distinct count of the union of serialised sketches."""
+    acc = HyperLogLog()
+    for blob in blobs:
+        if blob:
+            acc.merge(HyperLogLog(blob))
+    return acc.count()
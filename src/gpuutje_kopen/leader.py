@@ -0,0 +1,113 @@
+"""Lease-based leader election so only one process runs the search worker.
+
+Every web process runs a :class:`LeaderElection` thread.  It tries to take
+the ``search_worker`` lease in the ``leases`` table every
+``HEARTBEAT_INTERVAL`` seconds; the holder renews it on the same beat and
+runs the worker, everyone else only serves reads.  If the leader dies its
+lease expires after ``LEASE_TTL`` seconds and the next follower to tick
+takes over.  A leader that cannot renew steps down before its lease runs
+out, so two workers never overlap for longer than one search cycle.  A
+renewal stuck behind a long write counts as failed after ``ttl - interval``
+seconds, so a busy writer cannot keep a leader in office past its lease.
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from threading import Event, Thread
+from typing import Callable
+
+from .db import acquire_lease, get_lease, release_lease
+
+log = logging.getLogger(__name__)
+
+WORKER_LEASE = "search_worker"
+LEASE_TTL = 30.0           # seconds a lease stays valid without renewal
+HEARTBEAT_INTERVAL = 10.0  # seconds between acquire/renew attempts
+
+
+def _holder_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderElection:
+    """Hold lease *name* while possible, calling the hooks on transitions."""
+
+    def __init__(
+        self,
+        name: str,
+        on_elected: Callable[[], None],
+        on_demoted: Callable[[], None],
+        *,
+        ttl: float = LEASE_TTL,
+        interval: float = HEARTBEAT_INTERVAL,
+    ):
+        self.name = name
+        self.holder = _holder_id()
+        self.ttl = ttl
+        self.interval = interval
+        self._on_elected = on_elected
+        self._on_demoted = on_demoted
+        self._stop = Event()
+        self._thread: Thread | None = None
+        self.is_leader = False
+        self._renewed = 0.0
+
+    def tick(self):
+        """One acquire/renew attempt; called by the heartbeat thread."""
+        attempt = acquire_lease.submit(self.name, self.holder, self.ttl)
+        try:
+            held = attempt.result(timeout=self.ttl - self.interval)
+        except (sqlite3.Error, TimeoutError) as e:
+            attempt.cancel()  # still queued: don't renew after stepping down
+            log.warning(f"Lease {self.name}: heartbeat failed: {e or 'timed out'}")
+            # Keep leading only while our last renewal is certainly still valid
+            held = self.is_leader and time.time() - self._renewed < self.ttl - self.interval
+        else:
+            if held:
+                self._renewed = time.time()
+
+        if held and not self.is_leader:
+            self.is_leader = True
+            log.info(f"Lease {self.name}: acquired by {self.holder}")
+            self._on_elected()
+        elif not held and self.is_leader:
+            self.is_leader = False
+            log.warning(f"Lease {self.name}: lost by {self.holder}")
+            self._on_demoted()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(self.interval)
+
+    def start(self) -> "LeaderElection":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = Thread(target=self._run, name=f"lease-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop campaigning and hand the lease back so a follower takes over at once."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self.is_leader:
+            self.is_leader = False
+            self._on_demoted()
+            try:
+                release_lease(self.name, self.holder)
+            except sqlite3.Error as e:
+                log.warning(f"Lease {self.name}: release failed: {e}")
+
+    def stats(self) -> dict:
+        return {"holder": self.holder, "is_leader": self.is_leader}
+
+
+def current_leader(name: str = WORKER_LEASE) -> dict | None:
+    """Who holds *name* right now (any process), or None."""
+    return get_lease(name)
@@ -0,0 +1,130 @@
+"""Scheduled database maintenance, run off-peak by the search worker.
+
+Dedup, outlier moves, revalidation, archival and page-view pruning all
+delete rows.  That leaves free pages behind, grows the WAL, and leaves the
+query planner without statistics.  Once a day, inside a quiet window that
+starts at ``maintenance_hour`` (a local hour setting, default 4; anything
+outside 0-23 turns it off), both databases get:
+
+1. a sampled ``ANALYZE`` for fresh planner statistics,
+2. ``incremental_vacuum`` in chunks of ``VACUUM_CHUNK`` pages until the
+   freelist is empty, with ordinary writes queuing between chunks,
+3. ``wal_checkpoint(TRUNCATE)`` to fold the WAL back into the file and
+   shrink it to zero.
+
+Each step has a time budget in ``BUDGETS``.  ANALYZE is interrupted when
+its budget runs out.  The vacuum stops between chunks.  The checkpoint
+gives up if readers still hold the WAL.  File, WAL and freelist sizes
+before and after the last run are kept in the settings table, where the
+admin process reads them.
+"""
+
+import json
+import logging
+import sqlite3
+import time
+from datetime import datetime
+from threading import Lock
+
+from .db import analyze, checkpoint, database_sizes, get_setting, incremental_vacuum, set_setting
+
+log = logging.getLogger(__name__)
+
+MAINTENANCE_HOUR = 4          # local hour the quiet window starts
+MAINTENANCE_WINDOW = 2        # hours; a search cycle is sure to end inside it
+MAINTENANCE_MIN_GAP = 12 * 3600  # seconds, so one window gives one run
+BUDGETS = {"analyze": 10.0, "vacuum": 30.0, "checkpoint": 5.0}  # seconds per database
+VACUUM_CHUNK = 256            # pages freed per writer command
+DATABASES = ("main", "analytics")
+LAST_RUN_KEY = "maintenance_last_run"
+RESULT_KEY = "maintenance_last_result"
+
+
+def maintenance_hour() -> int:
+    try:
+        return int(get_setting("maintenance_hour", str(MAINTENANCE_HOUR)))
+    except (ValueError, TypeError):
+        return MAINTENANCE_HOUR
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, round(time.perf_counter() - start, 3)
+
+
+def _vacuum(database: str, free_pages: int) -> bool:
+    deadline = time.monotonic() + BUDGETS["vacuum"]
+    while free_pages and time.monotonic() < deadline:
+        free_pages = incremental_vacuum(database, VACUUM_CHUNK)
+    return free_pages == 0
+
+
+def maintain(database: str) -> dict:
+    """Run every step on *database*; returns sizes before/after and per-step timings."""
+    before = database_sizes(database)
+    steps = {}
+    complete, seconds = _timed(analyze, database, BUDGETS["analyze"])
+    steps["analyze"] = {"complete": complete, "seconds": seconds}
+    complete, seconds = _timed(_vacuum, database, before["free_pages"])
+    steps["vacuum"] = {"complete": complete, "seconds": seconds}
+    complete, seconds = _timed(checkpoint, database, BUDGETS["checkpoint"])
+    steps["checkpoint"] = {"complete": complete, "seconds": seconds}
+    return {"before": before, "after": database_sizes(database), "steps": steps}
+
+
+_maintenance_lock = Lock()
+
+
+def run_maintenance() -> dict:
+    """Maintain both databases now. Returns (and stores) the summary."""
+    with _maintenance_lock:
+        start = time.perf_counter()
+        summary: dict = {"started_at": datetime.now().isoformat(timespec="seconds")}
+        for database in DATABASES:
+            try:
+                summary[database] = maintain(database)
+            except sqlite3.Error as e:
+                log.error(f"Maintenance of {database} failed: {e}")
+                summary[database] = {"error": str(e)}
+        summary["seconds"] = round(time.perf_counter() - start, 3)
+    set_setting(RESULT_KEY, json.dumps(summary))
+    for database in DATABASES:
+        if "after" in summary[database]:
+            before, after = summary[database]["before"], summary[database]["after"]
+            log.info(f"Maintenance ({database}): file {before['file_bytes']} -> {after['file_bytes']} bytes, "
+                     f"WAL {before['wal_bytes']} -> {after['wal_bytes']}, "
+                     f"free pages {before['free_pages']} -> {after['free_pages']}")
+    return summary
+
+
+def maintenance_due(now: datetime | None = None) -> bool:
+    now = now or datetime.now()
+    hour = maintenance_hour()
+    if not 0 <= hour <= 23 or (now.hour - hour) % 24 >= MAINTENANCE_WINDOW:
+        return False
+    try:
+        last = float(get_setting(LAST_RUN_KEY, "0"))
+    except ValueError:
+        last = 0.0
+    return now.timestamp() - last >= MAINTENANCE_MIN_GAP
+
+
+def maintain_if_due() -> dict | None:
+    """Run :func:`run_maintenance` once per quiet window."""
+    if not maintenance_due():
+        return None
+    set_setting(LAST_RUN_KEY, str(time.time()))
+    return run_maintenance()
+
+
+def stats() -> dict:
+    try:
+        last = json.loads(get_setting(RESULT_KEY, "null"))
+    except ValueError:
+        last = None
+    return {
+        "hour": maintenance_hour(),
+        "last": last,
+        "current": {database: database_sizes(database) for database in DATABASES},
+    }
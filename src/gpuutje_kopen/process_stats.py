@@ -0,0 +1,75 @@
+"""Runtime counters of the public app, readable from the admin app.
+
+The reader pools the public app's request threads borrow from live in
+its own process, but ``/api/stats`` is answered by the admin process.
+The public app therefore writes its counters as JSON to the settings
+table every ``PUBLISH_INTERVAL`` seconds; the admin reads the latest
+copy back with :func:`public_process_stats`.
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+from threading import Event as StopEvent, Thread
+from typing import Callable
+
+from .db import get_setting, set_setting
+
+log = logging.getLogger(__name__)
+
+PUBLIC_STATS_KEY = "public_process_stats"
+PUBLISH_INTERVAL = 30.0  # seconds between snapshots
+
+
+def snapshot(sources: dict[str, Callable[[], dict]]) -> dict:
+    """Call every source; one failing source does not hide the others."""
+    stats: dict = {"pid": os.getpid(), "published_at": datetime.now().isoformat(timespec="seconds")}
+    for name, source in sources.items():
+        try:
+            stats[name] = source()
+        except Exception as e:
+            stats[name] = {"error": str(e)}
+    return stats
+
+
+def publish(sources: dict[str, Callable[[], dict]]):
+    set_setting(PUBLIC_STATS_KEY, json.dumps(snapshot(sources)))
+
+
+def public_process_stats() -> dict | None:
+    """The public app's last published counters, or None if it never published."""
+    try:
+        return json.loads(get_setting(PUBLIC_STATS_KEY))
+    except ValueError:
+        return None
+
+
+# ── Publisher thread ──────────────────────────────────────────────────
+
+_stop = StopEvent()
+_thread: Thread | None = None
+
+
+def _run(sources: dict[str, Callable[[], dict]]):
+    while True:
+        try:
+            publish(sources)
+        except Exception as e:
+            log.debug(f"Publishing process stats failed: {e}")
+        if _stop.wait(PUBLISH_INTERVAL):
+            return
+
+
+def start_stats_publisher(**sources: Callable[[], dict]):
+    """Publish ``{name: source()}`` now and every ``PUBLISH_INTERVAL`` seconds (idempotent)."""
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return
+    _stop.clear()
+    _thread = Thread(target=_run, args=(sources,), name="stats-publisher", daemon=True)
+    _thread.start()
+
+
+def stop_stats_publisher():
+    _stop.set()
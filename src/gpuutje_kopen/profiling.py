@@ -0,0 +1,193 @@
+"""On-demand profiling of search cycles and single GPU searches.
+
+Nothing is profiled unless the admin asks for it.  A request for the next
+cycle is a settings row (``PROFILE_REQUEST_KEY``) holding the mode.  The
+worker reads it once per cycle and clears it before running the cycle
+under :func:`capture`, so with no request pending a cycle costs one
+indexed settings read.
+
+Two modes:
+
+``sample``
+    A thread records the stacks of the profiled thread and of the SQLite
+    writer threads every ``SAMPLE_INTERVAL`` seconds.  This has almost no
+    overhead, so timings stay realistic.
+``cprofile``
+    The same sampler, plus :mod:`cProfile` on the profiled thread.  It
+    counts every call, which slows pure-Python code (tokenizing, matching)
+    down noticeably.  It yields a ``pstats`` dump for snakeviz or
+    :mod:`pstats`, and a top-functions report.
+
+Samples become collapsed stacks, one ``frame;frame;frame count`` line per
+distinct stack.  The first frame is the thread's name.  That text feeds
+``flamegraph.pl`` or speedscope as is.  Writer-thread samples taken while
+the writer is idle are dropped.  The profiled thread keeps its samples of
+waiting on a write, because that wait is the commit cost.
+"""
+
+import cProfile
+import gzip
+import io
+import logging
+import marshal
+import pstats
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator
+
+from .db import get_setting, save_profile, set_setting
+
+log = logging.getLogger(__name__)
+
+MODES = ("sample", "cprofile")
+PROFILE_REQUEST_KEY = "profile_next_cycle"  # mode for the next cycle, set by the admin
+SAMPLE_INTERVAL = 0.005     # seconds between stack samples
+SAMPLE_MAX_DEPTH = 96       # frames kept per stack, innermost first to go
+REPORT_LINES = 60           # functions in the cProfile text report
+WRITER_THREAD_PREFIX = "sqlite-writer-"
+_IDLE_FILES = {threading.__file__, queue.__file__}  # a writer blocked here waits for work
+
+
+def _check_mode(mode: str):
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+
+
+def request_profile(mode: str):
+    """Have the worker profile its next cycle in *mode*."""
+    _check_mode(mode)
+    set_setting(PROFILE_REQUEST_KEY, mode)
+
+
+def take_request() -> str | None:
+    """The pending cycle-profile mode, cleared so it applies once; None when nothing is asked."""
+    mode = get_setting(PROFILE_REQUEST_KEY)
+    if not mode:
+        return None
+    set_setting(PROFILE_REQUEST_KEY, "")
+    return mode if mode in MODES else None
+
+
+# ── Sampling ──────────────────────────────────────────────────────────
+
+def _frame_label(code) -> str:
+    return f"{code.co_qualname} ({Path(code.co_filename).name}:{code.co_firstlineno})".replace(";", ":")
+
+
+class Sampler:
+    """Collect collapsed stacks of one thread (and busy SQLite writers) on a timer."""
+
+    def __init__(self, ident: int, interval: float = SAMPLE_INTERVAL):
+        self.ident = ident
+        self.interval = interval
+        self.stacks: dict[str, int] = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, "")
+                if ident == self.ident:
+                    self.samples += 1
+                elif not name.startswith(WRITER_THREAD_PREFIX) or frame.f_code.co_filename in _IDLE_FILES:
+                    continue
+                self._record(name or str(ident), frame)
+
+    def _record(self, thread: str, frame):
+        labels = []
+        while frame is not None and len(labels) < SAMPLE_MAX_DEPTH:
+            labels.append(_frame_label(frame.f_code))
+            frame = frame.f_back
+        labels.append(thread.replace(";", ":"))
+        stack = ";".join(reversed(labels))
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+# ── Capture ───────────────────────────────────────────────────────────
+
+@dataclass
+class Capture:
+    """What one profiled run produced; filled in when :func:`capture` exits."""
+
+    mode: str
+    started_at: int = 0
+    seconds: float = 0.0
+    samples: int = 0
+    collapsed: str = ""
+    report: str = ""
+    pstats: bytes | None = field(default=None, repr=False)  # marshalled, like ``Profile.dump_stats``
+
+
+@contextmanager
+def capture(mode: str) -> Iterator[Capture]:
+    """Profile the calling thread for the duration of the ``with`` block."""
+    _check_mode(mode)
+    result = Capture(mode, started_at=int(time.time()))
+    sampler = Sampler(threading.get_ident())
+    profiler = cProfile.Profile() if mode == "cprofile" else None
+    start = time.perf_counter()
+    sampler.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield result
+    finally:
+        if profiler:
+            profiler.disable()
+        sampler.stop()
+        result.seconds = round(time.perf_counter() - start, 3)
+        result.samples = sampler.samples
+        result.collapsed = sampler.collapsed()
+        if profiler:
+            stats = pstats.Stats(profiler)
+            result.pstats = marshal.dumps(stats.stats)
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats("cumulative").print_stats(REPORT_LINES)
+            result.report = out.getvalue()
+
+
+def profile(target: str, mode: str, fn: Callable, *args, cycle: Callable[[object], int | None] = lambda _: None):
+    """Call ``fn(*args)`` under :func:`capture` and store the profile, even when *fn* raises.
+
+    *target* names what ran (``"cycle"`` or a GPU id).  *cycle* maps *fn*'s
+    return value to the id of the search cycle it ran, if any.  Returns
+    ``(fn's result, profile id)``.
+    """
+    _check_mode(mode)
+    result = None
+    try:
+        with capture(mode) as cap:
+            result = fn(*args)
+    finally:
+        pk = save_profile(
+            target=target,
+            mode=mode,
+            cycle=cycle(result),
+            started_at=cap.started_at,
+            seconds=cap.seconds,
+            samples=cap.samples,
+            report=cap.report,
+            pstats=gzip.compress(cap.pstats) if cap.pstats else None,
+            collapsed=gzip.compress(cap.collapsed.encode()),
+        )
+        log.info(f"Profiled {target} ({mode}): {cap.seconds}s, {cap.samples} samples, profile {pk}")
+    return result, pk
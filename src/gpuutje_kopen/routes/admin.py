@@ -1,7 +1,7 @@
 """Admin / control panel routes."""
 
 from dataclasses import asdict
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, Response, render_template, request, jsonify, stream_with_context
 from ..db import (
     GPU,
     load_gpu_list,
@@ -21,21 +21,61 @@ from ..db import (
     restore_outlier,
     delete_outlier,
     outlier_count,
+    observation_counts,
     sweep_outliers,
     revalidate_listings,
     browse_restored_listings,
     unrestore_listing,
     traffic_stats,
+    connection_stats,
+    schema_version,
+    list_profiles,
+    get_profile,
 )
-from ..services import data_stats, refresh_gpu_cache
-from ..search_worker import run_search_cycle, SEARCH_INTERVAL, _stop_event, get_search_interval, set_search_interval
+from ..cache import bump_generation
+from ..snapshot import schedule_publish
+from ..services import data_stats, export_listings_csv, refresh_gpu_cache
+from .. import archive, maintenance, profiling
+from ..process_stats import public_process_stats
+from ..leader import current_leader
+from ..search_worker import (
+    SEARCH_INTERVAL,
+    get_search_interval,
+    set_search_interval,
+    request_search,
+    profile_search_gpu,
+)
+import gzip
 import logging
-import threading
 
 log = logging.getLogger(__name__)
 admin = Blueprint("admin", __name__)
 
 
+# Mutations that leave public data alone: worker control, profiling
+# requests and maintenance.  Profiling one GPU stays out of this set, as
+# it saves that GPU's listings like a search cycle does.
+_KEEPS_PUBLIC_DATA = {
+    "admin.trigger_search",
+    "admin.update_search_interval",
+    "admin.api_profile_cycle",
+    "admin.api_maintenance",
+}
+
+
+@admin.after_request
+def invalidate_public_cache(response):
+    """A successful admin data edit makes cached responses and snapshots stale."""
+    if (request.method in ("POST", "PUT", "DELETE") and response.status_code < 400
+            and request.endpoint not in _KEEPS_PUBLIC_DATA):
+        try:
+            bump_generation()
+        except Exception as e:
+            log.error(f"Could not bump data generation: {e}")
+        schedule_publish()
+    return response
+
+
 @admin.route("/")
 def dashboard():
     return render_template("admin.html")
@@ -48,8 +88,16 @@ def stats():
     s = data_stats()
     s["search_interval_min"] = get_search_interval() / 60
     s["search_interval_sec"] = get_search_interval()
-    s["worker_running"] = not _stop_event.is_set()
+    leader = current_leader()
+    s["worker_running"] = leader is not None
+    s["worker_leader"] = leader["holder"] if leader else None
     s["outlier_count"] = outlier_count()
+    s["observations"] = observation_counts()
+    s["archive"] = archive.stats()
+    s["db_connections"] = connection_stats()
+    s["public_process"] = public_process_stats()  # pools of the app serving the public site
+    s["schema_version"] = schema_version()
+    s["maintenance"] = maintenance.stats()
     return jsonify(s)
 
 
@@ -57,8 +105,10 @@ def stats():
 
 @admin.route("/api/trigger-search", methods=["POST"])
 def trigger_search():
-    threading.Thread(target=run_search_cycle, daemon=True).start()
-    return jsonify({"status": "started"})
+    """Ask the worker for a cycle.  Only the lease holder runs cycles, so with
+    no leader the request waits for the next process to be elected."""
+    request_search()  # the elected worker picks it up within a second
+    return jsonify({"status": "requested" if current_leader() is not None else "queued"})
 
 
 @admin.route("/api/search-interval", methods=["PUT"])
@@ -72,6 +122,67 @@ def update_search_interval():
         return jsonify({"error": str(e)}), 400
 
 
+# ── Profiling ─────────────────────────────────────────────────────────
+
+def _profile_mode() -> str:
+    body = request.get_json(silent=True) or {}
+    mode = body.get("mode", "sample")
+    if mode not in profiling.MODES:
+        raise ValueError(f"mode must be one of {', '.join(profiling.MODES)}")
+    return mode
+
+
+@admin.route("/api/profiles")
+def api_profiles():
+    return jsonify(list_profiles())
+
+
+@admin.route("/api/profiles/cycle", methods=["POST"])
+def api_profile_cycle():
+    """Profile the next search cycle (``{"mode": "sample" | "cprofile"}``)."""
+    try:
+        mode = _profile_mode()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    profiling.request_profile(mode)
+    request_search()
+    return jsonify({"status": "requested" if current_leader() is not None else "queued", "mode": mode})
+
+
+@admin.route("/api/profiles/gpu/<gpu_id>", methods=["POST"])
+def api_profile_gpu(gpu_id: str):
+    """Search one GPU here, under the profiler, and return the stored profile."""
+    try:
+        mode = _profile_mode()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        found, pk = profile_search_gpu(gpu_id, mode)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    profile = get_profile(pk)
+    return jsonify({"status": "done", "found": found, "profile": {
+        k: v for k, v in profile.items() if k not in ("report", "pstats", "collapsed")
+    }})
+
+
+@admin.route("/api/profiles/<int:pk>/<part>")
+def api_profile_download(pk: int, part: str):
+    """``report`` (text), ``collapsed`` (flame-graph input) or ``pstats`` (binary dump)."""
+    profile = get_profile(pk)
+    if profile is None:
+        return jsonify({"error": "Not found"}), 404
+    if part == "report":
+        return Response(profile["report"] or "No cProfile report: this profile was sampled.\n", mimetype="text/plain")
+    if part == "collapsed":
+        return Response(gzip.decompress(profile["collapsed"]), mimetype="text/plain", headers={
+            "Content-Disposition": f"attachment; filename=profile-{pk}.collapsed.txt"})
+    if part == "pstats" and profile["pstats"] is not None:
+        return Response(gzip.decompress(profile["pstats"]), mimetype="application/octet-stream", headers={
+            "Content-Disposition": f"attachment; filename=profile-{pk}.pstats"})
+    return jsonify({"error": "Not found"}), 404
+
+
 # ── GPU CRUD ──────────────────────────────────────────────────────────
 
 @admin.route("/api/gpus")
@@ -178,6 +289,30 @@ def remove_results_by_gpu(gpu_id: str):
     return jsonify({"status": "deleted", "count": count})
 
 
+# ── Archive / export / maintenance ────────────────────────────────────
+
+@admin.route("/api/archive", methods=["POST"])
+def api_archive():
+    result = archive.archive_cold_rows()
+    return jsonify({"status": "skipped" if "skipped" in result else "done", **result})
+
+
+@admin.route("/api/maintenance", methods=["POST"])
+def api_maintenance():
+    """ANALYZE, vacuum and checkpoint both databases now instead of off-peak."""
+    return jsonify(maintenance.run_maintenance())
+
+
+@admin.route("/api/export/listings.csv")
+def api_export_listings():
+    """All listings, hot and archived, streamed as CSV."""
+    return Response(
+        stream_with_context(export_listings_csv()),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=listings.csv"},
+    )
+
+
 # ── Outliers ──────────────────────────────────────────────────────────
 
 @admin.route("/api/outliers")
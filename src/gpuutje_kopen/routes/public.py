@@ -1,10 +1,17 @@
 """Public-facing routes (main dashboard + data APIs)."""
 
+import gzip
+import hashlib
 import time
+import zlib
 from collections import defaultdict
-from flask import Blueprint, render_template, request, jsonify
-from ..services import GPU_LIST, price_history, scatter_points, filtered_results, data_stats
-from ..db import record_page_view
+from functools import wraps
+from flask import Blueprint, Response, render_template, request, jsonify, make_response
+from ..cache import current_generation, response_cache
+from ..catalog import current_catalog
+from ..events import bus
+from ..services import public_gpu_list, price_series, compare_price_series, scatter_points, stream_results, data_stats, dashboard_bootstrap
+from ..tracking import enqueue_page_view
 
 public = Blueprint("public", __name__)
 
@@ -12,6 +19,12 @@ public = Blueprint("public", __name__)
 _pv_last_write: dict[str, float] = defaultdict(float)
 _PV_MIN_INTERVAL = 1.0  # seconds
 
+GZIP_MIN_BYTES = 1024         # smaller bodies are sent uncompressed
+GZIP_LEVEL = 6
+RESULTS_MAX_LIMIT = 500  # rows per results page; ``limit`` only trims it
+RESULTS_CACHE_MAX_BYTES = 1024 * 1024  # streamed results larger than this are not cached
+COMPARE_MAX_IDS = 8
+
 
 @public.before_request
 def track_page_view():
@@ -24,7 +37,7 @@ def track_page_view():
         if now - _pv_last_write[ip] < _PV_MIN_INTERVAL:
             return
         _pv_last_write[ip] = now
-        record_page_view(
+        enqueue_page_view(
             path=request.path,
             ip=ip,
             user_agent=(request.user_agent.string or "")[:256],
@@ -33,6 +46,84 @@ def track_page_view():
         pass  # never break the request over analytics
 
 
+def _cache_key() -> tuple:
+    """Path, args, data generation and catalog version.
+
+    An admin GPU edit bumps both counters, but this process polls them on
+    different intervals; with the catalog version in the key, a response
+    built from the old catalog under the new generation is never served
+    once the new catalog has been loaded.
+    """
+    args = tuple(sorted(request.args.items(multi=True)))
+    return (request.path, args, current_generation(), current_catalog().version)
+
+
+def _accepts_gzip() -> bool:
+    return request.accept_encodings["gzip"] > 0
+
+
+def _cached_response(key: tuple, body: bytes, etag: str, status: str) -> Response:
+    """Build a conditional response, gzipped (and cached as such) when worthwhile."""
+    gzipped = len(body) >= GZIP_MIN_BYTES and _accepts_gzip()
+    if gzipped:
+        gz_key = key + ("gzip",)
+        entry = response_cache.get(gz_key)
+        if entry is None:
+            entry = (gzip.compress(body, GZIP_LEVEL, mtime=0), etag + "-gz")
+            response_cache.put(gz_key, *entry)
+        body, etag = entry
+    resp = Response(body, mimetype="application/json")
+    if gzipped:
+        resp.content_encoding = "gzip"
+    resp.vary.add("Accept-Encoding")
+    resp.set_etag(etag)
+    resp.headers["X-Cache"] = status
+    return resp.make_conditional(request)
+
+
+def cached_json(view):
+    """Serve *view* from the response cache, keyed by :func:`_cache_key`.
+
+    Cached responses carry an ``ETag`` so clients revalidating with
+    ``If-None-Match`` get a 304 without a body.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = _cache_key()
+        entry = response_cache.get(key)
+        status = "HIT"
+        if entry is None:
+            status = "MISS"
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code != 200:
+                return resp  # errors are not cached
+            body = resp.get_data()
+            entry = (body, hashlib.sha1(body).hexdigest())
+            response_cache.put(key, *entry)
+        return _cached_response(key, *entry, status)
+    return wrapper
+
+
+def _stream_and_cache(key: tuple, chunks, compress: bool):
+    """Pass *chunks* through (optionally gzipped) and cache the body if it stays small."""
+    kept: list[bytes] | None = []
+    size = 0
+    gz = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+    for chunk in chunks:
+        if kept is not None:
+            size += len(chunk)
+            if size <= RESULTS_CACHE_MAX_BYTES:
+                kept.append(chunk)
+            else:
+                kept = None
+        yield gz.compress(chunk) + gz.flush(zlib.Z_SYNC_FLUSH) if gz else chunk
+    if gz:
+        yield gz.flush()
+    if kept is not None:
+        body = b"".join(kept)
+        response_cache.put(key, body, hashlib.sha1(body).hexdigest())
+
+
 @public.route("/")
 def index():
     return render_template("index.html")
@@ -44,41 +135,116 @@ def test_page():
 
 
 @public.route("/api/gpus")
+@cached_json
 def api_gpus():
-    return jsonify([{"id": g.id, "name": g.name, "vram": g.vram, "tokens_sec": g.tokens_sec} for g in GPU_LIST])
+    return jsonify(public_gpu_list())
 
 
 @public.route("/api/price-history/<gpu_id>")
+@cached_json
 def api_price_history(gpu_id):
     agg = request.args.get("agg", "min")
     span = request.args.get("span", "30d")
-    history = price_history(gpu_id, agg=agg, span=span)
-    return jsonify({"dates": [h[0] for h in history], "prices": [h[1] for h in history]})
+    return jsonify(price_series(gpu_id, agg=agg, span=span, points=request.args.get("points", type=int)))
+
+
+@public.route("/api/price-history")
+@cached_json
+def api_price_history_compare():
+    """Price histories of up to ``COMPARE_MAX_IDS`` GPUs (``ids=a,b,c``) on one date axis."""
+    ids = [i for i in request.args.get("ids", "").split(",") if i]
+    if not ids:
+        return jsonify({"error": "ids is required"}), 400
+    if len(ids) > COMPARE_MAX_IDS:
+        return jsonify({"error": f"at most {COMPARE_MAX_IDS} ids per request"}), 400
+    agg = request.args.get("agg", "min")
+    span = request.args.get("span", "30d")
+    return jsonify(compare_price_series(ids, agg=agg, span=span))
 
 
 @public.route("/api/scatter-data")
+@cached_json
 def api_scatter_data():
-    days_str = request.args.get("days")
     metric = request.args.get("metric", "vram")
-    if days_str == "all":
-        days = None
-    else:
-        days = request.args.get("days", 30, type=int)
-    return jsonify({"points": scatter_points(metric=metric, days=days)})
+    return jsonify({"points": scatter_points(metric=metric, days=_days_arg())})
 
 
-@public.route("/api/results")
-def api_results():
-    return jsonify(filtered_results(
+def _days_arg() -> int | None:
+    if request.args.get("days") == "all":
+        return None
+    return request.args.get("days", 30, type=int)
+
+
+def _results_args() -> dict:
+    return dict(
         min_vram=request.args.get("min_vram", 0, type=int),
         min_tokens=request.args.get("min_tokens", 0, type=float),
         max_price=request.args.get("max_price", 999999, type=int),
         search=request.args.get("search", "").lower(),
         sort_by=request.args.get("sort_by", "timestamp"),
         order=request.args.get("order", "desc"),
-    ))
+        active_only=request.args.get("active_only", "0") in ("1", "true"),
+        limit=max(1, min(request.args.get("limit", RESULTS_MAX_LIMIT, type=int), RESULTS_MAX_LIMIT)),
+    )
+
+
+@public.route("/api/results")
+def api_results():
+    """Filtered listings, streamed on a cache miss.
+
+    The JSON (at most ``RESULTS_MAX_LIMIT`` rows) is read and written
+    one keyset-paginated batch at a time, gzipped when the client accepts
+    it, so memory stays at one batch and no reader waits on the client.
+    Bodies up to ``RESULTS_CACHE_MAX_BYTES`` are cached and served with an
+    ``ETag`` afterwards.
+    """
+    key = _cache_key()
+    entry = response_cache.get(key)
+    if entry is not None:
+        return _cached_response(key, *entry, "HIT")
+    compress = _accepts_gzip()
+    resp = Response(_stream_and_cache(key, stream_results(**_results_args()), compress), mimetype="application/json")
+    if compress:
+        resp.content_encoding = "gzip"
+    resp.vary.add("Accept-Encoding")
+    resp.headers["X-Cache"] = "MISS"
+    return resp
 
 
 @public.route("/api/stats")
+@cached_json
 def api_stats():
     return jsonify(data_stats())
+
+
+@public.route("/api/events")
+def api_events():
+    """Server-sent events: ``listings`` per GPU with new listings or price drops,
+    ``cycle_finished`` when this process's worker finished a cycle, and
+    ``data_changed`` when another process changed the data."""
+    if bus.full():
+        return jsonify({"error": "too many event streams"}), 503, {"Retry-After": "30"}
+    last_id = request.headers.get("Last-Event-ID", type=int)
+    return Response(
+        bus.stream(last_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@public.route("/api/bootstrap")
+@cached_json
+def api_bootstrap():
+    """Catalog, stats, price history, both scatters and results in one response.
+
+    Accepts the query parameters of the individual endpoints: ``gpu``,
+    ``span``, ``points``, ``days`` and the ``/api/results`` filters, whose
+    ``limit`` trims the first results page.
+    """
+    return jsonify(dashboard_bootstrap(
+        gpu_id=request.args.get("gpu"),
+        span=request.args.get("span", "30d"),
+        days=_days_arg(),
+        points=request.args.get("points", type=int),
+        results=_results_args(),
+    ))
@@ -0,0 +1,231 @@
+"""Where the search worker gets listings from.
+
+``search_worker.search_gpu`` asks the current backend (see
+``search_worker.set_search_backend``) for the listings of each search
+query.  A backend has a ``search(query)`` method returning listing objects
+with ``id``, ``title``, ``price``, ``link``, ``date`` and ``location.city``,
+like ``marktplaats.Listing``.  Its ``pause`` attribute sets the seconds
+the worker waits between GPUs.
+
+* :class:`MarktplaatsBackend` - the live site (the default),
+* :class:`RecordingBackend` - wraps another backend and appends every
+  response, or failure, with its latency to a cassette,
+* :class:`ReplayBackend` - answers from a cassette without network, with
+  configurable latency, injected errors and a rate limit.
+
+A cassette is gzipped JSON lines, one response per line::
+
+    {"query": "rtx 3090", "seconds": 0.41, "listings": [{"id": "m123", "title": ..., "price": 650.0,
+     "link": ..., "date": "2026-10-01", "city": "Utrecht"}, ...]}
+    {"query": "rtx 3090", "seconds": 2.0, "error": "HTTPError: 503 Server Error"}
+
+Replay hands out the responses recorded for a query in turn, so a cassette
+recorded over several cycles replays their price changes in order.  It
+wraps around after the last one.
+"""
+
+import gzip
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Protocol
+
+from marktplaats import SearchQuery, category_from_name
+
+ZIP_CODE = "1016LV"
+DISTANCE = 100000000  # metres: the whole country
+LIMIT = 100           # listings per query
+CATEGORY = "Videokaarten"
+LIVE_PAUSE = 0.5      # seconds between GPUs, to go easy on the site
+
+
+class SearchError(Exception):
+    """A search query failed (replayed or injected)."""
+
+
+class SearchThrottled(SearchError):
+    """A search query was refused for going over the rate limit, like an HTTP 429."""
+
+
+class SearchBackend(Protocol):
+    pause: float
+
+    def search(self, query: str) -> list: ...
+
+
+# ── Listings ──────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class Location:
+    city: str | None
+
+
+@dataclass(frozen=True)
+class Listing:
+    """The part of ``marktplaats.Listing`` the worker reads."""
+
+    id: str | None
+    title: str
+    price: float | None
+    link: str
+    date: date | None
+    location: Location | None
+
+
+def listing_to_dict(listing) -> dict:
+    day = getattr(listing, "date", None)
+    location = getattr(listing, "location", None)
+    price = getattr(listing, "price", None)
+    return {
+        "id": str(listing.id) if getattr(listing, "id", None) is not None else None,
+        "title": str(getattr(listing, "title", "") or ""),
+        "price": float(price) if isinstance(price, (int, float)) else None,
+        "link": getattr(listing, "link", "") or "",
+        "date": day.isoformat() if day else None,
+        "city": getattr(location, "city", None) if location else None,
+    }
+
+
+def listing_from_dict(d: dict) -> Listing:
+    return Listing(
+        id=d.get("id"),
+        title=d["title"],
+        price=d.get("price"),
+        link=d.get("link", ""),
+        date=date.fromisoformat(d["date"]) if d.get("date") else None,
+        location=Location(d.get("city")),
+    )
+
+
+# ── Cassettes ─────────────────────────────────────────────────────────
+
+class CassetteWriter:
+    """Append responses to a cassette; safe to share between threads."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def write(self, query: str, seconds: float, listings: list | None = None, error: str | None = None):
+        entry: dict = {"query": query, "seconds": round(seconds, 3)}
+        if error is None:
+            entry["listings"] = [listing_to_dict(listing) for listing in listings or ()]
+        else:
+            entry["error"] = error
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock, gzip.open(self.path, "at", encoding="utf-8") as f:  # one gzip member per entry
+            f.write(line)
+
+
+def read_cassette(path: Path) -> dict[str, list[dict]]:
+    """``query -> [response, ...]`` in recording order."""
+    responses: dict[str, list[dict]] = defaultdict(list)
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                responses[entry["query"]].append(entry)
+    return dict(responses)
+
+
+# ── Backends ──────────────────────────────────────────────────────────
+
+class MarktplaatsBackend:
+    """The live site, through ``marktplaats.SearchQuery``."""
+
+    pause = LIVE_PAUSE
+
+    def search(self, query: str) -> list:
+        return SearchQuery(
+            query=query,
+            zip_code=ZIP_CODE,
+            distance=DISTANCE,
+            limit=LIMIT,
+            category=category_from_name(CATEGORY),
+        ).get_listings()
+
+
+class RecordingBackend:
+    """Pass queries to *inner* and record each response (or failure) to *cassette*."""
+
+    def __init__(self, inner: SearchBackend, cassette: Path):
+        self.inner = inner
+        self.pause = inner.pause
+        self.writer = CassetteWriter(cassette)
+
+    def search(self, query: str) -> list:
+        start = time.perf_counter()
+        try:
+            listings = self.inner.search(query)
+        except Exception as e:
+            self.writer.write(query, time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+            raise
+        self.writer.write(query, time.perf_counter() - start, listings)
+        return listings
+
+
+class ReplayBackend:
+    """Answer queries from a cassette.
+
+    *latency* fixes the seconds every answer takes; by default each takes
+    its recorded time times *latency_scale*.  *error_rate* fails that share
+    of queries with :class:`SearchError`, on top of the recorded failures.
+    With *rate_limit* (queries per second, *burst* at once) queries over
+    the limit raise :class:`SearchThrottled`.  Unknown queries get no
+    listings.  The same *seed* gives the same failures.
+    """
+
+    pause = 0.0
+
+    def __init__(self, cassette: Path, *, latency: float | None = None, latency_scale: float = 1.0,
+                 error_rate: float = 0.0, rate_limit: float | None = None, burst: int = 1, seed: int = 0):
+        self.responses = read_cassette(cassette)
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self._rng = random.Random(seed)
+        self._next: dict[str, int] = defaultdict(int)
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+        self.counts = {"queries": 0, "misses": 0, "errors": 0, "throttled": 0}
+
+    def _admit(self) -> bool:
+        """Take a token from the rate-limit bucket (call with the lock held)."""
+        if self.rate_limit is None:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate_limit)
+        self._refilled = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def search(self, query: str) -> list:
+        with self._lock:
+            self.counts["queries"] += 1
+            if not self._admit():
+                self.counts["throttled"] += 1
+                raise SearchThrottled(f"rate limit of {self.rate_limit}/s exceeded")
+            recorded = self.responses.get(query)
+            if recorded:
+                entry = recorded[self._next[query] % len(recorded)]
+                self._next[query] += 1
+            else:
+                entry = {"seconds": 0.0, "listings": []}
+                self.counts["misses"] += 1
+            fail = "error" in entry or self._rng.random() < self.error_rate
+            self.counts["errors"] += fail
+        time.sleep(self.latency if self.latency is not None else entry["seconds"] * self.latency_scale)
+        if fail:
+            raise SearchError(entry.get("error", "injected failure"))
+        return [listing_from_dict(d) for d in entry["listings"]]
@@ -2,17 +2,27 @@
 
 import logging
 import time
+from datetime import datetime
 from threading import Thread, Event
-
-from marktplaats import SearchQuery, category_from_name
-
-from .db import GPU, load_gpu_list, save_listing, mark_active_listings, get_gpu, is_price_outlier, save_as_outlier, sweep_outliers, dedup_tables, revalidate_listings, revalidate_outliers, get_setting, set_setting, _conn
-from .validation import validate_listing, reload_gpu_cache
+from typing import Mapping
+
+from .db import GPU, save_listing, mark_active_listings, get_gpu, is_price_outlier, save_as_outlier, sweep_outliers, dedup_tables, revalidate_listings, revalidate_outliers, get_setting, set_setting, start_cycle, finish_cycle
+from .validation import validate_listing
+from .catalog import refresh_catalog
+from .cache import bump_generation
+from .snapshot import publish_snapshots
+from .archive import archive_if_due
+from .maintenance import maintain_if_due
+from .events import publish
+from . import profiling
+from .search_backends import MarktplaatsBackend, SearchBackend
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
 
 SEARCH_INTERVAL = 300  # default fallback
+SEARCH_REQUEST_KEY = "search_requested_at"  # set by the admin to start a cycle early
+EVENT_MAX_DROPS = 5    # price drops listed per "listings" event
 
 
 def get_search_interval() -> int:
@@ -27,20 +37,33 @@ def set_search_interval(seconds: int):
     set_setting("search_interval", str(seconds))
 
 
-def search_gpu(gpu: GPU, gpu_by_id: dict[str, GPU]) -> int:
-    """Search for a GPU and save results. Returns count of saved listings."""
+_backend: SearchBackend = MarktplaatsBackend()
+
+
+def set_search_backend(backend: SearchBackend) -> SearchBackend:
+    """Search through *backend* from now on (see ``search_backends``); returns the previous one."""
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
+
+
+def request_search():
+    """Ask whichever process runs the worker to start a cycle now."""
+    set_setting(SEARCH_REQUEST_KEY, datetime.now().isoformat())
+
+
+def search_gpu(gpu: GPU, gpu_by_id: Mapping[str, GPU], cycle: int | None = None) -> int:
+    """Search for a GPU and save results. Returns count of saved listings.
+
+    Price changes are logged under *cycle* when one is given.
+    """
     found = 0
     found_ids: set[str] = set()
+    changes: dict[str, dict] = {}
 
     for query_str in gpu.search_queries:
         try:
-            listings = SearchQuery(
-                query=query_str,
-                zip_code="1016LV",
-                distance=100000000,
-                limit=100,
-                category=category_from_name("Videokaarten"),
-            ).get_listings()
+            listings = _backend.search(query_str)
 
             for listing in listings:
                 try:
@@ -90,7 +113,15 @@ def search_gpu(gpu: GPU, gpu_by_id: dict[str, GPU]) -> int:
                         log.info(f"Outlier: '{title[:50]}' ({reason})")
                         continue
 
-                    save_listing(target_id, listing_data)
+                    status, previous = save_listing(target_id, listing_data, cycle)
+                    if status in ("new", "price_drop"):
+                        change = changes.setdefault(target_id, {"new": 0, "price_drops": []})
+                        if status == "new":
+                            change["new"] += 1
+                        else:
+                            change["price_drops"].append(
+                                {"title": title, "price": price, "previous_price": previous, "link": link}
+                            )
                     if listing_id is not None:
                         found_ids.add(str(listing_id))
                     found += 1
@@ -106,21 +137,33 @@ def search_gpu(gpu: GPU, gpu_by_id: dict[str, GPU]) -> int:
         except Exception as e:
             log.debug(f"Error marking active for {gpu.name}: {e}")
 
+    for gpu_id, change in changes.items():
+        target = gpu_by_id.get(gpu_id)
+        drops = sorted(change["price_drops"], key=lambda d: d["price"])
+        publish(
+            "listings",
+            gpu_id=gpu_id,
+            gpu=target.name if target else gpu_id,
+            new=change["new"],
+            price_drops=drops[:EVENT_MAX_DROPS],
+        )
+
     return found
 
 
-def run_search_cycle():
-    """Run one complete search cycle through all GPUs."""
+def run_search_cycle() -> int:
+    """Run one complete search cycle through all GPUs. Returns the cycle id."""
     log.info("Starting search cycle...")
-    reload_gpu_cache()
-    gpus = load_gpu_list()
-    gpu_by_id = {g.id: g for g in gpus}
+    catalog = refresh_catalog()
+    gpus = catalog.gpus
+    gpu_by_id = catalog.by_id
+    cycle = start_cycle()
     total = 0
     for gpu in gpus:
-        count = search_gpu(gpu, gpu_by_id)
+        count = search_gpu(gpu, gpu_by_id, cycle)
         total += count
         log.info(f"Found {count} listings for {gpu.name}")
-        time.sleep(0.5)
+        time.sleep(_backend.pause)
 
     # Re-validate listings against current matching algorithm
     rv = revalidate_listings()
@@ -141,35 +184,84 @@ def run_search_cycle():
     if dupes["listings"] or dupes["outliers"]:
         log.info(f"Dedup: {dupes['listings']} listing dupes, {dupes['outliers']} outlier dupes removed")
 
+    # Move old inactive rows to the Parquet archive (daily)
+    try:
+        archive_if_due()
+    except Exception as e:
+        log.error(f"Archival failed: {e}")
+
+    finish_cycle(cycle, total)
+    generation = bump_generation()
+    try:
+        publish_snapshots()
+    except Exception as e:
+        log.error(f"Snapshot publish failed: {e}")  # Flask still serves the API
+    publish("cycle_finished", generation=generation, total=total, finished_at=datetime.now().isoformat())
     log.info(f"Search cycle complete. Total: {total}")
+    return cycle
+
+
+def profile_search_cycle(mode: str) -> int:
+    """Run a search cycle under the profiler; returns the stored profile's id."""
+    _, pk = profiling.profile("cycle", mode, run_search_cycle, cycle=lambda cycle: cycle)
+    return pk
+
+
+def profile_search_gpu(gpu_id: str, mode: str) -> tuple[int, int]:
+    """Search one GPU under the profiler; returns (listings found, profile id)."""
+    catalog = refresh_catalog()
+    gpu = catalog.by_id.get(gpu_id)
+    if gpu is None:
+        raise ValueError(f"GPU {gpu_id!r} not found")
+    return profiling.profile(gpu_id, mode, search_gpu, gpu, catalog.by_id)
 
 
 _stop_event = Event()
+_worker_thread: Thread | None = None
 
 
 def worker_loop():
     log.info("Search worker started")
+    requested = get_setting(SEARCH_REQUEST_KEY)
     while not _stop_event.is_set():
         try:
-            run_search_cycle()
+            mode = profiling.take_request()
+            if mode:
+                profile_search_cycle(mode)
+            else:
+                run_search_cycle()
+        except Exception as e:
+            log.error(f"Search cycle error: {e}")  # failed writes are rolled back by db._writes
+        try:
+            maintain_if_due()
         except Exception as e:
-            log.error(f"Search cycle error: {e}")
-            try:
-                _conn().rollback()
-            except Exception:
-                pass
+            log.error(f"Database maintenance failed: {e}")
         remaining = get_search_interval()
         while remaining > 0 and not _stop_event.is_set():
             time.sleep(min(1, remaining))
             remaining -= 1
+            latest = get_setting(SEARCH_REQUEST_KEY)
+            if latest != requested:
+                requested = latest
+                log.info("Search requested, starting cycle early")
+                break
     log.info("Search worker stopping")
 
 
 def start_worker_thread() -> Thread:
-    t = Thread(target=worker_loop, daemon=True)
-    t.start()
+    """Start the worker, or keep a still-running one (e.g. re-elected mid-cycle)."""
+    global _worker_thread
+    _stop_event.clear()
+    if _worker_thread is not None and _worker_thread.is_alive():
+        return _worker_thread
+    _worker_thread = Thread(target=worker_loop, daemon=True)
+    _worker_thread.start()
     log.info("Search worker thread started")
-    return t
+    return _worker_thread
+
+
+def worker_running() -> bool:
+    return _worker_thread is not None and _worker_thread.is_alive() and not _stop_event.is_set()
 
 
 def stop_worker_thread():
@@ -1,50 +1,107 @@
 """Business logic layer – thin wrappers over db queries."""
 
+import csv
+import io
+from datetime import date, timedelta
+
+from . import archive
+from .catalog import current_catalog, refresh_catalog
 from .db import (
     GPU,
-    load_gpu_list,
     get_gpu,
-    avg_price_period,
-    lowest_listing,
+    avg_prices_period,
+    epoch_days_ago,
+    iter_listings_export,
+    lowest_listings,
     price_history as db_price_history,
+    price_history_bins,
+    price_history_multi,
+    price_totals_period,
+    span_bins,
     filtered_listings,
+    iter_filtered_results_json,
     listing_count,
     active_listing_count,
     gpu_listing_counts,
     last_updated,
 )
+from .timeseries import downsample
+
+
+def gpu_list() -> tuple[GPU, ...]:
+    """Current GPU catalog (shared snapshot, picks up edits from other processes)."""
+    return current_catalog().gpus
+
 
-# Cached GPU list (refreshed on import / app start)
-GPU_LIST: list[GPU] = load_gpu_list()
-_GPU_MAP: dict[str, GPU] = {g.id: g for g in GPU_LIST}
+def _gpu_filter(min_vram: int, min_tokens: float) -> list[str] | None:
+    """Ids of the GPUs meeting the minimums, or None when that is all of them.
+
+    Without a GPU filter the results query can walk its sort index and stop
+    at the limit; an ``IN`` list of every GPU makes it collect and sort
+    every listing instead.
+    """
+    gpus = gpu_list()
+    ids = [g.id for g in gpus if g.vram >= min_vram and g.tokens_sec >= min_tokens]
+    return ids if ids and len(ids) < len(gpus) else None
 
 
 def refresh_gpu_cache():
-    global GPU_LIST, _GPU_MAP
-    GPU_LIST = load_gpu_list()
-    _GPU_MAP = {g.id: g for g in GPU_LIST}
+    refresh_catalog()
+
+
+def public_gpu_list() -> list[dict]:
+    """Catalog as served by ``/api/gpus``."""
+    return [{"id": g.id, "name": g.name, "vram": g.vram, "tokens_sec": g.tokens_sec} for g in gpu_list()]
 
 
 # ── Scatter data ──────────────────────────────────────────────────────
 
-def scatter_points(metric: str = "vram", days: int | None = 30) -> list[dict]:
-    points = []
-    for gpu in GPU_LIST:
-        avg = avg_price_period(gpu.id, days)
+def _scatter_base(days: int | None) -> list[dict]:
+    """Metric-independent scatter rows; two grouped queries for all GPUs."""
+    avgs = _avg_prices(days)
+    lowest = lowest_listings()
+    base = []
+    for gpu in gpu_list():
+        avg = avgs.get(gpu.id) or 0
         if avg <= 0:
             continue
-        low = lowest_listing(gpu.id)
-        points.append({
-            "quality": gpu.vram if metric == "vram" else gpu.tokens_sec,
+        base.append({
             "price": avg,
             "gpu": gpu.name,
             "gpu_id": gpu.id,
             "vram": gpu.vram,
             "tokens": gpu.tokens_sec,
             "tokens_tested": gpu.tokens_tested,
-            "lowest": low,
+            "lowest": lowest.get(gpu.id),
         })
-    return points
+    return base
+
+
+def _avg_prices(days: int | None) -> dict[str, float]:
+    """Average price per GPU, including archived listings when the window reaches them."""
+    cutoff = 0 if days is None else epoch_days_ago(days)
+    if not archive.reaches(cutoff):
+        return avg_prices_period(days)
+    totals = price_totals_period(days)
+    for gpu_id, (total, n) in archive.archived_price_totals(cutoff).items():
+        hot_total, hot_n = totals.get(gpu_id, (0, 0))
+        totals[gpu_id] = (hot_total + total, hot_n + n)
+    return {gpu_id: total / n / 100 for gpu_id, (total, n) in totals.items()}
+
+
+def _with_quality(base: list[dict], metric: str) -> list[dict]:
+    key = "vram" if metric == "vram" else "tokens"
+    return [{"quality": p[key], **p} for p in base]
+
+
+def scatter_points(metric: str = "vram", days: int | None = 30) -> list[dict]:
+    return _with_quality(_scatter_base(days), metric)
+
+
+def scatter_datasets(days: int | None = 30) -> dict[str, list[dict]]:
+    """Both scatter metrics from one set of queries."""
+    base = _scatter_base(days)
+    return {"vram": _with_quality(base, "vram"), "tokens": _with_quality(base, "tokens")}
 
 
 # ── Filtered results (public) ────────────────────────────────────────
@@ -60,7 +117,7 @@ def filtered_results(
     active_only: bool = False,
     limit: int = 500,
 ) -> list[dict]:
-    gpu_ids = [g.id for g in GPU_LIST if g.vram >= min_vram and g.tokens_sec >= min_tokens] or None
+    gpu_ids = _gpu_filter(min_vram, min_tokens)
     rows = filtered_listings(
         gpu_ids=gpu_ids,
         min_price=0,
@@ -87,6 +144,35 @@ def filtered_results(
     ]
 
 
+def stream_results(
+    *,
+    min_vram: int = 0,
+    min_tokens: float = 0,
+    max_price: int = 999999,
+    search: str = "",
+    sort_by: str = "timestamp",
+    order: str = "desc",
+    active_only: bool = False,
+    limit: int = 500,
+):
+    """Same rows as :func:`filtered_results`, yielded as encoded JSON array chunks."""
+    gpu_ids = _gpu_filter(min_vram, min_tokens)
+    batches = iter_filtered_results_json(
+        gpu_ids=gpu_ids,
+        max_price=max_price,
+        search=search,
+        active_only=active_only,
+        sort_by=sort_by,
+        order=order,
+        limit=limit,
+    )
+    sep = "["
+    for batch in batches:
+        yield (sep + ",".join(batch)).encode()
+        sep = ","
+    yield b"]" if sep == "," else b"[]"
+
+
 # ── Stats ─────────────────────────────────────────────────────────────
 
 def data_stats() -> dict:
@@ -96,11 +182,126 @@ def data_stats() -> dict:
         "active_results": active_listing_count(),
         "gpu_counts": counts,
         "last_updated": last_updated(),
-        "tracked_gpus": len(GPU_LIST),
+        "tracked_gpus": len(gpu_list()),
     }
 
 
 # ── Price history ─────────────────────────────────────────────────────
 
+def _merged_price_history(gpu_ids: list[str], agg: str = "min", span: str = "30d") -> list[tuple[str, str, float]]:
+    """``price_history_multi`` over the hot table and the archive together."""
+    cutoff, weekly = span_bins(span)
+    bins: dict[tuple[str, int], tuple[int, int, int]] = {}
+    for gpu_id, day, low, total, n in price_history_bins(gpu_ids, span) + archive.archived_price_bins(gpu_ids, cutoff, weekly):
+        prev = bins.get((gpu_id, day))
+        bins[(gpu_id, day)] = (low, total, n) if prev is None else (min(prev[0], low), prev[1] + total, prev[2] + n)
+    epoch = date(1970, 1, 1)
+    return [
+        (gpu_id, (epoch + timedelta(days=day)).isoformat(), low / 100 if agg == "min" else total / n / 100)
+        for (gpu_id, day), (low, total, n) in sorted(bins.items(), key=lambda kv: kv[0][1])
+    ]
+
+
 def price_history(gpu_id: str, agg: str = "min", span: str = "30d"):
+    if archive.reaches(span_bins(span)[0]):
+        return [(period, val) for _, period, val in _merged_price_history([gpu_id], agg=agg, span=span)]
     return db_price_history(gpu_id, agg=agg, span=span)
+
+
+def price_series(gpu_id: str, agg: str = "min", span: str = "30d", points: int | None = None) -> dict:
+    """Price history as chart arrays, downsampled to *points* with min/max envelopes if given."""
+    history = price_history(gpu_id, agg=agg, span=span)
+    dates = [h[0] for h in history]
+    prices = [h[1] for h in history]
+    if points:
+        return downsample(dates, prices, points)
+    return {"dates": dates, "prices": prices}
+
+
+def default_gpu_id() -> str | None:
+    """GPU preselected on the dashboard: the plain RTX 3070, else the first one."""
+    gpus = gpu_list()
+    for gpu in gpus:
+        if "3070" in gpu.name and "Ti" not in gpu.name:
+            return gpu.id
+    return gpus[0].id if gpus else None
+
+
+def compare_price_series(gpu_ids: list[str], agg: str = "min", span: str = "30d") -> dict:
+    """Several GPUs' price histories on one shared, sorted date axis.
+
+    Unknown ids are dropped; a GPU without a listing in some period gets
+    ``None`` there so every series lines up with ``dates``.
+    """
+    by_id = current_catalog().by_id
+    ids = list(dict.fromkeys(i for i in gpu_ids if i in by_id))
+    history = _merged_price_history if archive.reaches(span_bins(span)[0]) else price_history_multi
+    rows = history(ids, agg=agg, span=span) if ids else []
+    dates = sorted({period for _, period, _ in rows})
+    index = {d: i for i, d in enumerate(dates)}
+    series = {i: [None] * len(dates) for i in ids}
+    for gpu_id, period, value in rows:
+        series[gpu_id][index[period]] = value
+    return {
+        "dates": dates,
+        "series": [{"id": i, "name": by_id[i].name, "prices": series[i]} for i in ids],
+    }
+
+
+# ── Export ────────────────────────────────────────────────────────────
+
+EXPORT_COLUMNS = ("id", "gpu_id", "listing_id", "title", "price", "link", "date",
+                  "location", "timestamp", "active", "user_restored", "archived")
+
+
+def export_listings_csv():
+    """Every listing, archived ones first, as an iterator of CSV text chunks.
+
+    An unreadable archive raises here, before the response starts.
+    """
+    return _csv_chunks(((1, archive.iter_archived_listings()), (0, iter_listings_export())))
+
+
+def _csv_chunks(sources):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for archived, batches in sources:
+        for batch in batches:
+            writer.writerows({**row, "archived": archived} for row in batch)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+# ── Dashboard bootstrap ───────────────────────────────────────────────
+
+def dashboard_bootstrap(
+    *,
+    gpu_id: str | None = None,
+    span: str = "30d",
+    days: int | None = 30,
+    points: int | None = None,
+    results: dict | None = None,
+) -> dict:
+    """Everything the dashboard needs for its first paint, in one payload.
+
+    Both scatter datasets share one set of per-GPU averages and lowest
+    listings; ``results`` holds keyword arguments for :func:`filtered_results`.
+    """
+    catalog = current_catalog()
+    if gpu_id not in catalog.by_id:
+        gpu_id = default_gpu_id()
+    return {
+        "gpus": public_gpu_list(),
+        "stats": data_stats(),
+        "price_history": {
+            "gpu_id": gpu_id,
+            "span": span,
+            **(price_series(gpu_id, agg="min", span=span, points=points) if gpu_id else {"dates": [], "prices": []}),
+        },
+        "scatter": scatter_datasets(days),
+        "results": filtered_results(**(results or {})),
+    }
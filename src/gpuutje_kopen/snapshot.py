@@ -0,0 +1,179 @@
+"""Static snapshots of the public JSON API for a front proxy to serve directly.
+
+Public data only changes when a search cycle finishes or an admin edits
+something, so the read endpoints are pre-rendered into ``SNAPSHOT_DIR``
+after each change.  The layout mirrors the API, with query parameters
+turned into path segments::
+
+    api/gpus.json
+    api/stats.json
+    api/scatter-data/<metric>/<days|all>.json
+    api/price-history/<gpu_id>/<agg>/<span>.json
+    api/price-history/<gpu_id>/<agg>/<span>/<points>.json
+
+The ``points`` variants are the downsampled series the dashboard asks for
+(``PRICE_POINTS``); other budgets fall through to Flask.  Each file also
+gets ``.gz`` and ``.br`` siblings, so nginx can serve them with
+``gzip_static``/``brotli_static``.  Every file is written to a temp file
+and renamed into place.  ``manifest.json`` is written last and lists the
+sha256 and size of each file.  Unchanged files are not rewritten.  Any
+request that has no snapshot (other parameters, ``/api/results``) falls
+through to Flask, e.g.::
+
+    location /api/scatter-data {
+        try_files /snapshots/api/scatter-data/$arg_metric/$arg_days.json @flask;
+    }
+
+    map $arg_points $points_path { "" ""; default /$arg_points; }
+
+    location /api/price-history/ {
+        try_files /snapshots$uri/$arg_agg/$arg_span$points_path.json @flask;
+    }
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+from threading import Lock, Timer
+
+import brotli
+
+from .cache import current_generation
+from .files import write_atomic
+from .services import data_stats, gpu_list, price_series, public_gpu_list, scatter_datasets
+from .timeseries import downsample
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = Path("data/snapshots")
+SCATTER_DAYS: tuple[int | None, ...] = (14, 30, 365, None)  # dashboard options + "all"
+PRICE_SPANS = ("14d", "30d", "1y", "all")
+PRICE_AGGS = ("min", "avg")
+PRICE_POINTS = (150, 300)  # app.js pricePoints(): narrow and wide charts
+PUBLISH_DELAY = 2.0  # seconds of quiet before a scheduled publish runs
+
+MANIFEST = "manifest.json"
+_VARIANTS = (".gz", ".br")
+
+
+def _encode(payload) -> bytes:
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _snapshot_payloads():
+    """Yield ``(relative_path, payload)`` for every pre-rendered endpoint."""
+    yield "api/gpus.json", public_gpu_list()
+    yield "api/stats.json", data_stats()
+
+    for days in SCATTER_DAYS:
+        name = "all" if days is None else str(days)
+        for metric, points in scatter_datasets(days).items():
+            yield f"api/scatter-data/{metric}/{name}.json", {"points": points}
+
+    for gpu in gpu_list():
+        if "/" in gpu.id or gpu.id.startswith("."):
+            continue  # not representable as a path segment; Flask serves it
+        for agg in PRICE_AGGS:
+            for span in PRICE_SPANS:
+                full = price_series(gpu.id, agg=agg, span=span)
+                yield f"api/price-history/{gpu.id}/{agg}/{span}.json", full
+                for points in PRICE_POINTS:
+                    yield (f"api/price-history/{gpu.id}/{agg}/{span}/{points}.json",
+                           downsample(full["dates"], full["prices"], points))
+
+
+def _write_atomic(path: Path, data: bytes):
+    write_atomic(path, lambda tmp: tmp.write_bytes(data))
+
+
+def _read_manifest(root: Path) -> dict:
+    try:
+        return json.loads((root / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _remove(root: Path, rel: str):
+    for suffix in ("",) + _VARIANTS:
+        (root / (rel + suffix)).unlink(missing_ok=True)
+
+
+# ── Publishing ────────────────────────────────────────────────────────
+
+_publish_lock = Lock()
+
+
+def publish_snapshots(root: Path | None = None) -> dict:
+    """Render all snapshot files and swap them into place. Returns a summary."""
+    root = root or SNAPSHOT_DIR
+    with _publish_lock:
+        start = time.perf_counter()
+        previous = _read_manifest(root).get("files", {})
+        files: dict[str, dict] = {}
+        written = 0
+        for rel, payload in _snapshot_payloads():
+            body = _encode(payload)
+            digest = hashlib.sha256(body).hexdigest()
+            entry = {"sha256": digest, "bytes": len(body)}
+            old = previous.get(rel)
+            if old and old.get("sha256") == digest and (root / rel).exists():
+                files[rel] = old
+                continue
+            path = root / rel
+            gz = gzip.compress(body, compresslevel=9, mtime=0)
+            _write_atomic(path.with_name(path.name + ".gz"), gz)
+            entry["gz_bytes"] = len(gz)
+            br = brotli.compress(body)
+            _write_atomic(path.with_name(path.name + ".br"), br)
+            entry["br_bytes"] = len(br)
+            _write_atomic(path, body)
+            files[rel] = entry
+            written += 1
+
+        removed = [rel for rel in previous if rel not in files]
+        for rel in removed:
+            _remove(root, rel)
+
+        manifest = {
+            "generation": current_generation(),
+            "generated_at": datetime.now().isoformat(),
+            "files": files,
+        }
+        _write_atomic(root / MANIFEST, _encode(manifest))
+        summary = {
+            "files": len(files),
+            "written": written,
+            "removed": len(removed),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+    log.info(f"Snapshots published: {summary}")
+    return summary
+
+
+_timer: Timer | None = None
+_timer_lock = Lock()
+
+
+def schedule_publish(delay: float = PUBLISH_DELAY):
+    """Publish in the background once no further calls arrive for *delay* seconds.
+
+    Used after admin edits so a burst of changes triggers a single publish.
+    """
+    global _timer
+
+    def run():
+        try:
+            publish_snapshots()
+        except Exception as e:
+            log.error(f"Snapshot publish failed: {e}")
+
+    with _timer_lock:
+        if _timer is not None:
+            _timer.cancel()
+        _timer = Timer(delay, run)
+        _timer.daemon = True
+        _timer.start()
@@ -0,0 +1,69 @@
+"""Server-side downsampling of price-history series for charts.
+
+Long spans produce more buckets than a chart has pixels.  :func:`downsample`
+reduces a series to a fixed point budget with Largest-Triangle-Three-Buckets
+(LTTB), which keeps the visually important peaks and dips, and reports the
+min/max of every bucket it collapsed so the chart can draw an envelope.
+"""
+
+import numpy as np
+
+MIN_POINTS = 3
+MAX_POINTS = 2000
+
+
+def _bucket_edges(n: int, points: int) -> np.ndarray:
+    """Edges splitting indices ``1..n-2`` into ``points - 2`` buckets (first/last stay alone)."""
+    return np.floor(np.linspace(1, n - 1, points - 1)).astype(np.int64)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Indices of the *points* samples LTTB keeps from ``(x, y)``."""
+    n = len(x)
+    if points >= n or points < MIN_POINTS:
+        return np.arange(n)
+    edges = _bucket_edges(n, points)
+    # Mean of each bucket, used as the third triangle corner for the bucket before it.
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sums_x / counts, x[-1])[1:]
+    avg_y = np.append(sums_y / counts, y[-1])[1:]
+
+    keep = np.empty(points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for b in range(points - 2):
+        lo, hi = edges[b], edges[b + 1]
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - avg_x[b]) * (by - y[a]) - (x[a] - bx) * (avg_y[b] - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[b + 1] = a
+    return keep
+
+
+def downsample(dates: list[str], values: list[float], points: int) -> dict:
+    """Reduce a dated series to at most *points* samples with min/max envelopes.
+
+    Returns ``{"dates", "prices", "min", "max"}``; ``min``/``max`` hold the
+    extremes of the bucket each kept sample stands for (equal to the value
+    itself when nothing was dropped).
+    """
+    points = max(MIN_POINTS, min(points, MAX_POINTS))
+    y = np.asarray(values, dtype=np.float64)
+    n = len(y)
+    if n <= points:
+        return {"dates": list(dates), "prices": y.tolist(), "min": y.tolist(), "max": y.tolist()}
+
+    x = np.asarray(dates, dtype="datetime64[D]").astype(np.float64)
+    keep = lttb_indices(x, y, points)
+    edges = _bucket_edges(n, points)
+    starts = np.concatenate(([0], edges[:-1], [n - 1]))
+    lows = np.minimum.reduceat(y, starts)
+    highs = np.maximum.reduceat(y, starts)
+    return {
+        "dates": [dates[i] for i in keep],
+        "prices": y[keep].tolist(),
+        "min": lows.tolist(),
+        "max": highs.tolist(),
+    }
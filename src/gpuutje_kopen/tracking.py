@@ -0,0 +1,155 @@
+"""Buffered page-view writer – keeps analytics writes off the request path.
+
+Requests only append to a bounded in-memory queue.  A background thread
+drains it every ``FLUSH_INTERVAL`` seconds (or as soon as ``FLUSH_BATCH``
+rows are waiting) and writes the whole batch in a single transaction.
+When the queue is full the oldest entries are dropped and counted.
+
+The same thread prunes raw rows past the retention window once every
+``PRUNE_INTERVAL`` seconds; the hourly rollups are kept.
+"""
+
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from threading import Condition, Thread
+
+from .db import record_page_views, prune_page_views
+
+log = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 0.5  # seconds between flushes
+FLUSH_BATCH = 200     # flush early once this many rows are queued
+QUEUE_MAX = 10_000    # oldest rows are dropped beyond this
+PRUNE_INTERVAL = 3600  # seconds between raw page_views retention passes
+
+
+class PageViewWriter:
+    """Bounded queue of page views flushed by a background thread."""
+
+    def __init__(
+        self,
+        flush_interval: float = FLUSH_INTERVAL,
+        batch_size: int = FLUSH_BATCH,
+        max_queue: int = QUEUE_MAX,
+    ):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue: deque[tuple[str, str | None, str | None, str]] = deque(maxlen=max_queue)
+        self._cond = Condition()
+        self._thread: Thread | None = None
+        self._stopping = False
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._dropped_logged = 0
+        self._last_prune = 0.0
+
+    # ── Producer side (request threads) ───────────────────────────────
+
+    def enqueue(self, path: str, ip: str | None, user_agent: str | None):
+        """Queue one page view. Never blocks on the database."""
+        row = (path, ip, user_agent, datetime.utcnow().isoformat())
+        with self._cond:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1  # deque(maxlen) evicts the oldest entry
+            self._queue.append(row)
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+
+    # ── Consumer side (writer thread) ─────────────────────────────────
+
+    def _drain(self) -> list[tuple[str, str | None, str | None, str]]:
+        with self._cond:
+            batch = list(self._queue)
+            self._queue.clear()
+        return batch
+
+    def flush(self) -> int:
+        """Write everything queued so far. Returns the number of rows written."""
+        batch = self._drain()
+        if not batch:
+            return 0
+        try:
+            record_page_views(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            log.error(f"Page-view flush of {len(batch)} rows failed: {e}")
+            return 0
+        self.written += len(batch)
+        return len(batch)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._queue) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if self.dropped > self._dropped_logged:
+                log.warning(f"Page-view queue overloaded: {self.dropped - self._dropped_logged} rows dropped")
+                self._dropped_logged = self.dropped
+            if stopping:
+                break
+            self._maybe_prune()
+
+    def _maybe_prune(self):
+        now = time.monotonic()
+        if self._last_prune and now - self._last_prune < PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        try:
+            pruned = prune_page_views()
+            if pruned:
+                log.info(f"Pruned {pruned} raw page views past retention")
+        except Exception as e:
+            log.error(f"Page-view prune failed: {e}")
+
+    # ── Lifecycle ─────────────────────────────────────────────────────
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = Thread(target=self._run, name="page-view-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the writer thread, flushing whatever is still queued."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()  # anything enqueued after the thread's last drain
+
+    def stats(self) -> dict:
+        with self._cond:
+            queued = len(self._queue)
+        return {
+            "queued": queued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+_writer = PageViewWriter()
+
+
+def enqueue_page_view(path: str, ip: str | None, user_agent: str | None):
+    _writer.enqueue(path, ip, user_agent)
+
+
+def start_page_view_writer():
+    _writer.start()
+
+
+def stop_page_view_writer():
+    _writer.stop()
+
+
+def page_view_writer_stats() -> dict:
+    return _writer.stats()
@@ -7,26 +7,14 @@ Among full matches the query with the most words wins (most specific).
 """
 
 import re
-from .db import GPU, load_gpu_list
-
-_GPU_LIST: list[GPU] = []
-_GPU_BY_ID: dict[str, GPU] = {}
+from .catalog import current_catalog, refresh_catalog
 
 _SPLIT_RE = re.compile(r'[\s\-_/,;:()!@#$%^&*\[\]{}|\\<>.+]+')
 _SUBTOKEN_RE = re.compile(r'[A-Z]+[a-z]*|[a-z]+|[0-9]+')
 
 
-def _ensure_loaded():
-    global _GPU_LIST, _GPU_BY_ID
-    if not _GPU_LIST:
-        _GPU_LIST = load_gpu_list()
-        _GPU_BY_ID = {g.id: g for g in _GPU_LIST}
-
-
 def reload_gpu_cache():
-    global _GPU_LIST, _GPU_BY_ID
-    _GPU_LIST = load_gpu_list()
-    _GPU_BY_ID = {g.id: g for g in _GPU_LIST}
+    refresh_catalog()
 
 
 def _tokenize(text: str) -> set[str]:
@@ -67,7 +55,6 @@ def find_best_gpu_match(title: str) -> tuple[str | None, int]:
 
     Returns ``(gpu_id, matched_word_count)`` or ``(None, 0)``.
     """
-    _ensure_loaded()
     if not title:
         return None, 0
 
@@ -75,7 +62,7 @@ def find_best_gpu_match(title: str) -> tuple[str | None, int]:
     best_id: str | None = None
     best_words = 0
 
-    for gpu in _GPU_LIST:
+    for gpu in current_catalog().gpus:
         for query in gpu.search_queries:
             count = _query_match(query, title_tokens)
             if count > best_words:
@@ -93,7 +80,6 @@ def validate_listing(
     Returns ``(is_valid, corrected_gpu_id, match_word_count)``.
     *threshold* is accepted for API compatibility but ignored.
     """
-    _ensure_loaded()
     if not title:
         return False, None, 0
 
@@ -108,7 +94,7 @@ def validate_listing(
     # Best match differs — check whether the original GPU also matches
     title_tokens = _tokenize(title)
     original_words = 0
-    original_gpu = _GPU_BY_ID.get(gpu_id)
+    original_gpu = current_catalog().by_id.get(gpu_id)
     if original_gpu:
         for query in original_gpu.search_queries:
             count = _query_match(query, title_tokens)
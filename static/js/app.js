@@ -26,31 +26,25 @@ function fmtDate(d) {
     return `${dd}/${mm}/${yyyy} ${hh}:${mi}`;
 }
 
-/* ── Load GPU list ────────────────────────────────────── */
-async function loadGpus() {
-    const resp = await fetch("/api/gpus");
-    currentGpuList = await resp.json();
+/* ── GPU list ─────────────────────────────────────────── */
+function renderGpuSelect(gpus, selectedId) {
+    currentGpuList = gpus;
 
     const select = document.getElementById("gpuSelect");
     select.innerHTML = currentGpuList
         .map((gpu) => `<option value="${gpu.id}">${gpu.name}</option>`)
         .join("");
-
-    // Default to RTX 3070 if available
-    const rtx3070 = currentGpuList.find(
-        (g) => g.name.includes("3070") && !g.name.includes("Ti")
-    );
-    if (rtx3070) select.value = rtx3070.id;
-
+    if (selectedId) select.value = selectedId;
     select.addEventListener("change", updatePriceGraph);
-    updatePriceGraph();
 }
 
 /* ── Stats ────────────────────────────────────────────── */
 async function updateStats() {
     const resp = await fetch("/api/stats");
-    const stats = await resp.json();
+    renderStats(await resp.json());
+}
 
+function renderStats(stats) {
     const date = new Date(stats.last_updated);
     document.getElementById("lastUpdate").textContent =
         `Last updated: ${fmtDate(date)}`;
@@ -69,15 +63,22 @@ async function updateStats() {
 }
 
 /* ── Price history chart ──────────────────────────────── */
+/** Server-side downsampling budget, bucketed so responses stay cacheable */
+function pricePoints() {
+    return document.getElementById("priceGraph").clientWidth < 600 ? 150 : 300;
+}
+
 async function updatePriceGraph() {
     const gpu = document.getElementById("gpuSelect").value;
     const gpuName = currentGpuList.find((g) => g.id === gpu)?.name || gpu;
     const span = document.getElementById("priceGroupSelect").value || "30d";
     const resp = await fetch(
-        `/api/price-history/${encodeURIComponent(gpu)}?agg=min&span=${span}`
+        `/api/price-history/${encodeURIComponent(gpu)}?agg=min&span=${span}&points=${pricePoints()}`
     );
-    const data = await resp.json();
+    renderPriceGraph(gpuName, await resp.json());
+}
 
+function renderPriceGraph(gpuName, data) {
     const trace = {
         x: data.dates,
         y: data.prices,
@@ -101,7 +102,18 @@ async function updatePriceGraph() {
         paper_bgcolor: "rgba(0,0,0,0)",
     };
 
-    Plotly.newPlot("priceGraph", [trace], layout, {
+    const traces = [trace];
+    // Min/max envelope of buckets collapsed by downsampling
+    if (data.min && data.max && data.min.some((v, i) => v !== data.max[i])) {
+        const band = { x: data.dates, type: "scatter", mode: "lines", line: { width: 0 }, hoverinfo: "skip", showlegend: false };
+        traces.unshift(
+            { ...band, y: data.max },
+            { ...band, y: data.min, fill: "tonexty", fillcolor: "rgba(138,154,91,0.2)" },
+        );
+        trace.fill = "none";
+    }
+
+    Plotly.newPlot("priceGraph", traces, layout, {
         responsive: true,
         scrollZoom: false,
         displayModeBar: false,
@@ -114,8 +126,10 @@ async function updateScatterGraph(graphId, metric, daysSelect) {
     const days = document.getElementById(daysSelect).value || "30";
     const resp = await fetch(`/api/scatter-data?metric=${metric}&days=${days}`);
     const data = await resp.json();
-    const points = data.points;
+    await renderScatterGraph(graphId, metric, data.points);
+}
 
+async function renderScatterGraph(graphId, metric, points) {
     // Discrete VRAM colour palette
     const vramColorMap = {
         4: "#e6194b", 6: "#f58231", 8: "#ffe119", 10: "#bfef45",
@@ -201,7 +215,7 @@ async function updateScatterGraph(graphId, metric, daysSelect) {
 }
 
 /* ── Results table ────────────────────────────────────── */
-async function loadResults() {
+function resultsParams() {
     const minVram   = document.getElementById("minVram").value;
     const minTokens = document.getElementById("minTokens").value;
     const maxPrice  = document.getElementById("maxPrice").value;
@@ -209,15 +223,19 @@ async function loadResults() {
     const sortBy    = document.getElementById("sortBySelect").value;
     const sortOrder = document.getElementById("sortOrderSelect").value;
 
-    const params = new URLSearchParams({
+    return new URLSearchParams({
         min_vram: minVram, min_tokens: minTokens,
         max_price: maxPrice, search: search,
         sort_by: sortBy, order: sortOrder,
     });
+}
 
-    const resp = await fetch(`/api/results?${params}`);
-    let results = await resp.json();
+async function loadResults() {
+    const resp = await fetch(`/api/results?${resultsParams()}`);
+    renderResults(await resp.json());
+}
 
+function renderResults(results) {
     const showActiveOnly = document.getElementById("showActiveOnly").checked;
     if (showActiveOnly) results = results.filter((r) => r.active === true);
 
@@ -253,11 +271,55 @@ const pageSizeElem = document.getElementById("pageSizeSelect");
 if (pageSizeElem) pageSizeElem.addEventListener("change", loadResults);
 
 /* ── Bootstrap init ───────────────────────────────────── */
+/** First paint from a single /api/bootstrap round trip. */
 async function init() {
-    await loadGpus();
-    await updateStats();
-    await updateScatterGraph("tokensGraph", "tokens", "tokensDaysSelect");
-    await loadResults();
-    setInterval(updateStats, 10000);
+    const params = resultsParams();
+    params.set("span", document.getElementById("priceGroupSelect").value || "30d");
+    params.set("days", document.getElementById("tokensDaysSelect").value || "30");
+    params.set("active_only", document.getElementById("showActiveOnly").checked ? "1" : "0");
+    params.set("limit", document.getElementById("pageSizeSelect")?.value || "10");
+    params.set("points", pricePoints());
+
+    const resp = await fetch(`/api/bootstrap?${params}`);
+    const data = await resp.json();
+
+    renderGpuSelect(data.gpus, data.price_history.gpu_id);
+    renderStats(data.stats);
+    const gpuName = currentGpuList.find((g) => g.id === data.price_history.gpu_id)?.name || "";
+    renderPriceGraph(gpuName, data.price_history);
+    await renderScatterGraph("tokensGraph", "tokens", data.scatter.tokens);
+    if (document.getElementById("vramGraph")) {
+        await renderScatterGraph("vramGraph", "vram", data.scatter.vram);
+    }
+    renderResults(data.results);
+    subscribeEvents();
+}
+
+/* ── Live updates ─────────────────────────────────────── */
+/** Refresh widgets when the server says data changed; poll only without SSE */
+function subscribeEvents() {
+    if (!window.EventSource) {
+        setInterval(updateStats, 10000);
+        return;
+    }
+    const pending = new Set();
+    const source = new EventSource("/api/events");
+    source.addEventListener("listings", (ev) => {
+        pending.add(JSON.parse(ev.data).gpu_id);
+    });
+    const refresh = (all) => {
+        updateStats();
+        if (all || pending.size) {
+            updateScatterGraph("tokensGraph", "tokens", "tokensDaysSelect");
+            loadResults();
+        }
+        if (all || pending.has(document.getElementById("gpuSelect").value)) updatePriceGraph();
+        pending.clear();
+    };
+    // Listing events arrive mid-cycle; cached endpoints only change once it finishes
+    source.addEventListener("cycle_finished", () => refresh(false));
+    source.addEventListener("resync", () => refresh(true));
+    // Changes announced by another process (admin edits, a worker elsewhere)
+    source.addEventListener("data_changed", () => refresh(true));
 }
 init();
@@ -0,0 +1,84 @@
+"""Shared fixtures."""
+
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen import archive, cache, db, snapshot
+from gpuutje_kopen.catalog import refresh_catalog
+from gpuutje_kopen.routes import admin as admin_routes
+from gpuutje_kopen.routes import public as public_routes
+
+
+TRACKED_DB = Path(__file__).parent.parent / "data" / "gpuutje.db"
+
+
+@pytest.fixture(scope="session")
+def _migrated_db(tmp_path_factory) -> Path:
+    """The checked-in database, copied once and brought up to ``SCHEMA_VERSION``."""
+    path = tmp_path_factory.mktemp("tracked") / "gpuutje.db"
+    shutil.copyfile(TRACKED_DB, path)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(db, "DB_PATH", path)
+        mp.setattr(db, "ANALYTICS_DB_PATH", path.with_name("analytics.db"))
+        db.init_db()
+        db.close_connections()
+    return path
+
+
+@pytest.fixture(autouse=True)
+def _scratch_data(_migrated_db, tmp_path_factory, monkeypatch):
+    """Point every test at a scratch copy of the data directory.
+
+    The copy holds the migrated checked-in catalog, so the tracked
+    ``data/`` is never opened, migrated or left with WAL files.
+    """
+    data = tmp_path_factory.mktemp("data")
+    shutil.copyfile(_migrated_db, data / "gpuutje.db")
+    db.close_connections()
+    monkeypatch.setattr(db, "DB_PATH", data / "gpuutje.db")
+    monkeypatch.setattr(db, "ANALYTICS_DB_PATH", data / "analytics.db")
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", data / "archive")
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", data / "snapshots")
+    refresh_catalog()
+    yield data
+    db.close_connections()
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """An empty database in *tmp_path* with one GPU, ``gpu_t``."""
+    db.close_connections()
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "gpuutje.db")
+    monkeypatch.setattr(db, "ANALYTICS_DB_PATH", tmp_path / "analytics.db")
+    db.init_db()
+    db.add_gpu(db.GPU(id="gpu_t", name="Test GPU", tokens_sec=10.0, vram=8, search_queries=["test"]))
+    yield
+    db.close_connections()
+
+
+@pytest.fixture
+def admin_client(fresh_db, monkeypatch):
+    """A test client for the admin blueprint; snapshot publishing is switched off."""
+    monkeypatch.setattr(admin_routes, "schedule_publish", lambda: None)
+    app = Flask(__name__)
+    app.register_blueprint(admin_routes.admin)
+    return app.test_client()
+
+
+@pytest.fixture
+def public_client(fresh_db, monkeypatch):
+    """A test client for the public blueprint with an empty response cache."""
+    cache.response_cache.clear()
+    monkeypatch.setattr(cache, "_generation_checked", 0.0)
+    monkeypatch.setattr(public_routes, "enqueue_page_view", lambda **kw: None)
+    refresh_catalog()
+    app = Flask(__name__)
+    app.register_blueprint(public_routes.public)
+    yield app.test_client()
+    cache.response_cache.clear()
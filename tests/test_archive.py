@@ -0,0 +1,67 @@
+"""Tests for the Parquet cold-history archive."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen import archive, db, services
+
+
+def _age_all_rows(days):
+    def age():
+        db._conn().execute("UPDATE listings SET seen_at = seen_at - ?", (days * 86400,))
+    db._main.submit(age).result()
+
+
+def test_archived_rows_still_count_in_history_and_export(fresh_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path / "archive")
+    for i, (day, price) in enumerate([("2025-01-07", 300.0), ("2025-01-08", 320.0), ("2025-02-04", 280.0)]):
+        db.save_listing("gpu_t", {"id": f"m{i}", "title": f"card {i}", "price": price, "link": "x", "date": day})
+    db.mark_active_listings("gpu_t", {"m2"})
+    _age_all_rows(400)
+    before = {agg: services.price_history("gpu_t", agg=agg, span="all") for agg in ("min", "avg")}
+
+    assert archive.archive_cold_rows() == {"listings": 2, "outliers": 0}
+
+    assert db.listing_count() == 1  # the active listing stays hot
+    assert archive.stats()["rows"] == {"listings": 2, "outliers": 0}
+    assert {agg: services.price_history("gpu_t", agg=agg, span="all") for agg in ("min", "avg")} == before
+    assert before["avg"] == [("2025-01-06", 310.0), ("2025-02-03", 280.0)]  # weekly bins
+    lines = "".join(services.export_listings_csv()).splitlines()
+    assert len(lines) == 4 and lines[1].endswith(",1") and lines[3].endswith(",0")
+
+
+def test_rerun_after_interrupted_delete_does_not_duplicate(fresh_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path / "archive")
+    db.save_listing("gpu_t", {"id": "m1", "title": "card", "price": 300.0, "link": "x", "date": "2025-01-06"})
+    db.mark_active_listings("gpu_t", set())
+    db.mark_active_listings("gpu_t", {"other"})
+    _age_all_rows(400)
+
+    monkeypatch.setattr(archive, "delete_archived", lambda table, ids: 0)  # crash before the delete
+    archive.archive_cold_rows()
+    monkeypatch.undo()
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path / "archive")
+    archive.archive_cold_rows()
+
+    assert archive.stats()["rows"]["listings"] == 1
+    assert db.listing_count() == 0
+
+
+def test_an_archive_without_pyarrow_fails_loudly(fresh_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path / "archive")
+    db.save_listing("gpu_t", {"id": "m1", "title": "card", "price": 300.0, "link": "x", "date": "2025-01-06"})
+    db.mark_active_listings("gpu_t", {"other"})
+    _age_all_rows(400)
+    archive.archive_cold_rows()
+
+    monkeypatch.setattr(archive, "HAVE_PARQUET", False)
+    assert archive.archive_cold_rows() == {"skipped": "pyarrow is not installed"}
+    with pytest.raises(archive.ArchiveUnreadable):
+        services.price_history("gpu_t", span="all")
+    with pytest.raises(archive.ArchiveUnreadable):
+        services.export_listings_csv()
+    assert not archive.reaches(0, tmp_path / "empty")  # no files, nothing to miss
@@ -0,0 +1,72 @@
+"""Smoke tests for the synthetic dataset generator, benchmark runners and load test."""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+import cycle
+import load
+import run as bench
+import synth
+from gpuutje_kopen import db
+
+
+def _rows(path: Path, sql: str):
+    with sqlite3.connect(path) as c:
+        return c.execute(sql).fetchall()
+
+
+def test_generator_is_deterministic_and_realistic(tmp_path):
+    first = synth.build(tmp_path / "a", listings=3000, seed=7)
+    synth.build(tmp_path / "b", listings=3000, seed=7)
+
+    listings = "SELECT gpu, listing_id, title, price_cents, listed_day, active FROM listings ORDER BY id"
+    assert _rows(tmp_path / "a" / "gpuutje.db", listings) == _rows(tmp_path / "b" / "gpuutje.db", listings)
+    assert first["listings"] > 2900 and first["outliers"] == 60 and first["observations"] > 0
+    reposts = _rows(tmp_path / "a" / "gpuutje.db",
+                    "SELECT COUNT(*) FROM (SELECT 1 FROM listings GROUP BY gpu, listing_id HAVING COUNT(*) > 1)")
+    assert reposts[0][0] > 0  # work for dedup_tables
+    assert _rows(tmp_path / "a" / "analytics.db", "SELECT COUNT(*) FROM page_views")[0][0] == 1500
+    assert _rows(tmp_path / "a" / "gpuutje.db", "PRAGMA user_version")[0][0] == db.SCHEMA_VERSION
+
+
+def test_runner_measures_cases_and_covers_every_db_function(tmp_path, monkeypatch):
+    monkeypatch.setattr(bench, "CACHE_DIR", tmp_path)
+    saved = db.DB_PATH
+
+    result = bench.run([2000], repeat=1, only="listing")
+
+    cases = result["scales"]["2000"]["cases"]
+    assert "db.filtered_listings[search]" in cases and "db.delete_listing" in cases
+    assert all("median" in stats for stats in cases.values()), cases
+    assert result["uncovered"] == []
+    assert db.DB_PATH == saved
+
+
+def test_load_harness_drives_both_apps(tmp_path, monkeypatch):
+    monkeypatch.setattr(load, "WORK_DIR", tmp_path / "load")
+    synth.build(tmp_path / "data", listings=2000, seed=3)
+
+    result = load.load_run(tmp_path / "data", ingest=True, users=2, duration=3, seed=3, search_latency=0)
+
+    assert result["requests"] > 0 and result["errors"] == 0
+    assert {"public GET /api/bootstrap", "public GET /api/results?search="} <= result["routes"].keys()
+    assert result["ingest"]["cycles_started"] >= 1
+
+
+def test_cycle_benchmark_replays_offline_with_readers(tmp_path, monkeypatch):
+    monkeypatch.setattr(cycle, "WORK_DIR", tmp_path / "cycle")
+    monkeypatch.setattr(cycle.search_worker, "publish_snapshots", lambda: None)  # seconds per cycle, tested elsewhere
+    synth.build(tmp_path / "data", listings=1000, seed=5)
+    saved = db.DB_PATH
+
+    result = cycle.cycle_run(tmp_path / "data", cycles=2, readers=1, seed=5)
+
+    assert [c["queries"] for c in result["cycles"]] == [result["backend"]["queries"] // 2] * 2
+    assert result["backend"]["misses"] == 0 and all(c["listings"] > 0 for c in result["cycles"])
+    assert result["cycles"][1]["observations"] > 0  # replayed price drops
+    assert result["readers"]["requests"] > 0 and result["readers"]["errors"] == 0
+    assert db.DB_PATH == saved
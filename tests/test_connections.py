@@ -0,0 +1,137 @@
+"""Tests for the SQLite connection manager."""
+
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from queue import Empty, Queue
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen import connections
+from gpuutje_kopen.connections import ConnectionManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    m = ConnectionManager(lambda: tmp_path / "test.db", pool_size=2)
+    m.writes(lambda: m.writer().execute("CREATE TABLE t (x INTEGER)"))()
+    yield m
+    m.close()
+
+
+def test_readers_are_query_only(manager):
+    with manager.read() as c:
+        with pytest.raises(sqlite3.OperationalError):
+            c.execute("INSERT INTO t VALUES (1)")
+
+
+def test_reader_pool_is_bounded(manager):
+    with manager.read(), manager.read():
+        pass
+    with manager.read():
+        pass
+    assert manager.stats()["readers_open"] == 2
+
+
+def test_close_while_a_reader_is_borrowed(manager):
+    with manager.read() as borrowed:
+        manager.close()
+        assert borrowed.execute("SELECT count(*) FROM t").fetchone()[0] == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        borrowed.execute("SELECT 1")
+    with manager.read() as c:
+        assert c is not borrowed
+    assert manager.stats()["readers_open"] == 1
+
+
+def test_read_inside_write_sees_uncommitted_rows(manager):
+    @manager.writes
+    def insert_and_count():
+        manager.writer().execute("INSERT INTO t VALUES (1)")
+        with manager.read() as r:
+            return r.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+
+    assert insert_and_count() == 1
+
+
+def test_failed_write_rolls_back(manager):
+    @manager.writes
+    def boom():
+        manager.writer().execute("INSERT INTO t VALUES (1)")
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        boom()
+    with manager.read() as c:
+        assert c.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_failed_command_does_not_affect_its_batch(manager):
+    gate = threading.Event()
+    blocker = manager.submit(gate.wait)  # hold the writer so the next commands batch up
+
+    def insert(x):
+        manager.writer().execute("INSERT INTO t VALUES (?)", (x,))
+        if x == 2:
+            raise ValueError(x)
+        return x
+
+    futures = [manager.submit(insert, x) for x in range(4)]
+    gate.set()
+    blocker.result()
+
+    assert [f.exception() is None for f in futures] == [True, True, False, True]
+    with manager.read() as c:
+        assert [r[0] for r in c.execute("SELECT x FROM t ORDER BY x")] == [0, 1, 3]
+    stats = manager.stats()
+    assert stats["write_commands"] == 6
+    assert stats["write_batches"] <= 3  # create table, then the blocker and the four inserts
+
+
+def test_a_write_racing_a_failed_writer_start_is_not_lost(tmp_path):
+    (tmp_path / "file").write_text("")
+    path = [tmp_path / "file" / "test.db"]  # the parent is a file, so opening fails
+    m = ConnectionManager(lambda: path[0])
+    raced = []
+
+    class RacingQueue(Queue):
+        def get_nowait(self):
+            try:
+                return super().get_nowait()
+            except Empty:
+                if not raced:  # a submit arriving just as the failed thread finds the queue empty
+                    path[0] = tmp_path / "test.db"
+                    raced.append(None)
+                    t = threading.Thread(target=lambda: raced.append(m.submit(lambda: "ran")))
+                    t.start()
+                    t.join(0.2)
+                raise
+
+    m._queue = RacingQueue()
+    with pytest.raises(OSError):
+        m.submit(lambda: "never").result(timeout=5)
+    while len(raced) < 2:
+        threading.Event().wait(0.01)
+    assert raced[1].result(timeout=5) == "ran"
+    m.close()
+
+
+def test_close_leaves_a_busy_writer_its_connection(manager, monkeypatch):
+    monkeypatch.setattr(connections, "READER_WAIT_TIMEOUT", 0.1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_insert():
+        started.set()
+        release.wait(5)
+        manager.writer().execute("INSERT INTO t VALUES (1)")
+
+    write = manager.submit(slow_insert)
+    started.wait(5)
+    manager.close()  # times out waiting for the writer thread
+    assert manager.stats()["writer_open"]
+    release.set()
+    write.result(timeout=5)
+    assert manager.writes(lambda: manager.writer().execute("SELECT count(*) FROM t").fetchone()[0])() == 1
@@ -0,0 +1,43 @@
+"""Tests for the in-process event bus behind /api/events."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen.events import EventBus
+
+
+def test_stream_delivers_published_events():
+    bus = EventBus()
+    stream = bus.stream()
+    assert next(stream).startswith(b"retry:")
+    bus.publish("cycle_finished", {"total": 3})
+
+    frame = next(stream)
+    assert b"id: 1\nevent: cycle_finished\n" in frame
+    assert b'"total": 3' in frame
+    assert bus.stats()["subscribers"] == 1
+    stream.close()
+    assert bus.stats()["subscribers"] == 0
+
+
+def test_idle_stream_sends_keepalive():
+    bus = EventBus()
+    stream = bus.stream(keepalive=0.01)
+    next(stream)
+    assert next(stream).startswith(b": keepalive")
+
+
+def test_resume_from_last_event_id_and_resync():
+    bus = EventBus(buffer_size=2)
+    for i in range(3):
+        bus.publish("listings", {"i": i})
+
+    resumed = bus.stream(last_event_id=2)
+    next(resumed)
+    assert next(resumed).count(b"event: listings") == 1
+
+    stale = bus.stream(last_event_id=0)
+    next(stale)
+    assert b"event: resync" in next(stale)
@@ -0,0 +1,39 @@
+"""Tests for the HyperLogLog unique-visitor sketch."""
+
+import hashlib
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen.hll import HyperLogLog, merged_count
+
+
+def _h(i: int) -> int:
+    return int(hashlib.sha256(str(i).encode()).hexdigest()[:16], 16)
+
+
+def _sketch(values) -> HyperLogLog:
+    hll = HyperLogLog()
+    for v in values:
+        hll.add_hash(_h(v))
+    return hll
+
+
+def test_small_counts_are_exact():
+    assert HyperLogLog().count() == 0
+    assert _sketch(range(50)).count() == 50
+    assert _sketch([1, 1, 1, 2]).count() == 2
+
+
+def test_large_count_within_error():
+    est = _sketch(range(50_000)).count()
+    assert abs(est - 50_000) / 50_000 < 0.05
+
+
+def test_merge_is_union():
+    a = _sketch(range(0, 6000))
+    b = _sketch(range(3000, 9000))
+    est = merged_count([a.to_bytes(), b.to_bytes()])
+    assert abs(est - 9000) / 9000 < 0.05
+    assert HyperLogLog(a.to_bytes()).merge(b).to_bytes() == _sketch(range(9000)).to_bytes()
@@ -0,0 +1,91 @@
+"""Tests for lease-based leader election."""
+
+import sqlite3
+import sys
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen import db, leader, search_worker
+from gpuutje_kopen.leader import LeaderElection
+
+
+def _election(monkeypatch, outcomes):
+    calls = []
+    results = iter(outcomes)
+
+    def fake_acquire(name, holder, ttl):
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def submit(*args):
+        future = Future()
+        try:
+            future.set_result(fake_acquire(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    fake_acquire.submit = submit
+    monkeypatch.setattr(leader, "acquire_lease", fake_acquire)
+    monkeypatch.setattr(leader, "release_lease", lambda name, holder: calls.append("released"))
+    election = LeaderElection(
+        "test", on_elected=lambda: calls.append("elected"), on_demoted=lambda: calls.append("demoted"),
+        ttl=30, interval=10,
+    )
+    return election, calls
+
+
+def test_elected_once_and_demoted_when_lease_taken(monkeypatch):
+    election, calls = _election(monkeypatch, [False, True, True, False])
+    for _ in range(4):
+        election.tick()
+    assert calls == ["elected", "demoted"]
+
+
+def test_db_error_keeps_leadership_only_while_lease_is_valid(monkeypatch):
+    election, calls = _election(monkeypatch, [True, sqlite3.OperationalError("locked")] * 2)
+    election.tick()
+    election.tick()
+    assert election.is_leader
+
+    election._renewed -= 25  # last renewal older than ttl - interval
+    election.tick()  # renews
+    election._renewed -= 25
+    election.tick()
+    assert not election.is_leader
+    assert calls == ["elected", "demoted"]
+
+
+def test_stop_releases_lease(monkeypatch):
+    election, calls = _election(monkeypatch, [True])
+    election.tick()
+    election.stop()
+    assert calls == ["elected", "demoted", "released"]
+
+
+def test_a_renewal_stuck_behind_the_writer_counts_as_failed(fresh_db):
+    election = LeaderElection("test", on_elected=lambda: None, on_demoted=lambda: None, ttl=0.3, interval=0.1)
+    election.tick()
+    assert election.is_leader
+
+    release = threading.Event()
+    blocker = db._main.submit(release.wait)  # a long write holding the writer thread
+    try:
+        election.tick()
+    finally:
+        release.set()
+        blocker.result()
+    assert not election.is_leader
+
+
+def test_trigger_search_without_a_leader_only_queues_the_request(admin_client):
+    assert admin_client.post("/api/trigger-search").get_json() == {"status": "queued"}
+    assert db.get_setting(search_worker.SEARCH_REQUEST_KEY)
+
+    db.acquire_lease(leader.WORKER_LEASE, "someone", 30)
+    assert admin_client.post("/api/trigger-search").get_json() == {"status": "requested"}
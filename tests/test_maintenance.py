@@ -0,0 +1,51 @@
+"""Tests for scheduled database maintenance."""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen import db, maintenance
+
+
+def _churn(rows=5000):
+    def run():
+        c = db._conn()
+        c.execute("CREATE TABLE IF NOT EXISTS junk (x TEXT)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_junk ON junk(x)")
+        c.executemany("INSERT INTO junk VALUES (?)", ((f"{i:06d}" + "y" * 500,) for i in range(rows)))
+    db._main.submit(run).result()
+
+
+def test_run_reclaims_free_pages_and_truncates_the_wal(fresh_db):
+    _churn()
+    db._main.submit(lambda: db._conn().execute("DROP TABLE junk")).result()
+    assert db.database_sizes("main")["free_pages"] > 0
+
+    summary = maintenance.run_maintenance()
+
+    main = summary["main"]
+    assert all(step["complete"] for step in main["steps"].values())
+    assert main["after"]["free_pages"] == 0 and main["after"]["wal_bytes"] == 0
+    assert main["after"]["file_bytes"] < main["before"]["file_bytes"]
+    assert maintenance.stats()["last"] == summary  # visible to the admin process
+
+
+def test_analyze_stops_at_its_budget(fresh_db):
+    _churn()
+    assert db.analyze("main", budget=0) is False
+    assert db.analyze("main", budget=30) is True
+
+
+def test_due_once_per_quiet_window(fresh_db):
+    db.set_setting("maintenance_hour", "23")
+    assert maintenance.maintenance_due(datetime(2026, 10, 19, 0, 30))  # window wraps past midnight
+    assert not maintenance.maintenance_due(datetime(2026, 10, 19, 1, 30))
+
+    db.set_setting(maintenance.LAST_RUN_KEY, str(datetime(2026, 10, 18, 23, 5).timestamp()))
+    assert not maintenance.maintenance_due(datetime(2026, 10, 19, 0, 30))
+    assert maintenance.maintenance_due(datetime(2026, 10, 19, 23, 5))
+
+    db.set_setting("maintenance_hour", "-1")  # off
+    assert not maintenance.maintenance_due(datetime(2026, 10, 20, 23, 5))
@@ -0,0 +1,141 @@
+"""Tests for the versioned schema migrations behind init_db."""
+
+import sqlite3
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen import db
+from gpuutje_kopen.hll import HyperLogLog
+
+# Layout written by releases before versioning (and before user_restored)
+LEGACY_SCHEMA = """
+CREATE TABLE gpus (
+    id TEXT PRIMARY KEY, name TEXT NOT NULL UNIQUE, tokens_sec REAL NOT NULL DEFAULT 0,
+    vram INTEGER NOT NULL DEFAULT 0, search_queries TEXT NOT NULL DEFAULT '[]',
+    tokens_tested INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE listings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, gpu_id TEXT NOT NULL REFERENCES gpus(id) ON DELETE CASCADE,
+    listing_id TEXT, title TEXT NOT NULL, price REAL, link TEXT, date TEXT, location TEXT,
+    timestamp TEXT NOT NULL, active INTEGER NOT NULL DEFAULT 1);
+CREATE TABLE outliers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, gpu_id TEXT NOT NULL, listing_id TEXT, title TEXT NOT NULL,
+    price REAL, link TEXT, date TEXT, location TEXT, timestamp TEXT NOT NULL,
+    active INTEGER NOT NULL DEFAULT 0, reason TEXT, moved_at TEXT NOT NULL);
+CREATE TABLE page_views (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT NOT NULL, ip TEXT, user_agent TEXT, timestamp TEXT NOT NULL);
+CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+
+INSERT INTO gpus (id, name) VALUES ('gpu_t', 'Test GPU');
+INSERT INTO listings (gpu_id, listing_id, title, price, date, timestamp)
+    VALUES ('gpu_t', 'm1', 'card', 299.5, '2026-10-01', '2026-10-02T12:00:00.123456');
+INSERT INTO outliers (gpu_id, title, price, timestamp, moved_at) VALUES
+    ('gpu_t', 'dup', 5.0, '2026-10-01T00:00:00', '2026-10-01T00:00:00'),
+    ('gpu_t', 'dup', 5.0, '2026-10-01T00:00:00', '2026-10-01T00:00:00');
+INSERT INTO page_views (path, timestamp) VALUES ('/', '2026-10-01T10:00:00');
+INSERT INTO settings (key, value) VALUES ('search_interval', '600');
+"""
+
+
+@pytest.fixture
+def db_paths(tmp_path, monkeypatch):
+    db.close_connections()
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "gpuutje.db")
+    monkeypatch.setattr(db, "ANALYTICS_DB_PATH", tmp_path / "analytics.db")
+    yield tmp_path
+    db.close_connections()
+
+
+def _user_version(path: Path) -> int:
+    with sqlite3.connect(path) as c:
+        return c.execute("PRAGMA user_version").fetchone()[0]
+
+
+def test_current_schema_skips_all_work(db_paths):
+    assert db.init_db() == db.SCHEMA_VERSION
+    statements = []
+    db._conn().set_trace_callback(statements.append)
+    try:
+        assert db.init_db() == db.SCHEMA_VERSION
+    finally:
+        db._conn().set_trace_callback(None)
+    assert statements == ["PRAGMA user_version"]
+
+
+def test_legacy_database_is_brought_up_to_date(db_paths):
+    with sqlite3.connect(db_paths / "gpuutje.db") as c:
+        c.executescript(LEGACY_SCHEMA)
+
+    db.init_db()
+
+    assert _user_version(db_paths / "gpuutje.db") == db.SCHEMA_VERSION
+    assert db.schema_version() == db.SCHEMA_VERSION
+    assert db.listing_count() == 1 and db.outlier_count() == 1
+    assert db.get_setting("search_interval") == "600"  # existing settings survive seeding
+    assert db.get_setting("archive_after_days") == str(db.ARCHIVE_AFTER_DAYS)
+    with db._analytics_read() as a:
+        assert a.execute("SELECT COUNT(*) FROM page_views").fetchone()[0] == 1
+    with db._read() as c:
+        assert tuple(c.execute("SELECT price_cents, user_restored FROM listings").fetchone()) == (29950, 0)
+
+
+def test_failed_migration_rolls_back_its_batch(db_paths, monkeypatch):
+    db.init_db()
+
+    def broken(c):
+        raise sqlite3.OperationalError("boom")
+
+    monkeypatch.setattr(db, "MIGRATIONS", db.MIGRATIONS + (
+        db.Migration(db.SCHEMA_VERSION + 1, "new table", lambda c: c.execute("CREATE TABLE extra (x)")),
+        db.Migration(db.SCHEMA_VERSION + 2, "broken", broken),
+    ))
+    with pytest.raises(sqlite3.OperationalError):
+        db.init_db()
+
+    assert _user_version(db_paths / "gpuutje.db") == db.SCHEMA_VERSION
+    with db._read() as c:
+        assert c.execute("SELECT 1 FROM sqlite_master WHERE name = 'extra'").fetchone() is None
+
+
+def test_analytics_move_is_safe_to_repeat_and_keeps_visitor_sets(db_paths, monkeypatch):
+    sketch = HyperLogLog()
+    sketch.add_hash(int(db._hash_ip("10.0.0.1"), 16))
+    with sqlite3.connect(db_paths / "gpuutje.db") as c:
+        c.executescript(LEGACY_SCHEMA + """
+            INSERT INTO page_views (path, ip, timestamp) VALUES ('/api/gpus', '10.0.0.2', '2026-10-01T11:00:00');
+            CREATE TABLE traffic_sketches (day TEXT, path_class TEXT, sketch BLOB, PRIMARY KEY (day, path_class));
+            CREATE TABLE traffic_visitors (day TEXT, path_class TEXT, ip TEXT, PRIMARY KEY (day, path_class, ip));
+            INSERT INTO traffic_visitors VALUES ('2026-09-01', 'page', '10.0.0.3'), ('2026-09-02', 'page', '10.0.0.4');
+        """)
+        c.execute("INSERT INTO traffic_sketches VALUES ('2026-09-01', 'page', ?)", (sketch.to_bytes(),))
+
+    class CrashBeforeDrop:
+        """The main connection, dying right after the analytics copy committed."""
+
+        def __init__(self, c):
+            self.c = c
+
+        def execute(self, sql, *args):
+            if sql.startswith("DROP TABLE"):
+                raise sqlite3.OperationalError("killed")
+            return self.c.execute(sql, *args)
+
+    migrations = db.MIGRATIONS
+    crashing = replace(migrations[1], apply=lambda c: db._move_analytics_tables(CrashBeforeDrop(c)))
+    monkeypatch.setattr(db, "MIGRATIONS", (migrations[0], crashing, *migrations[2:]))
+    with pytest.raises(sqlite3.OperationalError):
+        db.init_db()
+    monkeypatch.setattr(db, "MIGRATIONS", migrations)
+    db.init_db()
+
+    with db._analytics_read() as a:
+        assert a.execute("SELECT COUNT(*) FROM page_views").fetchone()[0] == 2
+        sketches = {day: HyperLogLog.from_bytes(blob).count()
+                    for day, blob in a.execute("SELECT day, sketch FROM traffic_sketches WHERE path_class='page'")}
+    assert sketches == {"2026-09-01": 2, "2026-09-02": 1}
+    with db._read() as c:
+        assert not c.execute("SELECT 1 FROM sqlite_master WHERE name LIKE 'traffic_%'").fetchone()
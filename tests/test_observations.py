@@ -0,0 +1,36 @@
+"""Tests for the append-only price observation log."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen import db
+
+
+def _save(cycle, price, listing_id="m1"):
+    data = {"id": listing_id, "title": f"card {price}", "price": price, "link": "x", "date": "2026-10-01"}
+    return db.save_listing("gpu_t", data, cycle)
+
+
+def test_only_price_changes_are_logged(fresh_db):
+    prices = [300.0, 300.0, 280.0, 280.0, 300.0]  # back to an older price is a change too
+    for price in prices:
+        cycle = db.start_cycle()
+        _save(cycle, price)
+        db.finish_cycle(cycle, 1)
+
+    rows = db.price_observations("gpu_t")
+    assert [(r["cycle"], r["price"]) for r in rows] == [(1, 300.0), (3, 280.0), (5, 300.0)]
+    assert db.observation_counts() == {"cycles": 5, "listings": 1, "observations": 3}
+
+
+def test_incremental_reads_and_untracked_saves(fresh_db):
+    first = db.start_cycle()
+    _save(first, 300.0)
+    _save(None, 250.0, listing_id="m2")  # no cycle: listing saved, nothing logged
+    second = db.start_cycle()
+    _save(second, 290.0)
+
+    assert [r["price"] for r in db.price_observations("gpu_t", after_cycle=first)] == [290.0]
+    assert db.listing_count() == 3
@@ -0,0 +1,75 @@
+"""Tests for the full-table outlier, dedup and revalidation passes."""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen import db
+from gpuutje_kopen.catalog import refresh_catalog
+
+
+@pytest.fixture
+def chunk_of_3(fresh_db, monkeypatch):
+    monkeypatch.setattr(db, "MAINTENANCE_CHUNK", 3)
+    refresh_catalog()  # only gpu_t, whatever an earlier test loaded
+
+
+def _insert(table, rows):
+    """Raw ``(listing_id, title, price_cents, link)`` rows for gpu_t, duplicates allowed."""
+    gpu = "(SELECT pk FROM gpus WHERE id='gpu_t')" if table == "listings" else "'gpu_t'"
+    column = "gpu" if table == "listings" else "gpu_id"
+    extra, values = ("", "") if table == "listings" else (", reason, moved_at", ", 'x', 0")
+
+    def insert():
+        for listing_id, title, cents, link in rows:
+            db._conn().execute(
+                f"INSERT INTO {table} ({column}, listing_id, title, price_cents, link, seen_at{extra}) "
+                f"VALUES ({gpu}, ?, ?, ?, ?, ?{values})",
+                (listing_id, title, cents, link, int(time.time())),
+            )
+    db._main.submit(insert).result()
+
+
+def _commands(fn):
+    before = db._main.write_commands
+    result = fn()
+    return result, db._main.write_commands - before
+
+
+def test_revalidation_writes_in_chunks(chunk_of_3):
+    _insert("listings", [(f"m{i}", f"nothing to see {i}", 1000, f"l{i}") for i in range(7)]
+            + [("ok1", "ASUS Test GPU", 1000, "ok1"), ("ok2", "Test GPU OC", 1100, "ok2")])
+
+    stats, commands = _commands(db.revalidate_listings)
+
+    assert stats == {"deleted": 7, "corrected": 0, "unchanged": 2}
+    assert commands == 3 and db.listing_count() == 2
+
+
+def test_dedup_keeps_the_newest_row_per_listing_id_then_link(chunk_of_3):
+    _insert("listings", [("dup", f"card {i}", 1000 + i, f"l{i}") for i in range(5)]
+            + [(f"x{i}", f"other {i}", 900 + i, "same-link") for i in range(2)])
+    _insert("outliers", [("o", f"odd {i}", 10 + i, f"o{i}") for i in range(4)])
+
+    removed, commands = _commands(db.dedup_tables)
+
+    assert removed == {"listings": 5, "outliers": 3}
+    assert commands == 2 + 1 + 1  # 4 by listing_id, 1 by link, 3 outliers
+    with db._read() as c:
+        assert [r[0] for r in c.execute("SELECT title FROM listings ORDER BY id")] == ["card 4", "other 1"]
+
+
+def test_sweep_moves_and_restores_in_chunks(chunk_of_3):
+    _insert("listings", [(f"m{i}", f"card {i}", 50000, f"l{i}") for i in range(20)]
+            + [(f"hi{i}", f"dear {i}", 300000 + i, f"h{i}") for i in range(4)])
+    _insert("outliers", [("back", "fair card", 60000, "b")])
+
+    result, commands = _commands(db.sweep_outliers)
+
+    assert result == {"moved": 4, "restored": 1}
+    assert commands == 2 + 1
+    assert db.listing_count() == 21
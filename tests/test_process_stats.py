@@ -0,0 +1,41 @@
+"""Tests for the public app's published runtime counters."""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen import db, process_stats, tracking
+from gpuutje_kopen.cache import response_cache
+from gpuutje_kopen.events import bus
+from gpuutje_kopen.leader import LeaderElection
+
+
+def test_admin_stats_show_the_public_process_pools(admin_client):
+    assert admin_client.get("/api/stats").get_json()["public_process"] is None
+
+    def broken():
+        raise RuntimeError("gone")
+
+    with db._read():  # a borrowed reader shows up in the published pool counters
+        process_stats.publish({"db_connections": db.connection_stats, "broken": broken})
+
+    stats = admin_client.get("/api/stats").get_json()["public_process"]
+    assert stats["pid"] == os.getpid()
+    assert stats["db_connections"]["main"]["readers_open"] - stats["db_connections"]["main"]["readers_idle"] == 1
+    assert stats["broken"] == {"error": "gone"}
+
+
+def test_the_public_app_counters_survive_the_round_trip(admin_client):
+    sources = {
+        "page_views": tracking.page_view_writer_stats,
+        "events": bus.stats,
+        "response_cache": response_cache.stats,
+        "leader": LeaderElection("test-lease", on_elected=lambda: None, on_demoted=lambda: None).stats,
+    }
+    process_stats.publish(sources)
+
+    stats = admin_client.get("/api/stats").get_json()["public_process"]
+    assert {name: stats[name] for name in sources} == {name: source() for name, source in sources.items()}
+    assert {"queued", "dropped"} <= stats["page_views"].keys()
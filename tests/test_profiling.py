@@ -0,0 +1,83 @@
+"""Tests for on-demand cycle profiling."""
+
+import gzip
+import marshal
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen import db, profiling, search_worker
+
+
+def _busy(seconds=0.1):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sampling_collects_collapsed_stacks():
+    with profiling.capture("sample") as cap:
+        _busy()
+    assert cap.samples > 0 and cap.pstats is None and cap.report == ""
+    lines = cap.collapsed.splitlines()
+    assert any("_busy (test_profiling.py:" in line for line in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0 and stack.split(";")[0] == "MainThread"
+
+
+def test_cprofile_adds_a_pstats_dump_and_report():
+    with profiling.capture("cprofile") as cap:
+        _busy()
+    stats = marshal.loads(cap.pstats)
+    assert any(func == "_busy" for _, _, func in stats)
+    assert "_busy" in cap.report and cap.collapsed
+
+
+def test_a_cycle_request_applies_once(fresh_db):
+    assert profiling.take_request() is None
+    with pytest.raises(ValueError):
+        profiling.request_profile("perf")
+    profiling.request_profile("cprofile")
+    assert profiling.take_request() == "cprofile"
+    assert profiling.take_request() is None
+
+
+def test_profiles_are_stored_with_their_cycle(fresh_db, monkeypatch):
+    def cycle():
+        _busy(0.05)
+        return db.start_cycle()
+    monkeypatch.setattr(search_worker, "run_search_cycle", cycle)
+
+    pk = search_worker.profile_search_cycle("sample")
+
+    [listed] = db.list_profiles()
+    assert listed["id"] == pk and listed["target"] == "cycle" and listed["cycle"] is not None
+    assert not listed["has_pstats"] and listed["samples"] > 0
+    assert b"cycle (test_profiling.py:" in gzip.decompress(db.get_profile(pk)["collapsed"])
+
+
+def test_a_single_gpu_search_is_profiled_and_old_profiles_pruned(fresh_db, monkeypatch):
+    class Backend:
+        pause = 0.0
+
+        def search(self, query):
+            _busy(0.05)
+            return []
+    monkeypatch.setattr(search_worker, "_backend", Backend())
+    monkeypatch.setattr(db, "PROFILES_KEPT", 2)
+
+    for _ in range(3):
+        found, pk = search_worker.profile_search_gpu("gpu_t", "cprofile")
+
+    assert found == 0
+    assert [p["id"] for p in db.list_profiles()] == [pk, pk - 1]
+    profile = db.get_profile(pk)
+    assert profile["target"] == "gpu_t" and profile["cycle"] is None
+    assert "(search)" in profile["report"]
+    assert marshal.loads(gzip.decompress(profile["pstats"]))
+    with pytest.raises(ValueError):
+        search_worker.profile_search_gpu("no_such_gpu", "sample")
@@ -0,0 +1,210 @@
+"""Tests for the public JSON API: streaming, caching and the combined endpoints."""
+
+import gzip
+import json
+import sys
+from datetime import date, timedelta
+from functools import partial
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen import cache, catalog, db, services
+from gpuutje_kopen.catalog import refresh_catalog
+from gpuutje_kopen.routes import admin as admin_routes
+from gpuutje_kopen.routes import public as public_routes
+
+
+def _listings(n, gpu_id="gpu_t"):
+    for i in range(n):
+        db.save_listing(gpu_id, {"id": f"{gpu_id}-{i}", "title": f"Test GPU {i}", "price": 100.0 + i,
+                                 "link": f"https://x/{gpu_id}/{i}", "date": "2026-10-01"})
+
+
+# ── /api/results ──────────────────────────────────────────────────────
+
+def test_results_stream_without_holding_a_reader(public_client):
+    _listings(30)
+    resp = public_client.get("/api/results?limit=25&sort_by=price&order=asc", buffered=False)
+    chunks = iter(resp.response)
+    first = next(chunks)
+
+    assert db._main._idle.qsize() == len(db._main._readers)  # every reader is back in the pool
+    body = first + b"".join(chunks)
+    assert resp.headers["X-Cache"] == "MISS" and "Content-Encoding" not in resp.headers
+    assert json.loads(body) == services.filtered_results(limit=25, sort_by="price", order="asc")
+    assert [r["price"] for r in json.loads(body)][:2] == [100.0, 101.0]
+
+
+def test_results_gzip_framing_and_empty_result(public_client, monkeypatch):
+    monkeypatch.setattr(services, "iter_filtered_results_json", partial(db.iter_filtered_results_json, batch_size=7))
+    _listings(30)
+    plain = public_client.get("/api/results?limit=20").data
+    zipped = public_client.get("/api/results?limit=20&v=2", headers={"Accept-Encoding": "gzip"})
+
+    assert zipped.headers["Content-Encoding"] == "gzip" and "Accept-Encoding" in zipped.headers["Vary"]
+    assert zipped.data[:2] == b"\x1f\x8b" and gzip.decompress(zipped.data) == plain  # one member over 3 batches
+    assert public_client.get("/api/results?search=nothing-matches").get_json() == []
+
+
+def test_results_batches_page_through_ties_like_one_query(fresh_db):
+    db.add_gpu(db.GPU(id="gpu_u", name="Other GPU", tokens_sec=20.0, vram=16, search_queries=["other"]))
+    refresh_catalog()
+    for gpu_id in ("gpu_t", "gpu_u"):
+        for i in range(12):
+            db.save_listing(gpu_id, {"id": f"{gpu_id}-{i}", "title": f"card {i}", "price": 100.0 + i % 3,
+                                     "link": f"https://x/{gpu_id}/{i}", "date": "2026-10-01"})
+
+    for sort_by in ("timestamp", "price", "gpu", "vram", "tokens"):
+        for order in ("asc", "desc"):
+            args = dict(sort_by=sort_by, order=order, limit=20)
+            batches = list(db.iter_filtered_results_json(**args, batch_size=3))
+            assert [len(b) for b in batches] == [3] * 6 + [2]
+            assert [json.loads(row) for b in batches for row in b] == services.filtered_results(**args), (sort_by, order)
+
+
+def test_results_are_cached_after_the_stream(public_client, monkeypatch):
+    _listings(5)
+    first = public_client.get("/api/results")
+    assert first.headers["X-Cache"] == "MISS"
+    body = first.data  # the body is cached once the stream is read to the end
+
+    again = public_client.get("/api/results")
+    assert again.headers["X-Cache"] == "HIT" and again.data == body
+    assert public_client.get("/api/results", headers={"If-None-Match": again.headers["ETag"]}).status_code == 304
+
+    monkeypatch.setattr(public_routes, "RESULTS_CACHE_MAX_BYTES", 100)
+    assert public_client.get("/api/results?limit=4").data
+    assert public_client.get("/api/results?limit=4").headers["X-Cache"] == "MISS"  # too big to keep
+
+
+# ── /api/price-history (compare) ──────────────────────────────────────
+
+def test_compare_aligns_series_on_one_date_axis(public_client):
+    db.add_gpu(db.GPU(id="gpu_u", name="Other GPU", tokens_sec=20.0, vram=16, search_queries=["other"]))
+    refresh_catalog()
+    d1, d2, d3 = ((date.today() - timedelta(days=n)).isoformat() for n in (3, 2, 1))
+    for gpu_id, day, price in [("gpu_t", d1, 300.0), ("gpu_t", d2, 310.0), ("gpu_u", d2, 500.0), ("gpu_u", d3, 490.0)]:
+        db.save_listing(gpu_id, {"id": f"{gpu_id}-{day}", "title": f"card {day}", "price": price,
+                                 "link": f"https://x/{gpu_id}/{day}", "date": day})
+
+    body = public_client.get("/api/price-history?ids=gpu_u,nope,gpu_t,gpu_u&span=30d").get_json()
+
+    assert body["dates"] == [d1, d2, d3]
+    assert body["series"] == [
+        {"id": "gpu_u", "name": "Other GPU", "prices": [None, 500.0, 490.0]},
+        {"id": "gpu_t", "name": "Test GPU", "prices": [300.0, 310.0, None]},
+    ]
+    assert public_client.get("/api/price-history?ids=nope").get_json() == {"dates": [], "series": []}
+
+
+def test_compare_rejects_missing_or_too_many_ids(public_client):
+    for query in ("", "?ids=", "?ids=,,"):
+        assert public_client.get(f"/api/price-history{query}").status_code == 400
+    ids = ",".join(["gpu_t"] * (public_routes.COMPARE_MAX_IDS + 1))
+    resp = public_client.get(f"/api/price-history?ids={ids}")
+    assert resp.status_code == 400 and "at most" in resp.get_json()["error"]
+    ids = ",".join(["gpu_t"] * public_routes.COMPARE_MAX_IDS)
+    assert public_client.get(f"/api/price-history?ids={ids}").status_code == 200
+
+
+# ── /api/bootstrap ────────────────────────────────────────────────────
+
+def test_bootstrap_matches_the_individual_endpoints(public_client):
+    db.add_gpu(db.GPU(id="gpu_u", name="Other GPU", tokens_sec=20.0, vram=16, search_queries=["other"]))
+    refresh_catalog()
+    for n in range(200):  # ~29 weekly bins over the year, downsampled to 20 points
+        day = (date.today() - timedelta(days=n)).isoformat()
+        for gpu_id, price in (("gpu_t", 300.0 + n % 17), ("gpu_u", 500.0 - n % 13)):
+            db.save_listing(gpu_id, {"id": f"{gpu_id}-{n}", "title": f"card {n}", "price": price,
+                                     "link": f"https://x/{gpu_id}/{n}", "date": day})
+    get = lambda url: public_client.get(url).get_json()
+    filters = "min_vram=12&max_price=495&sort_by=price&order=asc"
+
+    boot = get(f"/api/bootstrap?gpu=gpu_u&span=1y&points=20&days=30&{filters}&limit=3")
+
+    assert boot["gpus"] == get("/api/gpus")
+    assert boot["stats"] == get("/api/stats")
+    assert boot["price_history"] == {"gpu_id": "gpu_u", "span": "1y",
+                                     **get("/api/price-history/gpu_u?agg=min&span=1y&points=20")}
+    assert len(boot["price_history"]["prices"]) == 20
+    for metric in ("vram", "tokens"):
+        assert boot["scatter"][metric] == get(f"/api/scatter-data?metric={metric}&days=30")["points"]
+    assert boot["results"] == get(f"/api/results?{filters}&limit=3")
+    assert [r["price"] for r in boot["results"]] == [488.0, 488.0, 488.0]
+    assert len(get(f"/api/results?{filters}")) > 3  # limit trimmed the page
+
+
+# ── Response cache ────────────────────────────────────────────────────
+
+def test_cached_json_is_keyed_by_data_generation(public_client):
+    first = public_client.get("/api/stats")
+    assert first.headers["X-Cache"] == "MISS" and first.get_json()["total_results"] == 0
+    assert public_client.get("/api/stats").headers["X-Cache"] == "HIT"
+
+    _listings(2)
+    assert public_client.get("/api/stats").get_json()["total_results"] == 0  # still the cached body
+    cache.bump_generation()
+    fresh = public_client.get("/api/stats")
+    assert fresh.headers["X-Cache"] == "MISS" and fresh.get_json()["total_results"] == 2
+    assert fresh.headers["ETag"] != first.headers["ETag"]
+
+
+def test_etag_revalidation_and_gzip_variant(public_client, monkeypatch):
+    monkeypatch.setattr(public_routes, "GZIP_MIN_BYTES", 10)
+    plain = public_client.get("/api/gpus")
+    etag = plain.headers["ETag"].strip('"')
+    assert "Content-Encoding" not in plain.headers and "Accept-Encoding" in plain.headers["Vary"]
+    assert public_client.get("/api/gpus", headers={"If-None-Match": f'"{etag}"'}).status_code == 304
+
+    zipped = public_client.get("/api/gpus", headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip" and zipped.headers["ETag"] == f'"{etag}-gz"'
+    assert gzip.decompress(zipped.data) == plain.data
+    revalidated = public_client.get("/api/gpus", headers={"Accept-Encoding": "gzip", "If-None-Match": f'"{etag}-gz"'})
+    assert revalidated.status_code == 304 and revalidated.data == b""
+    assert cache.response_cache.stats()["entries"] == 2  # the plain body and its gzip variant
+
+
+def test_errors_pass_through_uncached(public_client):
+    for _ in range(2):
+        resp = public_client.get("/api/price-history?ids=")
+        assert resp.status_code == 400 and "X-Cache" not in resp.headers and "ETag" not in resp.headers
+    assert cache.response_cache.stats()["entries"] == 0
+
+
+def test_only_admin_data_edits_invalidate_public_data(admin_client, monkeypatch):
+    published = []
+    monkeypatch.setattr(admin_routes, "schedule_publish", lambda: published.append(1))
+    generation = lambda: db.get_setting(cache.GENERATION_KEY, "0")
+    before = generation()
+
+    assert all(resp.status_code == 200 for resp in (
+        admin_client.post("/api/trigger-search"),
+        admin_client.put("/api/search-interval", json={"seconds": 3600}),
+        admin_client.post("/api/profiles/cycle", json={"mode": "sample"}),
+        admin_client.post("/api/maintenance"),
+    ))
+    assert admin_client.delete("/api/outliers/12345").status_code == 404
+    assert generation() == before and published == []
+
+    assert admin_client.delete("/api/results/gpu/gpu_t").status_code == 200
+    assert generation() != before and published == [1]
+
+
+def test_gpu_edits_from_the_admin_process_reach_the_public_endpoints(public_client, admin_client, monkeypatch):
+    _listings(3)
+    urls = ("/api/gpus", "/api/bootstrap", "/api/scatter-data?metric=vram")
+    for url in urls:
+        assert '"Test GPU"' in public_client.get(url).get_data(as_text=True)
+
+    # The admin app is another process: this one sees the generation bump
+    # but keeps its catalog until the next catalog_version poll.
+    monkeypatch.setattr(admin_routes, "refresh_gpu_cache", lambda: None)
+    assert admin_client.put("/api/gpus/gpu_t", json={"name": "Renamed GPU"}).status_code == 200
+    for url in urls:
+        public_client.get(url)  # rebuilt from the old catalog under the new generation
+
+    monkeypatch.setattr(catalog, "_checked", 0.0)  # the poll interval has passed
+    for url in urls:
+        body = public_client.get(url).get_data(as_text=True)
+        assert '"Renamed GPU"' in body and '"Test GPU"' not in body, url
@@ -0,0 +1,157 @@
+"""Query-plan regression tests for the SQL in db.py.
+
+Every benchmark case in ``benchmarks/run.py`` (together they call every
+public ``db`` function) runs once against a small seeded database while a
+trace callback records each statement.  ``EXPLAIN QUERY PLAN`` of every
+distinct statement must match ``tests/query_plans.json``, so a dropped or
+ignored index shows up as a diff.  Statements on request and worker hot
+paths must also neither scan a table nor sort rows in a temp B-tree.
+
+After an intended plan change, regenerate the file and review the diff::
+
+    UPDATE_QUERY_PLANS=1 python -m pytest tests/test_query_plans.py
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+import run as bench
+import synth
+from gpuutje_kopen import archive, connections, db
+from gpuutje_kopen.catalog import refresh_catalog
+
+PLANS_FILE = Path(__file__).parent / "query_plans.json"
+
+# Functions serving a request or the worker's per-listing writes.  Whole-table
+# aggregates, exports and bulk maintenance are left out: they read everything
+# by design (their plans are still checked in).
+HOT_PATHS = {
+    "db.get_gpu", "db.get_setting", "db.get_lease", "db.set_setting", "db.bump_setting_counter",
+    "db.acquire_lease+release_lease", "db.start_cycle+finish_cycle",
+    "db.price_history", "db.price_history_multi", "db.price_history_bins", "db.avg_price_period",
+    "db.lowest_listing", "db.filtered_listings", "db.iter_filtered_results_json",
+    "db.browse_listings", "db.browse_outliers", "db.browse_restored_listings", "db.traffic_stats",
+    "db.is_price_outlier", "db.save_listing", "db.save_as_outlier", "db.mark_active_listings",
+    "db.update_listing", "db.delete_listing", "db.restore_outlier", "db.unrestore_listing",
+    "db.delete_outlier", "db.record_page_view", "db.record_page_views",
+    "services.filtered_results", "services.stream_results",
+    "services.price_series", "services.compare_price_series",
+}
+# Hot-path sorts that are fine, with the reason
+ALLOWED_SORTS = {
+    "db.filtered_listings[gpus,price]": "sorts the chosen GPUs' listings only, found through the gpu index",
+}
+CATALOG_TABLES = {"gpus", "g"}  # a few dozen rows, scanned to drive per-GPU index lookups
+
+_FULL_SCAN = re.compile(r"^SCAN (\S+)$")
+_SORT = re.compile(r"USE TEMP B-TREE FOR (ORDER BY|DISTINCT)")
+
+
+def _normalize(sql: str) -> str:
+    """Statement text with literals (bound values are expanded) and list lengths collapsed."""
+    sql = " ".join(sql.split())
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"(?<![\w.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", "?", sql)
+    sql = re.sub(r"\?(?:\s*,\s*\?)+", "?", sql)
+    return re.sub(r"\(\?\)(?:\s*,\s*\(\?\))+", "(?)", sql)
+
+
+def _plan(c: sqlite3.Connection, sql: str) -> list[str]:
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in c.execute("EXPLAIN QUERY PLAN " + sql):
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+@pytest.fixture(scope="module")
+def plans(tmp_path_factory) -> dict[tuple[str, str], dict]:
+    """``(database, statement) -> {"plan", "used_by"}`` for the whole benchmark workload."""
+    seed = tmp_path_factory.mktemp("seed")
+    synth.build(seed, listings=3000, seed=1)
+
+    statements: dict[tuple[str, str], dict] = {}
+    label = {"case": ""}
+
+    def traced_open(self, *, readonly):
+        conn = open_(self, readonly=readonly)
+        database = "analytics" if self is db._analytics else "main"
+        conn.set_trace_callback(lambda sql: statements.setdefault(
+            (database, _normalize(sql)), {"sql": sql, "used_by": set()})["used_by"].add(label["case"]))
+        return conn
+
+    open_ = connections.ConnectionManager._open
+    saved = db.DB_PATH, db.ANALYTICS_DB_PATH, archive.ARCHIVE_DIR
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(connections.ConnectionManager, "_open", traced_open)
+        try:
+            bench._use_copy(seed, tmp_path_factory.mktemp("work"))
+            ctx = bench.Context.load()
+            for case in sorted(bench.CASES, key=lambda c: c.fresh):  # bulk deletes last
+                if case.prepare:
+                    case.prepare(ctx)
+                label["case"] = case.name
+                case.fn(ctx)
+        finally:
+            db.close_connections()
+            db.DB_PATH, db.ANALYTICS_DB_PATH, archive.ARCHIVE_DIR = saved
+            refresh_catalog()
+
+    conns = {"main": sqlite3.connect(seed / "gpuutje.db"), "analytics": sqlite3.connect(seed / "analytics.db")}
+    result = {}
+    for (database, key), seen in sorted(statements.items()):
+        used_by = sorted(seen["used_by"] - {""})
+        if used_by and re.match(r"(SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b", key, re.I):
+            result[(database, key)] = {"plan": _plan(conns[database], seen["sql"]), "used_by": used_by}
+    for c in conns.values():
+        c.close()
+    return result
+
+
+def _write(plans: dict):
+    PLANS_FILE.write_text(json.dumps({
+        "sqlite": sqlite3.sqlite_version,
+        "statements": [{"database": database, "sql": sql, **entry} for (database, sql), entry in plans.items()],
+    }, indent=1, ensure_ascii=False) + "\n")
+
+
+def test_plans_match_checked_in(plans):
+    if os.environ.get("UPDATE_QUERY_PLANS"):
+        _write(plans)
+    expected = json.loads(PLANS_FILE.read_text())
+    if expected["sqlite"].split(".")[:2] != sqlite3.sqlite_version.split(".")[:2]:
+        pytest.skip(f"plans were recorded with SQLite {expected['sqlite']}, this is {sqlite3.sqlite_version}")
+    recorded = {(s["database"], s["sql"]): s["plan"] for s in expected["statements"]}
+
+    problems = [f"new statement, not in {PLANS_FILE.name}: {sql}" for key, sql in plans if (key, sql) not in recorded]
+    problems += [f"no longer run: {sql}" for key, sql in recorded if (key, sql) not in plans]
+    for key, entry in plans.items():
+        if key in recorded and recorded[key] != entry["plan"]:
+            problems.append(f"plan changed for {key[1]}\n  was: {recorded[key]}\n  now: {entry['plan']}")
+    assert not problems, "\n".join(problems) + "\n(UPDATE_QUERY_PLANS=1 rewrites the file)"
+
+
+def test_hot_paths_neither_scan_nor_sort(plans):
+    problems = []
+    for (_, sql), entry in plans.items():
+        hot = [name for name in entry["used_by"] if name.split("[")[0] in HOT_PATHS and name not in ALLOWED_SORTS]
+        if not hot:
+            continue
+        for line in map(str.strip, entry["plan"]):
+            scan = _FULL_SCAN.match(line)
+            if scan and scan.group(1) not in CATALOG_TABLES:
+                problems.append(f"{hot[0]}: full scan ({line}) in {sql}")
+            # Sorting grouped output is fine: it has one row per group
+            if _SORT.search(line) and "GROUP BY" not in sql:
+                problems.append(f"{hot[0]}: sort ({line}) in {sql}")
+    assert not problems, "\n".join(problems)
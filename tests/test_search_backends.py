@@ -0,0 +1,110 @@
+"""Tests for the record/replay search backends."""
+
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen import archive, db, search_worker, snapshot
+from gpuutje_kopen.search_backends import (
+    CassetteWriter,
+    RecordingBackend,
+    ReplayBackend,
+    SearchError,
+    SearchThrottled,
+    read_cassette,
+)
+
+
+def _live(listing_id, price, title="ASUS Test GPU OC"):
+    return SimpleNamespace(id=listing_id, title=title, price=price, link=f"https://link.marktplaats.nl/{listing_id}",
+                           date=date(2026, 10, 1), location=SimpleNamespace(city="Utrecht"))
+
+
+class Site:
+    """A live backend that answers with the next canned response."""
+
+    pause = 0.5
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+
+    def search(self, query):
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def test_recording_replays_responses_in_order(tmp_path):
+    cassette = tmp_path / "c.jsonl.gz"
+    recorder = RecordingBackend(Site([_live("m1", 500.0)], [_live("m1", 450.0)], OSError("503")), cassette)
+    assert recorder.pause == 0.5
+    recorder.search("test")
+    recorder.search("test")
+    with pytest.raises(OSError):
+        recorder.search("test")
+
+    assert [len(r.get("listings", ())) for r in read_cassette(cassette)["test"]] == [1, 1, 0]
+    replay = ReplayBackend(cassette, latency=0)
+    first, second = replay.search("test"), replay.search("test")
+    assert (first[0].price, second[0].price) == (500.0, 450.0)
+    assert first[0].location.city == "Utrecht" and first[0].date == date(2026, 10, 1)
+    with pytest.raises(SearchError, match="503"):
+        replay.search("test")
+    assert replay.search("test")[0].price == 500.0  # wraps around
+    assert replay.search("unknown") == []
+    assert replay.counts == {"queries": 5, "misses": 1, "errors": 1, "throttled": 0}
+
+
+def test_replay_latency_errors_and_throttling(tmp_path):
+    cassette = tmp_path / "c.jsonl.gz"
+    CassetteWriter(cassette).write("q", 0.2, [_live("m1", 500.0)])
+
+    start = time.perf_counter()
+    ReplayBackend(cassette, latency_scale=0.25).search("q")
+    assert 0.04 < time.perf_counter() - start < 0.2
+
+    def failures(seed):
+        replay = ReplayBackend(cassette, latency=0, error_rate=0.5, seed=seed)
+        outcome = []
+        for _ in range(40):
+            try:
+                replay.search("q")
+                outcome.append(False)
+            except SearchError:
+                outcome.append(True)
+        return outcome
+    assert failures(3) == failures(3) and 5 < sum(failures(3)) < 35
+
+    throttled = ReplayBackend(cassette, latency=0, rate_limit=20, burst=2)
+    throttled.search("q"), throttled.search("q")
+    with pytest.raises(SearchThrottled):
+        throttled.search("q")
+    time.sleep(0.06)
+    throttled.search("q")
+
+
+def test_a_full_cycle_runs_offline(fresh_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", tmp_path / "snapshots")
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path / "archive")
+    cassette = tmp_path / "c.jsonl.gz"
+    writer = CassetteWriter(cassette)
+    listings = [_live(f"m{i}", 400.0 + 10 * i, f"ASUS Test GPU {i}") for i in range(6)]
+    writer.write("test", 0.0, listings)
+    writer.write("test", 0.0, [_live("m0", 350.0, "ASUS Test GPU 0"), *listings[1:]])
+    previous = search_worker.set_search_backend(ReplayBackend(cassette))
+    try:
+        first = search_worker.run_search_cycle()
+        second = search_worker.run_search_cycle()
+    finally:
+        search_worker.set_search_backend(previous)
+
+    assert second == first + 1
+    assert db.listing_count() == 6
+    assert [o["price"] for o in db.price_observations("gpu_t", after_cycle=first)] == [350.0]
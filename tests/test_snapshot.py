@@ -0,0 +1,61 @@
+"""Tests for the static API snapshot publisher."""
+
+import gzip
+import hashlib
+import json
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import brotli
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen import snapshot
+
+
+def _payloads(items):
+    return lambda: iter(items.items())
+
+
+def test_publish_writes_files_and_manifest(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "_snapshot_payloads", _payloads({"api/stats.json": {"total_results": 3}}))
+
+    assert snapshot.publish_snapshots(tmp_path)["written"] == 1
+
+    body = (tmp_path / "api/stats.json").read_bytes()
+    assert json.loads(body) == {"total_results": 3}
+    assert gzip.decompress((tmp_path / "api/stats.json.gz").read_bytes()) == body
+    assert brotli.decompress((tmp_path / "api/stats.json.br").read_bytes()) == body
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert manifest["files"]["api/stats.json"]["sha256"] == hashlib.sha256(body).hexdigest()
+
+
+def test_unchanged_files_are_kept_and_stale_files_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "_snapshot_payloads", _payloads({"a.json": [1], "b.json": [2]}))
+    snapshot.publish_snapshots(tmp_path)
+
+    monkeypatch.setattr(snapshot, "_snapshot_payloads", _payloads({"a.json": [1]}))
+    summary = snapshot.publish_snapshots(tmp_path)
+
+    assert summary == {**summary, "files": 1, "written": 0, "removed": 1}
+    assert not (tmp_path / "b.json").exists()
+    assert not (tmp_path / "b.json.gz").exists()
+
+
+def test_price_history_has_the_dashboard_point_budgets(monkeypatch):
+    dates = [(date(2025, 1, 1) + timedelta(days=i)).isoformat() for i in range(600)]
+    series = {"dates": dates, "prices": [float(i % 97) for i in range(len(dates))]}
+    monkeypatch.setattr(snapshot, "public_gpu_list", lambda: [])
+    monkeypatch.setattr(snapshot, "data_stats", lambda: {})
+    monkeypatch.setattr(snapshot, "scatter_datasets", lambda days: {})
+    monkeypatch.setattr(snapshot, "gpu_list", lambda: [SimpleNamespace(id="gpu_a")])
+    monkeypatch.setattr(snapshot, "price_series", lambda gpu_id, agg, span: series)
+
+    payloads = dict(snapshot._snapshot_payloads())
+
+    assert payloads["api/price-history/gpu_a/min/30d.json"] is series
+    for points in snapshot.PRICE_POINTS:
+        variant = payloads[f"api/price-history/gpu_a/avg/1y/{points}.json"]
+        assert len(variant["prices"]) == points and set(variant) == {"dates", "prices", "min", "max"}
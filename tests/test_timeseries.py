@@ -0,0 +1,42 @@
+"""Tests for price-history downsampling."""
+
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen.timeseries import downsample, lttb_indices
+
+
+def _days(n):
+    start = date(2024, 1, 1)
+    return [(start + timedelta(days=i)).isoformat() for i in range(n)]
+
+
+def test_short_series_is_unchanged():
+    out = downsample(_days(3), [1.0, 2.0, 3.0], points=10)
+    assert out == {"dates": _days(3), "prices": [1.0, 2.0, 3.0], "min": [1.0, 2.0, 3.0], "max": [1.0, 2.0, 3.0]}
+
+
+def test_downsample_keeps_endpoints_and_spikes():
+    values = [100.0] * 1000
+    values[437] = 900.0
+    values[700] = 5.0
+    out = downsample(_days(1000), values, points=50)
+
+    assert len(out["dates"]) == len(out["prices"]) == len(out["min"]) == len(out["max"]) == 50
+    assert out["dates"][0] == _days(1)[0] and out["dates"][-1] == _days(1000)[-1]
+    assert 900.0 in out["prices"] and 5.0 in out["prices"]
+    assert max(out["max"]) == 900.0 and min(out["min"]) == 5.0
+    assert out["dates"] == sorted(out["dates"])
+
+
+def test_lttb_indices_are_increasing_and_unique():
+    x = np.arange(500, dtype=float)
+    y = np.sin(x / 10)
+    idx = lttb_indices(x, y, 40)
+    assert len(idx) == 40
+    assert (np.diff(idx) > 0).all()
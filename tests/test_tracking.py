@@ -0,0 +1,36 @@
+"""Tests for the buffered page-view writer."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from gpuutje_kopen import tracking
+from gpuutje_kopen.tracking import PageViewWriter
+
+
+def test_drops_oldest_when_full(monkeypatch):
+    written = []
+    monkeypatch.setattr(tracking, "record_page_views", written.extend)
+
+    writer = PageViewWriter(batch_size=100, max_queue=3)
+    for i in range(5):
+        writer.enqueue(f"/p{i}", "1.2.3.4", "ua")
+
+    assert writer.stats()["dropped"] == 2
+    assert writer.flush() == 3
+    assert [row[0] for row in written] == ["/p2", "/p3", "/p4"]
+
+
+def test_stop_flushes_pending_rows(monkeypatch):
+    written = []
+    monkeypatch.setattr(tracking, "record_page_views", written.extend)
+
+    writer = PageViewWriter(flush_interval=60, batch_size=1000)
+    writer.start()
+    writer.enqueue("/", "1.2.3.4", "ua")
+    writer.enqueue("/api/stats", "1.2.3.4", "ua")
+    writer.stop()
+
+    assert len(written) == 2
+    assert writer.stats() == {"queued": 0, "written": 2, "dropped": 0, "failed": 0}